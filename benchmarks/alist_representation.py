@@ -0,0 +1,112 @@
+'''
+File: alist_representation.py
+Description: Memory per node and construction time of Alist (typed slots),
+             compared with the dict-based Alist it replaced.
+
+Run from the repository root:
+
+    python -m benchmarks.alist_representation
+
+'''
+
+import argparse
+import timeit
+import tracemalloc
+
+from graph.alist import Alist
+from graph.alist import Attributes as tt
+from graph.alist import States as states
+from graph.alist import NodeTypes as nt
+from graph.alist import Branching as br
+
+
+def fact_attributes(i):
+    ''' attributes of a typical fact node returned from a KB lookup'''
+    alist = Alist(**{tt.OP: 'value', tt.OPVAR: '?x', tt.SUBJECT: 'France',
+                     tt.PROPERTY: 'population', tt.OBJECT: '?x', tt.TIME: str(1960 + i % 60)})
+    alist.set('?x', str(60000000 + i))
+    alist.set(tt.OPVALUE, str(60000000 + i))
+    alist.set(tt.COV, 0.05)
+    alist.state = states.REDUCED
+    alist.node_type = nt.FACT
+    alist.data_sources = ['wikidata']
+    alist.check_variables()
+    return alist.attributes
+
+
+class DictAlist:
+    ''' storage of the dict-based Alist: core attributes, meta and variables in one dict '''
+
+    CORE = (tt.OP, tt.SUBJECT, tt.PROPERTY, tt.OBJECT, tt.OPVAR, tt.COV, tt.TIME,
+            tt.EXPLAIN, tt.FNPLOT, tt.CONTEXT)
+
+    def __init__(self, **kwargs):
+        self.attributes = {
+            tt.ID: kwargs[tt.ID] if tt.ID in kwargs else "0",
+            tt.OP: kwargs[tt.OP] if tt.OP in kwargs else 'value',
+            tt.SUBJECT: kwargs[tt.SUBJECT] if tt.SUBJECT in kwargs else '',
+            tt.PROPERTY: kwargs[tt.PROPERTY] if tt.PROPERTY in kwargs else '',
+            tt.OBJECT: kwargs[tt.OBJECT] if tt.OBJECT in kwargs else '',
+            tt.OPVAR: kwargs[tt.OPVAR] if tt.OPVAR in kwargs else '',
+            tt.COV: kwargs[tt.COV] if tt.COV in kwargs else 0.0,
+            tt.TIME: kwargs[tt.TIME] if tt.TIME in kwargs else '',
+            tt.EXPLAIN: kwargs[tt.EXPLAIN] if tt.EXPLAIN in kwargs else '',
+            tt.FNPLOT: kwargs[tt.FNPLOT] if tt.FNPLOT in kwargs else '',
+            tt.CONTEXT: kwargs[tt.CONTEXT] if tt.CONTEXT in kwargs else '',
+            'meta': {
+                'cost': kwargs[tt.COST] if tt.COST in kwargs else 0.0,
+                'depth': 0,
+                'state': states.UNEXPLORED,
+                'data_sources': [],
+                'branch_type': br.OR,
+                'node_type': nt.ZNODE,
+                'is_map': 1,
+                'is_frontier': 0
+            }
+        }
+        for k in set(kwargs) - set(self.CORE):
+            self.attributes[k] = kwargs[k]
+        self.children = []
+        self.parent = []
+        self.nodes_to_enqueue_only = []
+        self.nodes_to_enqueue_and_process = []
+        self.parent_decomposition = ''
+
+
+def memory_per_node(cls, attrs_list):
+    tracemalloc.start()
+    # copy the meta dicts so that no node shares them with the input attributes
+    attrs_list = [dict(attrs, meta=dict(attrs['meta'])) for attrs in attrs_list]
+    before = tracemalloc.take_snapshot()
+    nodes = [cls(**attrs) for attrs in attrs_list]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    del nodes
+    return size / len(attrs_list)
+
+
+def construction_time(cls, attrs_list, repeat):
+    timer = timeit.Timer(lambda: [cls(**attrs) for attrs in attrs_list])
+    return min(timer.repeat(repeat=repeat, number=1)) / len(attrs_list)
+
+
+def main(n, repeat):
+    attrs_list = [fact_attributes(i) for i in range(n)]
+    assert all(Alist(**a).attributes == DictAlist(**a).attributes for a in attrs_list[:10])
+
+    print(f"{'class':<16}{'bytes/node':>12}{'construct (us)':>16}")
+    for name, cls in (('dict Alist', DictAlist), ('Alist', Alist)):
+        mem = memory_per_node(cls, attrs_list)
+        t = construction_time(cls, attrs_list, repeat)
+        print(f"{name:<16}{mem:>12.0f}{t * 1e6:>16.2f}")
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument("-n", "--nodes", type=int, default=20000,
+                           help="number of fact nodes to construct")
+    argparser.add_argument("-r", "--repeat", type=int, default=5,
+                           help="number of timing repetitions")
+    args = argparser.parse_args()
+    main(args.nodes, args.repeat)
@@ -0,0 +1,168 @@
+'''
+File: async_engine.py
+Description: Latency of a batch of query sessions run one after the other
+             with Launcher and together on one event loop with AsyncLauncher,
+             against a local mock HTTP server of the knowledge bases.
+
+The server answers the World Bank, Wikidata, MusicBrainz and ConceptNet
+requests of the knowledge base interfaces (their API_URL constants are
+pointed at it) after a fixed delay, with the population of a country
+growing by 10000 a year up to 2022. Queries for years after 2022 are
+answered by temporal decomposition and regression.
+
+The check verifies that the sessions get the same answers with both
+launchers and that the async sessions had several requests in flight.
+
+Run from the repository root:
+
+    python -m benchmarks.async_engine
+
+'''
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from frank import config
+from frank.kb import conceptnet, musicbrainz, wikidata, worldbank
+from frank.launcher import AsyncLauncher, Launcher
+from graph.alist import Alist
+from graph.alist import Attributes as tt
+
+
+class MockKBHandler(BaseHTTPRequestHandler):
+    ''' answers the knowledge base requests after server.delay seconds '''
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            server.requests += 1
+        time.sleep(server.delay)
+        with server.lock:
+            server.in_flight -= 1
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        if url.path.startswith('/worldbank/'):
+            body = [{}, []]
+            date = params.get('date', [''])[0]
+            if date.isdigit() and int(date) <= 2022:
+                body = [{}, [{'value': 1000000 + (int(date) - 1990) * 10000}]]
+        elif url.path.startswith('/wikidata/api'):
+            body = {'search': []}
+        elif url.path.startswith('/wikidata/sparql'):
+            body = {'results': {'bindings': []}}
+        elif url.path.startswith('/musicbrainz/'):
+            body = {'recordings': []}
+        else:
+            body = {'edges': []}
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(delay):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), MockKBHandler)
+    server.daemon_threads = True
+    server.delay = delay
+    server.lock = threading.Lock()
+    server.in_flight = server.max_in_flight = server.requests = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f'http://127.0.0.1:{server.server_address[1]}'
+    worldbank.API_URL = f'{base}/worldbank'
+    wikidata.API_URL = f'{base}/wikidata/api'
+    wikidata.SPARQL_URL = f'{base}/wikidata/sparql'
+    musicbrainz.API_URL = f'{base}/musicbrainz'
+    conceptnet.API_URL = f'{base}/conceptnet'
+    return server
+
+
+def queries(countries, years):
+    return [{tt.OP: 'value', tt.OPVAR: '?x', tt.SUBJECT: country, tt.PROPERTY: 'population',
+             tt.OBJECT: '?x', tt.TIME: str(year)} for country in countries for year in years]
+
+
+def answers(graphs):
+    return {session_id: (g.get('answer') or {}).get('answer') for session_id, g in graphs.items()}
+
+
+def run_sync(batch):
+    graphs = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i, query in enumerate(batch):
+            Launcher().start('', Alist(**query), str(i), graphs)
+    return graphs
+
+
+async def run_async(batch):
+    graphs = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        await asyncio.gather(*[AsyncLauncher().start('', Alist(**query), str(i), graphs)
+                               for i, query in enumerate(batch)])
+    return graphs
+
+
+def timed(server, fn, *args):
+    server.max_in_flight = server.requests = 0
+    t = time.perf_counter()
+    graphs = fn(*args)
+    return graphs, time.perf_counter() - t
+
+
+def main(countries, years, delay, max_requests, skip_sync):
+    server = start_server(delay)
+    batch = queries(countries, years)
+    saved = config.config['kb_max_requests']
+    print(f"{len(batch)} sessions, {delay * 1000:.0f} ms per request")
+    print(f"{'engine':<34}{'time (s)':>10}{'requests':>10}{'max in flight':>15}")
+    results = {}
+    try:
+        if not skip_sync:
+            graphs, elapsed = timed(server, run_sync, batch)
+            results['sync'] = answers(graphs)
+            print(f"{'Launcher, one session at a time':<34}{elapsed:>10.2f}{server.requests:>10}"
+                  f"{server.max_in_flight:>15}")
+        for n in (1, max_requests):
+            config.config['kb_max_requests'] = n
+            graphs, elapsed = timed(server, lambda: asyncio.run(run_async(batch)))
+            results[n] = answers(graphs)
+            print(f"{f'AsyncLauncher, {n} requests at a time':<34}{elapsed:>10.2f}{server.requests:>10}"
+                  f"{server.max_in_flight:>15}")
+    finally:
+        config.config['kb_max_requests'] = saved
+        server.shutdown()
+
+    expected = results.get('sync', results[1])
+    assert all(r == expected for r in results.values()), results
+    assert all(a is not None for a in expected.values()), expected
+    assert max_requests == 1 or server.max_in_flight > 1
+    print(f"check: same answers with every engine, up to {server.max_in_flight} requests in flight")
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument("-c", "--countries", nargs='+', default=['France', 'Ghana', 'Kenya', 'Italy'],
+                           help="countries of the population queries")
+    argparser.add_argument("-y", "--years", type=int, nargs='+', default=[2010, 2024],
+                           help="years of the population queries")
+    argparser.add_argument("-d", "--delay", type=float, default=0.05,
+                           help="delay of each request to the mock server (s)")
+    argparser.add_argument("-n", "--max-requests", type=int, default=16,
+                           help="knowledge base requests in flight with AsyncLauncher")
+    argparser.add_argument("--skip-sync", action="store_true",
+                           help="do not run the sessions with Launcher")
+    args = argparser.parse_args()
+    main(args.countries, args.years, args.delay, args.max_requests, args.skip_sync)
@@ -0,0 +1,109 @@
+'''
+File: budget.py
+Description: Latency, answer rate and work of Launcher sessions with
+             per-query budgets (frank/budget.py) of knowledge base calls,
+             inference graph nodes, wall time and decomposition depth.
+
+The sessions run against the local mock HTTP server of the knowledge bases
+of benchmarks/async_engine.py; queries for years after 2022 are answered by
+temporal decomposition and regression, so their work grows with the
+budget. The check verifies that every session stays within its knowledge
+base call limit and, within one knowledge base request, its wall time,
+that the sessions stopped by their budget report the limit reached with
+the latest intermediate answer and its error bar, and that an unlimited
+budget gives the same answers as no budget.
+
+Run from the repository root:
+
+    python -m benchmarks.budget
+
+'''
+
+import argparse
+import contextlib
+import io
+import time
+
+from benchmarks.async_engine import queries, start_server
+from frank.launcher import Launcher
+from graph.alist import Alist
+
+
+def run(batch, budget):
+    sessions = []
+    for i, query in enumerate(batch):
+        graphs = {}
+        launcher = Launcher()
+        t = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            launcher.start('', Alist(**query), str(i), graphs, budget=budget)
+        elapsed = time.perf_counter() - t
+        sessions.append({'answer': graphs[str(i)]['answer'], 'elapsed': elapsed,
+                         'nodes': len(graphs[str(i)]['graph']),
+                         'kb_calls': launcher.infer.budget.kb_calls_used,
+                         'exhausted': launcher.budget_exhausted,
+                         'propagated': launcher.infer.propagated_alists})
+    return sessions
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100 * len(values)))]
+
+
+def check(budget, sessions, delay):
+    for s in sessions:
+        answer = s['answer']
+        if budget.get('kb_calls') is not None:
+            assert s['kb_calls'] <= budget['kb_calls'], (budget, s['kb_calls'])
+        if budget.get('wall_time') is not None:
+            assert s['elapsed'] <= budget['wall_time'] + 2 * delay + 0.1, (budget, s['elapsed'])
+        if s['exhausted']:
+            assert s['exhausted'] in budget
+        if answer and s['exhausted']:
+            assert answer['budget_exhausted'] == s['exhausted']
+            assert answer['alist'] == s['propagated'][-1].attributes and answer['error_bar']
+
+
+def main(countries, years, delay):
+    server = start_server(delay)
+    batch = queries(countries, years)
+    budgets = [{}, {'kb_calls': 20}, {'kb_calls': 60}, {'nodes': 50}, {'nodes': 150},
+               {'wall_time': 0.25}, {'wall_time': 1}, {'depth': 1}, {'depth': 3},
+               {'kb_calls': None, 'nodes': None, 'wall_time': None, 'depth': None}]
+    print(f"{len(batch)} sessions, {delay * 1000:.0f} ms per request")
+    print(f"{'budget':<26}{'answered':>10}{'exhausted':>11}{'kb calls':>10}{'nodes':>8}"
+          f"{'p50 (s)':>9}{'p95 (s)':>9}{'max (s)':>9}")
+    results = {}
+    try:
+        for budget in budgets:
+            label = ', '.join(f'{k}={v}' for k, v in budget.items() if v is not None) or \
+                ('unlimited' if budget else 'none')
+            sessions = results[label] = run(batch, budget)
+            elapsed = [s['elapsed'] for s in sessions]
+            answered = sum(1 for s in sessions if s['answer'])
+            exhausted = sum(1 for s in sessions if s['exhausted'])
+            print(f"{label:<26}{f'{answered}/{len(batch)}':>10}{exhausted:>11}"
+                  f"{max(s['kb_calls'] for s in sessions):>10}{max(s['nodes'] for s in sessions):>8}"
+                  f"{percentile(elapsed, 50):>9.2f}{percentile(elapsed, 95):>9.2f}{max(elapsed):>9.2f}")
+            check(budget, sessions, delay)
+    finally:
+        server.shutdown()
+
+    def answers(label):
+        return [s['answer'] and s['answer']['answer'] for s in results[label]]
+    assert answers('unlimited') == answers('none')
+    print("check: limits respected, latest intermediate answers with error bars, "
+          "unlimited budget gives the same answers")
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument("-c", "--countries", nargs='+', default=['France', 'Ghana', 'Kenya'],
+                           help="countries of the population queries")
+    argparser.add_argument("-y", "--years", type=int, nargs='+', default=[2010, 2026, 2032],
+                           help="years of the population queries")
+    argparser.add_argument("-d", "--delay", type=float, default=0.02,
+                           help="delay of each request to the mock server (s)")
+    args = argparser.parse_args()
+    main(args.countries, args.years, args.delay)
@@ -0,0 +1,128 @@
+'''
+File: compaction.py
+Description: Graph size and memory of a long inference session with and
+             without InferenceGraph.compact.
+
+The session decomposes a query into `lookups` time points and resolves
+them one after the other, each by a lookup that returns `facts` facts (as
+search_kb does), then reduces the lookup as the aggregation does. With
+compaction, compact is called after every lookup, as the launcher does
+between scheduling steps. The check verifies that every summary node keeps
+the fact count, value and data sources of its lookup and, with --spill,
+that the spilled nodes load back.
+
+Run from the repository root:
+
+    python -m benchmarks.compaction
+
+'''
+
+import argparse
+import tempfile
+import time
+import tracemalloc
+
+from graph.alist import Alist
+from graph.alist import Attributes as tt
+from graph.alist import NodeTypes as nt
+from graph.alist import States as st
+from graph.inference_graph import InferenceGraph
+
+
+def lookup(G, alist, facts):
+    ''' resolve a time point with a lookup returning `facts` facts and reduce it '''
+    alist.state = st.EXPLORED
+    G.add_alist(alist)
+    map_op = alist.copy()
+    map_op.set(tt.OP, 'lookup')
+    map_op.node_type = nt.HNODE
+    reduce_op = alist.copy()
+    reduce_op.set(tt.OP, 'list')
+    reduce_op.node_type = nt.HNODE
+    fact_nodes = []
+    for i in range(facts):
+        ff = alist.copy()
+        ff.set(tt.OPVALUE, 1000 + i)
+        ff.data_sources = ['worldbank']
+        ff.state = st.REDUCED
+        ff.node_type = nt.FACT
+        fact_nodes.append(ff)
+    G.subdivide(alist.id, alist.id + '_', map_op, [reduce_op], fact_nodes,
+                successor_same_states=True, successor_no_reduce=True)
+    # aggregation of the lookup and of its complement
+    reduce_node = G.alist(reduce_op.id)
+    reduce_node.set(tt.OPVALUE, 1000)
+    reduce_node.data_sources = ['worldbank']
+    reduce_node.state = st.REDUCED
+    G.add_alist(reduce_node)
+    complement = G.alist(alist.id + '_')
+    complement.state = st.REDUCED
+    G.add_alist(complement)
+    return map_op.id
+
+
+def session(lookups, facts, compact, spill_dir):
+    tracemalloc.start()
+    t = time.perf_counter()
+    G = InferenceGraph(live_alists=True)
+    root = Alist(**{tt.OP: 'value', tt.OPVAR: '?x', tt.SUBJECT: 'France',
+                    tt.PROPERTY: 'population', tt.OBJECT: '?x', tt.TIME: '2030'})
+    G.add_alist(root, create_complement=True)
+    map_op = root.copy()
+    map_op.set(tt.OP, 'regress')
+    reduce_op = root.copy()
+    reduce_op.set(tt.OP, 'regress')
+    successors = []
+    for i in range(lookups):
+        succ = root.copy()
+        succ.set(tt.TIME, str(1960 + i))
+        successors.append(succ)
+    G.subdivide('0', '0_', map_op, [reduce_op], successors)
+
+    max_nodes = 0
+    lookup_ids = []
+    for succ in successors:
+        lookup_ids.append(lookup(G, G.alist(succ.id), facts))
+        if compact:
+            G.compact(spill_dir=spill_dir)
+        max_nodes = max(max_nodes, len(G))
+    elapsed = time.perf_counter() - t
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return G, lookup_ids, max_nodes, elapsed, current, peak
+
+
+def check(G, lookup_ids, facts, spill_dir):
+    for map_id in lookup_ids:
+        summary = G.alist(map_id)
+        assert summary.node_type == nt.SUMMARY and summary.state == st.REDUCED
+        assert summary.attributes['meta']['fact_count'] == facts
+        assert summary.get(tt.OPVALUE) == 1000 and summary.data_sources == ['worldbank']
+        if spill_dir is not None:
+            spilled = G.spilled_graph(map_id)
+            assert sum(1 for _, t in spilled.nodes(data='meta') if t['node_type'] == nt.FACT) == facts
+    print(f"check: {len(lookup_ids)} summary nodes keep their fact count, value and data sources")
+
+
+def main(lookups, facts, spill):
+    spill_dir = tempfile.mkdtemp(prefix='frank_spill_') if spill else None
+    print(f"{'compaction':<12}{'final nodes':>13}{'max nodes':>11}{'time (s)':>10}"
+          f"{'final (MB)':>12}{'peak (MB)':>11}")
+    for compact in (False, True):
+        G, lookup_ids, max_nodes, elapsed, current, peak = session(lookups, facts, compact, spill_dir)
+        print(f"{'on' if compact else 'off':<12}{len(G):>13}{max_nodes:>11}{elapsed:>10.2f}"
+              f"{current / 2**20:>12.1f}{peak / 2**20:>11.1f}")
+        if compact:
+            check(G, lookup_ids, facts, spill_dir)
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument("-l", "--lookups", type=int, default=50,
+                           help="number of time points resolved by a lookup")
+    argparser.add_argument("-f", "--facts", type=int, default=2000,
+                           help="number of facts returned by each lookup")
+    argparser.add_argument("--spill", action="store_true",
+                           help="spill the compacted nodes to a temporary directory")
+    args = argparser.parse_args()
+    main(args.lookups, args.facts, args.spill)
@@ -0,0 +1,135 @@
+'''
+File: fact_table.py
+Description: Graph size, build time and memory of a lookup whose facts are
+             stored one node per fact and in one fact-table node
+             (graph/fact_table.py).
+
+The lookup is built as search_kb does: a map node, `facts` fact nodes (or
+the fact-table node made from them) and a reduce node. The check verifies
+that the rows of the table are the original facts and that the list,
+count, max, min and value reduce operations give the same result, and
+change their children in the same way, on the table as on the fact nodes
+(also with a chain of variables that the facts instantiate).
+
+Run from the repository root:
+
+    python -m benchmarks.fact_table
+
+'''
+
+import argparse
+import time
+import tracemalloc
+
+from frank.reduce import count, list as list_op, max as max_op, min as min_op, value
+from graph import fact_table
+from graph.alist import Alist
+from graph.alist import Attributes as tt
+from graph.alist import NodeTypes as nt
+from graph.alist import States as st
+from graph.inference_graph import InferenceGraph
+
+
+def query(chained=False):
+    ''' a lookup query; with chained=True, it has a variable ?w that every fact
+        instantiates to the same value, and that another variable of the facts references '''
+    alist = Alist(**{tt.OP: 'value', tt.OPVAR: '$x', tt.SUBJECT: '?y', '?y': '',
+                     tt.PROPERTY: 'population', tt.OBJECT: '$x', tt.TIME: '2010'})
+    if chained:
+        alist.set('?w', '')
+    return alist
+
+
+def fact_nodes(alist, facts):
+    ''' facts of a lookup, as built by search_kb '''
+    nodes = []
+    for i in range(facts):
+        # a fact from the knowledge base and the attributes search_kb sets on it
+        ff = alist.copy()
+        ff.set(tt.SUBJECT, f'country{i}')
+        ff.set('?y', ff.get(tt.SUBJECT))
+        ff.set(tt.OBJECT, str(1000 + (i * 7919) % facts))
+        if '?w' in ff.attributes:
+            ff.set('?w', '2010')
+            ff.set('?v', '?w')
+        ff.data_sources = ['wikidata' if i % 2 else 'worldbank']
+        ff.set(tt.OPVAR, alist.get(tt.OPVAR))
+        ff.set(ff.get(tt.OPVAR), ff.get(tt.OBJECT))
+        ff.set(tt.OPVALUE, ff.get(tt.OBJECT))
+        ff.set(tt.COV, 0.1 if i % 2 else 0.2)
+        ff.set(tt.EXPLAIN, '')
+        ff.state = st.REDUCED
+        ff.node_type = nt.FACT
+        ff.check_variables()
+        nodes.append(ff)
+    return nodes
+
+
+def lookup(facts, table):
+    tracemalloc.start()
+    alist = query()
+    nodes = fact_nodes(alist, facts)
+    # time the graph construction only; the memory includes the fact alists
+    t = time.perf_counter()
+    G = InferenceGraph(live_alists=True)
+    G.add_alist(alist, create_complement=True)
+    if table:
+        nodes = [fact_table.make_fact_table(nodes)]
+    map_op = alist.copy()
+    map_op.set(tt.OP, 'lookup')
+    map_op.node_type = nt.HNODE
+    reduce_op = alist.copy()
+    reduce_op.set(tt.OP, 'list')
+    reduce_op.node_type = nt.HNODE
+    G.subdivide(alist.id, alist.id + '_', map_op, [reduce_op], nodes,
+                successor_same_states=True, successor_no_reduce=True)
+    elapsed = time.perf_counter() - t
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return G, elapsed, current
+
+
+def reduce_result(op, name, children, chained):
+    node = query(chained)
+    node.set(tt.OP, name)
+    result = op.reduce(node, children, None)
+    return (result.instantiation_value(tt.OPVAR), result.get(tt.COV),
+            result.instantiation_value('?y'))
+
+
+def check(facts):
+    alist = query()
+    nodes = fact_nodes(alist, facts)
+    table = fact_table.make_fact_table(nodes)
+    assert table is not None and fact_table.row_count([table]) == facts
+    for row, fact in zip(fact_table.rows(table), nodes):
+        assert row.attributes == fact.attributes
+    for name, op in (('list', list_op), ('count', count), ('max', max_op),
+                     ('min', min_op), ('value', value)):
+        for chained in (False, True):
+            table = fact_table.make_fact_table(fact_nodes(query(chained), facts))
+            rows = fact_table.expand([table])
+            expanded = reduce_result(op, name, rows, chained)
+            tabled = reduce_result(op, name, [table], chained)
+            assert expanded == tabled, (name, chained, expanded, tabled)
+            # the reduce operations change their children in the same way
+            assert [r.attributes for r in fact_table.rows(table)] == [r.attributes for r in rows], (name, chained)
+    print(f"check: rows and list, count, max, min and value results and children match for {facts} facts")
+
+
+def main(sizes):
+    print(f"{'facts':>8}{'layout':>8}{'nodes':>8}{'edges':>8}{'time (s)':>10}{'memory (MB)':>13}")
+    for facts in sizes:
+        for table in (False, True):
+            G, elapsed, current = lookup(facts, table)
+            print(f"{facts:>8}{'table' if table else 'nodes':>8}{G.number_of_nodes():>8}"
+                  f"{G.number_of_edges():>8}{elapsed:>10.3f}{current / 2**20:>13.2f}")
+        check(facts)
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument("-n", "--facts", type=int, nargs='+', default=[100, 1000, 10000],
+                           help="number of facts returned by the lookup")
+    args = argparser.parse_args()
+    main(args.facts)
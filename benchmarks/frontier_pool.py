@@ -0,0 +1,84 @@
+'''
+File: frontier_pool.py
+Description: Latency of Launcher sessions with the unexplored frontier
+             nodes resolved one at a time and config['thread_pool'] at a
+             time (Infer.run_frank_batch), against the local mock HTTP
+             server of the knowledge bases of benchmarks/async_engine.py.
+
+Queries for years after 2022 are answered by temporal decomposition and
+regression, so their frontier is wide. The check verifies that every pool
+size gives the same answers and the same inference graph, and that two
+runs with the same pool size build the same graph.
+
+Run from the repository root:
+
+    python -m benchmarks.frontier_pool
+
+'''
+
+import argparse
+import contextlib
+import io
+import time
+
+from benchmarks.async_engine import answers, queries, start_server
+from frank import config
+from frank.launcher import Launcher
+from graph.alist import Alist
+
+
+def graph_summary(G):
+    ''' the nodes of an inference graph with their alists, and its edges '''
+    return (sorted((n, str(G.alist(n))) for n in G.nodes()), sorted(G.edges()))
+
+
+def run(batch, pool):
+    config.config['thread_pool'] = pool
+    graphs = {}
+    t = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i, query in enumerate(batch):
+            Launcher().start('', Alist(**query), str(i), graphs)
+    elapsed = time.perf_counter() - t
+    return answers(graphs), {i: graph_summary(g['graph']) for i, g in graphs.items()}, elapsed
+
+
+def main(countries, years, delay, pools):
+    server = start_server(delay)
+    batch = queries(countries, years)
+    saved = config.config['thread_pool']
+    print(f"{len(batch)} sessions, {delay * 1000:.0f} ms per request")
+    print(f"{'thread_pool':>12}{'time (s)':>10}{'requests':>10}{'max in flight':>15}")
+    results = {}
+    try:
+        for pool in pools:
+            server.max_in_flight = server.requests = 0
+            results[pool] = run(batch, pool)
+            print(f"{pool:>12}{results[pool][2]:>10.2f}{server.requests:>10}{server.max_in_flight:>15}")
+        repeat = run(batch, pools[-1])
+    finally:
+        config.config['thread_pool'] = saved
+        server.shutdown()
+
+    expected_answers, expected_graphs, _ = results[pools[0]]
+    assert all(a is not None for a in expected_answers.values()), expected_answers
+    for pool, (found_answers, found_graphs, _) in results.items():
+        assert found_answers == expected_answers, (pool, found_answers, expected_answers)
+        assert found_graphs == expected_graphs, pool
+    assert repeat[:2] == results[pools[-1]][:2]
+    print(f"check: same answers and inference graphs with thread_pool {', '.join(map(str, pools))}, "
+          f"same graphs when repeated")
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument("-c", "--countries", nargs='+', default=['France', 'Ghana'],
+                           help="countries of the population queries")
+    argparser.add_argument("-y", "--years", type=int, nargs='+', default=[2024],
+                           help="years of the population queries")
+    argparser.add_argument("-d", "--delay", type=float, default=0.05,
+                           help="delay of each request to the mock server (s)")
+    argparser.add_argument("-p", "--pools", type=int, nargs='+', default=[1, 4, 16],
+                           help="values of config['thread_pool'] to compare")
+    args = argparser.parse_args()
+    main(args.countries, args.years, args.delay, args.pools)
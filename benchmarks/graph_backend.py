@@ -0,0 +1,202 @@
+'''
+File: graph_backend.py
+Description: Parity checks and scaling comparison of the networkx and the
+             array-backed inference graph (graph/array_graph.py).
+
+The parity checks apply the same random sequence of graph operations
+(add, link, subdivide, state and cost changes, remove_link, prune, codec
+round trip) to an InferenceGraph and an ArrayInferenceGraph and assert
+that both give the same nodes, edges, neighbours, complements and
+frontiers after every operation. The scaling comparison builds temporal
+decomposition graphs of growing size with both backends and reports
+the build time of the inference graph, the memory and build time of the
+bare topology, the time to remove and add back every edge (churn), and
+traversal, frontier and prune times. Use --depth 6 for graphs of about
+150,000 nodes.
+
+Run from the repository root:
+
+    python -m benchmarks.graph_backend
+
+'''
+
+import argparse
+import random
+import time
+import tracemalloc
+
+import networkx as nx
+
+from benchmarks.prune import temporal_graph
+from graph import codec
+from graph.alist import Alist
+from graph.alist import Attributes as tt
+from graph.alist import States as st
+from graph.array_graph import ArrayDiGraph
+from graph.inference_graph import ArrayInferenceGraph
+from graph.inference_graph import InferenceGraph
+
+STATES = [st.UNEXPLORED, st.EXPLORING, st.EXPLORED, st.REDUCIBLE, st.REDUCED]
+
+
+def snapshot(G):
+    ''' everything the inference engine reads from the graph topology '''
+    nodes = list(G.nodes(data=True))
+    return {
+        'nodes': nodes,
+        'edges': [(u, v, dict(d)) for u, v, d in G.edges(data=True)],
+        'n_edges': G.number_of_edges(),
+        'succ': {n: list(G.successors(n)) for n, _ in nodes},
+        'pred': {n: list(G.predecessors(n)) for n, _ in nodes},
+        'children': {n: G.child_ids(n) for n, _ in nodes},
+        'parents': {n: G.parent_ids(n) for n, _ in nodes},
+        'complements': {n: G.find_complement(n) for n, _ in nodes},
+        'leaves': G.leaf_nodes(),
+        'frontier': [[a.id for a in f] for f in G.frontier(state=None)],
+        'heads': [getattr(G.frontier_head(s), 'id', None) for s in STATES],
+    }
+
+
+def random_alist(rng):
+    alist = Alist(**{tt.OP: rng.choice(['value', 'sum', 'regress']), tt.OPVAR: '?x',
+                     tt.SUBJECT: rng.choice(['France', 'Ghana', 'Chile']),
+                     tt.PROPERTY: 'population', tt.OBJECT: '?x',
+                     tt.TIME: str(rng.randint(1990, 2030))})
+    alist.cost = rng.choice([0.5, 1.0, 2.0])
+    return alist
+
+
+def random_step(rng, graphs):
+    ''' apply one random operation to all graphs '''
+    ids = list(graphs[0].nodes())
+    op = rng.choice(['link', 'link', 'subdivide', 'state', 'cost', 'remove_link', 'prune'])
+    if op == 'link':
+        parent = rng.choice(ids)
+        child = random_alist(rng)
+        flags = {'frontier': rng.random() < 0.5, 'hidden': rng.random() < 0.3,
+                 'complement': rng.random() < 0.2, 'edge_label': rng.choice(['', 'lookup'])}
+        for G in graphs:
+            G.link(G.alist(parent), child.copy(), **flags)
+    elif op == 'subdivide':
+        map_ids = [n for n in ids if n[-1] != '_' and n + '_' in graphs[0]]
+        if not map_ids:
+            return
+        source = rng.choice(map_ids)
+        map_op = random_alist(rng)
+        reduce_ops = [random_alist(rng) for _ in range(rng.randint(1, 2))]
+        successors = [random_alist(rng) for _ in range(rng.randint(1, 4))]
+        for G in graphs:
+            G.subdivide(source, source + '_', map_op.copy(), [r.copy() for r in reduce_ops],
+                        [s.copy() for s in successors])
+    elif op in ('state', 'cost'):
+        node_id = rng.choice(ids)
+        value = rng.choice(STATES) if op == 'state' else rng.choice([0.1, 1.0, 3.0])
+        for G in graphs:
+            alist = G.alist(node_id)
+            setattr(alist, op, value)
+            G.add_alist(alist)
+    elif op == 'remove_link':
+        edges = list(graphs[0].edges())
+        if edges:
+            u, v = rng.choice(edges)
+            for G in graphs:
+                G.remove_link(u, v)
+    elif op == 'prune':
+        # prune needs the map node of a reduce node id to exist
+        candidates = [n for n in ids if n not in ('0', '0_') and graphs[0].find_complement(n)
+                      and (n[:-1] if n[-1] == '_' else n) in graphs[0]]
+        if candidates:
+            node_id = rng.choice(candidates)
+            for G in graphs:
+                G.prune(node_id)
+
+
+def check_parity(seeds, steps):
+    for seed in range(seeds):
+        rng = random.Random(seed)
+        root = random_alist(rng)
+        graphs = [InferenceGraph(), ArrayInferenceGraph(), ArrayInferenceGraph(live_alists=True)]
+        for G in graphs:
+            G.add_alist(root.copy(), create_complement=True)
+        for step in range(steps):
+            random_step(rng, graphs)
+            expected = snapshot(graphs[0])
+            for G in graphs[1:]:
+                assert snapshot(G) == expected, f"seed {seed} step {step}: {type(G).__name__} differs"
+        # codec round trip into the array backend and export back to networkx
+        decoded = codec.decode_graph(codec.encode_graph(graphs[1]), ArrayInferenceGraph())
+        assert snapshot(decoded) == snapshot(graphs[0])
+        exported = graphs[1].to_networkx()
+        assert nx.utils.graphs_equal(exported, nx.DiGraph(graphs[0]))
+    print(f"parity: {seeds} random graphs x {steps} operations, networkx and array backends agree")
+
+
+def build_topology(graph_class, edges):
+    G = graph_class()
+    for u, v, attrs in edges:
+        G.add_edge(u, v, **attrs)
+    return G
+
+
+def topology_bytes(graph_class, edges):
+    ''' memory allocated for the topology alone (node ids, adjacency, edge attributes) '''
+    tracemalloc.start()
+    G = build_topology(graph_class, edges)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size
+
+
+def edge_churn(G, edges):
+    ''' look up, remove and add back every edge of a topology '''
+    for u, v, attrs in edges:
+        if G.has_edge(u, v):
+            G.remove_edge(u, v)
+            G.add_edge(u, v, **attrs)
+
+
+def timed(fn):
+    t = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - t
+
+
+def scaling(fanout, max_depth, reducers):
+    print(f"{'backend':<10}{'nodes':>9}{'edges':>9}{'build (s)':>11}{'topo (MB)':>11}{'topo (s)':>10}"
+          f"{'churn (s)':>11}{'traverse (s)':>14}{'frontier (s)':>14}{'prune (s)':>11}")
+    for depth in range(1, max_depth + 1):
+        for name, graph_class, bare_class in (('networkx', InferenceGraph, nx.DiGraph),
+                                              ('array', ArrayInferenceGraph, ArrayDiGraph)):
+            G, build = timed(lambda: temporal_graph(fanout, depth, reducers, graph_class))
+            n_nodes = G.number_of_nodes()
+            edges = [(u, v, dict(d)) for u, v, d in G.edges(data=True)]
+            topo = topology_bytes(bare_class, edges)
+            bare, topo_build = timed(lambda: build_topology(bare_class, edges))
+            _, churn = timed(lambda: edge_churn(bare, edges))
+            _, traverse = timed(lambda: [(G.child_ids(n), G.parent_ids(n)) for n in G.nodes()])
+            _, frontier = timed(lambda: [G.frontier_head(s) for s in STATES for _ in range(100)])
+            target = G.child_ids(G.child_ids('0')[0])[0]
+            _, prune = timed(lambda: G.prune(target))
+            print(f"{name:<10}{n_nodes:>9}{len(edges):>9}{build:>11.3f}{topo / 2**20:>11.2f}"
+                  f"{topo_build:>10.3f}{churn:>11.3f}{traverse:>14.3f}{frontier:>14.4f}{prune:>11.4f}")
+
+
+def main(seeds, steps, fanout, max_depth, reducers):
+    check_parity(seeds, steps)
+    scaling(fanout, max_depth, reducers)
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument("-s", "--seeds", type=int, default=20,
+                           help="number of random graphs for the parity checks")
+    argparser.add_argument("-n", "--steps", type=int, default=60,
+                           help="number of random operations per parity graph")
+    argparser.add_argument("-f", "--fanout", type=int, default=6,
+                           help="number of time points per decomposition")
+    argparser.add_argument("-d", "--depth", type=int, default=5,
+                           help="maximum nesting depth of the decompositions")
+    argparser.add_argument("-r", "--reducers", type=int, default=3,
+                           help="number of reduce nodes per decomposition")
+    args = argparser.parse_args()
+    main(args.seeds, args.steps, args.fanout, args.depth, args.reducers)
@@ -0,0 +1,122 @@
+'''
+File: kb_search.py
+Description: Latency of Infer.search_kb with the knowledge bases searched
+             one after the other (one worker) and concurrently.
+
+The knowledge bases are replaced by simulated ones that answer
+search_properties and find_property_values after a fixed delay, so only
+the scheduling of the searches is measured. The check verifies that the
+concurrent search finds the same facts in the same order as the
+sequential one, that a source past its deadline is dropped, and that a
+high trust context does not dispatch a search to wikidata.
+
+Run from the repository root:
+
+    python -m benchmarks.kb_search
+
+'''
+
+import argparse
+import contextlib
+import io
+import time
+
+import frank.infer
+from frank import config
+from frank.infer import Infer
+from graph.alist import Alist
+from graph.alist import Attributes as tt
+from graph.inference_graph import InferenceGraph
+
+
+class SimulatedKB:
+    ''' knowledge base answering after `delay` seconds with `facts` facts '''
+
+    def __init__(self, name, delay, facts):
+        self.name = name
+        self.delay = delay
+        self.facts = facts
+        self.calls = 0
+
+    def search_properties(self, prop_string):
+        self.calls += 1
+        time.sleep(self.delay)
+        return [(f'{self.name}:{prop_string}', prop_string, 1.0)]
+
+    def find_property_values(self, alist, search_attr):
+        self.calls += 1
+        time.sleep(self.delay)
+        facts = []
+        for i in range(self.facts):
+            fact = alist.copy()
+            fact.set(search_attr, str(1000 + i))
+            fact.data_sources = [self.name]
+            facts.append(fact)
+        return facts
+
+
+def search(delays, workers, timeout=None, trust=None, facts=3):
+    kbs = {name: SimulatedKB(name, delay, facts) for name, delay in delays.items()}
+    for name, kb in kbs.items():
+        setattr(frank.infer, name, kb)
+    config.config['kb_search_workers'] = workers
+    config.config['kb_search_timeout'] = {name: timeout for name in kbs}
+    alist = Alist(**{tt.OP: 'value', tt.OPVAR: '?x', tt.SUBJECT: 'France',
+                     tt.PROPERTY: 'population', tt.OBJECT: '?x', tt.TIME: '2010'})
+    if trust:
+        alist.set(tt.CONTEXT, [{}, {}, {'trust': trust}])
+    G = InferenceGraph()
+    infer = Infer(G)
+    G.add_alist(alist, create_complement=True)
+    t = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        infer.search_kb(G.alist(alist.id))
+    elapsed = time.perf_counter() - t
+    found = [(G.alist(n).data_sources[-1], G.alist(n).get(tt.OBJECT))
+             for n in G.nodes() if G.alist(n).node_type in ('fact', 'fact_table')]
+    return elapsed, found, kbs
+
+
+def check(delays):
+    _, sequential, _ = search(delays, 1)
+    _, concurrent, _ = search(delays, len(delays))
+    assert concurrent == sequential, (concurrent, sequential)
+    # each source makes two requests (search_properties and find_property_values):
+    # the deadline falls between the answers of the two slowest sources
+    slowest = max(delays, key=delays.get)
+    deadline = sorted(delays.values())[-2] + delays[slowest]
+    elapsed, found, _ = search(delays, len(delays), timeout=deadline)
+    assert all(source != slowest for source, _ in found), found
+    assert elapsed < delays[slowest] * 2
+    _, found, kbs = search(delays, len(delays), trust='high')
+    assert kbs['wikidata'].calls == 0 and all(source != 'wikidata' for source, _ in found)
+    print(f"check: same facts in the same order, {slowest} dropped after {deadline:.2f} s, "
+          f"wikidata not searched with high trust")
+
+
+def main(delays):
+    saved = {k: config.config[k] for k in ('kb_search_workers', 'kb_search_timeout')}
+    saved_kbs = {name: getattr(frank.infer, name) for name in delays}
+    try:
+        print(f"{'workers':>8}{'time (s)':>10}{'facts':>7}")
+        for workers in (1, len(delays)):
+            elapsed, found, _ = search(delays, workers)
+            print(f"{workers:>8}{elapsed:>10.3f}{len(found):>7}")
+        check(delays)
+    finally:
+        config.config.update(saved)
+        for name, kb in saved_kbs.items():
+            setattr(frank.infer, name, kb)
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument("--wikidata", type=float, default=0.3,
+                           help="delay of each wikidata request (s)")
+    argparser.add_argument("--worldbank", type=float, default=0.1,
+                           help="delay of each worldbank request (s)")
+    argparser.add_argument("--musicbrainz", type=float, default=0.2,
+                           help="delay of each musicbrainz request (s)")
+    args = argparser.parse_args()
+    main({'wikidata': args.wikidata, 'worldbank': args.worldbank,
+          'musicbrainz': args.musicbrainz})
@@ -0,0 +1,100 @@
+'''
+File: plot_render.py
+Description: Time to build the inference graph figure with the svg renderer
+             (recursive hierarchy_layout, one Scatter trace per edge) and the
+             webgl renderer (iterative layered_layout, Scattergl, collapsed facts).
+
+The graphs are temporal decompositions whose leaves are looked up, each
+lookup returning `facts` fact nodes, as search_kb does. Figures are built
+with show=False, so only layout and trace construction are timed. The svg
+renderer is skipped above --svg-limit nodes.
+
+Run from the repository root:
+
+    python -m benchmarks.plot_render
+
+'''
+
+import argparse
+import time
+
+from benchmarks.prune import temporal_graph
+from graph.alist import Attributes as tt
+from graph.alist import NodeTypes as nt
+from graph.alist import States as st
+
+
+def lookup_graph(fanout, depth, facts):
+    ''' temporal decomposition graph with `facts` fact nodes under each leaf lookup '''
+    G = temporal_graph(fanout, depth, 1)
+    # the deepest time points: nodes with a complement and no decomposition below them
+    leaves = [n for n in G.nodes() if n[-1] != '_' and n + '_' in G
+              and all(c[-1] == '_' for c in G.successors(n))]
+    for leaf in leaves:
+        alist = G.alist(leaf)
+        map_op = alist.copy()
+        map_op.set(tt.OP, 'value')
+        map_op.node_type = nt.HNODE
+        reduce_op = alist.copy()
+        reduce_op.set(tt.OP, 'value')
+        reduce_op.node_type = nt.HNODE
+        fact_nodes = []
+        for i in range(facts):
+            ff = alist.copy()
+            ff.set(tt.OPVALUE, str(1000 + i))
+            ff.state = st.REDUCED
+            ff.node_type = nt.FACT
+            fact_nodes.append(ff)
+        G.subdivide(leaf, leaf + '_', map_op, [reduce_op], fact_nodes)
+    return G
+
+
+def chain_graph(length):
+    ''' a single chain of decompositions, deeper than the recursion limit of hierarchy_layout '''
+    return temporal_graph(1, length, 1)
+
+
+def timed(G, renderer, fact_threshold):
+    t = time.perf_counter()
+    fig = G.plot_plotly(renderer=renderer, fact_threshold=fact_threshold, show=False)
+    return fig, time.perf_counter() - t
+
+
+def report(name, G, svg_limit, fact_threshold):
+    row = f"{name:<22}{len(G):>9}"
+    if len(G) <= svg_limit:
+        try:
+            _, svg = timed(G, 'svg', fact_threshold)
+            row += f"{svg:>11.3f}"
+        except RecursionError:
+            row += f"{'recursion':>11}"
+    else:
+        row += f"{'-':>11}"
+    fig, webgl = timed(G, 'webgl', fact_threshold)
+    row += f"{webgl:>11.3f}{len(fig.data[-1].x):>14}"
+    print(row)
+
+
+def main(fanout, max_depth, facts, chain, svg_limit, fact_threshold):
+    print(f"{'graph':<22}{'nodes':>9}{'svg (s)':>11}{'webgl (s)':>11}{'webgl points':>14}")
+    for depth in range(1, max_depth + 1):
+        report(f"lookups f={fanout} d={depth}", lookup_graph(fanout, depth, facts), svg_limit, fact_threshold)
+    report(f"chain n={chain}", chain_graph(chain), svg_limit, fact_threshold)
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument("-f", "--fanout", type=int, default=5,
+                           help="number of time points per decomposition")
+    argparser.add_argument("-d", "--depth", type=int, default=4,
+                           help="maximum nesting depth of the decompositions")
+    argparser.add_argument("-n", "--facts", type=int, default=80,
+                           help="number of facts returned by each lookup")
+    argparser.add_argument("-c", "--chain", type=int, default=1000,
+                           help="number of nested decompositions in the chain graph")
+    argparser.add_argument("--svg-limit", type=int, default=5000,
+                           help="largest graph drawn with the svg renderer")
+    argparser.add_argument("-t", "--fact-threshold", type=int, default=50,
+                           help="facts per lookup above which the webgl renderer collapses them")
+    args = argparser.parse_args()
+    main(args.fanout, args.depth, args.facts, args.chain, args.svg_limit, args.fact_threshold)
@@ -0,0 +1,105 @@
+'''
+File: prune.py
+Description: Compare InferenceGraph.prune with the previous path enumeration
+             (nx.all_simple_paths) on graphs with wide, nested temporal fan-out.
+
+Run from the repository root:
+
+    python -m benchmarks.prune
+
+'''
+
+import argparse
+import time
+
+import networkx as nx
+
+from graph.alist import Alist
+from graph.alist import Attributes as tt
+from graph.inference_graph import InferenceGraph
+
+
+def temporal_graph(fanout, depth, reducers, graph_class=InferenceGraph):
+    '''
+    Inference graph where every node at each level is decomposed into
+    `fanout` time points, as the temporal decomposition does, with
+    `reducers` reduce nodes per decomposition. Every successor links to
+    every reduce node, so the number of paths grows by fanout * reducers
+    per level.
+    '''
+    G = graph_class()
+    root = Alist(**{tt.OP: 'value', tt.OPVAR: '?x', tt.SUBJECT: 'France',
+                    tt.PROPERTY: 'population', tt.OBJECT: '?x', tt.TIME: '2030'})
+    G.add_alist(root, create_complement=True)
+    level = [root]
+    for _ in range(depth):
+        next_level = []
+        for alist in level:
+            map_op = alist.copy()
+            map_op.set(tt.OP, 'regress')
+            reduce_ops = []
+            for _ in range(reducers):
+                reduce_op = alist.copy()
+                reduce_op.set(tt.OP, 'regress')
+                reduce_ops.append(reduce_op)
+            successors = []
+            for i in range(fanout):
+                succ = alist.copy()
+                succ.set(tt.TIME, str(2000 + i))
+                successors.append(succ)
+            G.subdivide(alist.id, alist.id + '_', map_op, reduce_ops, successors)
+            next_level.extend(successors)
+        level = next_level
+    return G
+
+
+def nodes_between_simple_paths(G, alist_id):
+    ''' node set removed by the previous prune implementation '''
+    source = alist_id if alist_id[-1] != '_' else alist_id[0:-1]
+    nodes_between_set = set()
+    for t in G.find_complement(alist_id):
+        paths_between_generator = nx.all_simple_paths(G, source, t)
+        nodes_between_set = nodes_between_set.union(
+            {node for path in paths_between_generator for node in path})
+    return nodes_between_set
+
+
+def main(fanout, max_depth, reducers, max_paths):
+    print(f"{'fanout':>8}{'depth':>7}{'nodes':>9}{'pruned':>9}{'paths (s)':>12}{'prune (s)':>12}")
+    for depth in range(1, max_depth + 1):
+        G = temporal_graph(fanout, depth, reducers)
+        # prune the first time point of the root decomposition with its subtree
+        target = G.child_ids(G.child_ids('0')[0])[0]
+        n_nodes = len(G)
+
+        t = time.perf_counter()
+        old_nodes = None
+        if max_paths <= 0 or (fanout * reducers) ** (depth - 1) <= max_paths:
+            old_nodes = nodes_between_simple_paths(G, target)
+            old_time = f"{time.perf_counter() - t:12.4f}"
+        else:
+            old_time = f"{'skipped':>12}"
+
+        new_nodes = G.nodes_between(target, G.find_complement(target)[0])
+        t = time.perf_counter()
+        G.prune(target)
+        new_time = time.perf_counter() - t
+
+        if old_nodes is not None:
+            assert old_nodes == new_nodes
+        assert not any(n in G for n in new_nodes)
+        print(f"{fanout:>8}{depth:>7}{n_nodes:>9}{len(new_nodes):>9}{old_time}{new_time:12.4f}")
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument("-f", "--fanout", type=int, default=6,
+                           help="number of time points per decomposition")
+    argparser.add_argument("-d", "--depth", type=int, default=5,
+                           help="maximum nesting depth of the decompositions")
+    argparser.add_argument("-r", "--reducers", type=int, default=3,
+                           help="number of reduce nodes per decomposition")
+    argparser.add_argument("-p", "--max-paths", type=int, default=1000000,
+                           help="skip path enumeration above this many paths (0: never skip)")
+    args = argparser.parse_args()
+    main(args.fanout, args.depth, args.reducers, args.max_paths)
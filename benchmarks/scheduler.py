@@ -0,0 +1,172 @@
+'''
+File: scheduler.py
+Description: Latency of Launcher sessions with the event-driven scheduling
+             loop of Launcher.schedule and with the previous scheduler,
+             which slept a fixed time and called itself again after every
+             pass that did not propagate an answer to the root.
+
+The sessions run against the local mock HTTP server of the knowledge bases
+of benchmarks/async_engine.py. The check verifies that both schedulers get
+the same answers, that the previous one recursed once per pass while the
+new one does not recurse, that a session waiting for a frontier node
+explored by another thread resumes as soon as that thread calls
+Launcher.notify, and that Launcher.notify from another thread is not
+blocked by the knowledge base requests of the session (the scheduler
+releases Launcher.work while it waits for them).
+
+Run from the repository root:
+
+    python -m benchmarks.scheduler
+
+'''
+
+import argparse
+import contextlib
+import io
+import threading
+import time
+
+from benchmarks.async_engine import answers, queries, start_server
+from frank.launcher import Launcher
+from graph.alist import Alist
+from graph.alist import States as states
+
+
+class SleepingLauncher(Launcher):
+    ''' Launcher with the previous sleep-and-recurse scheduler '''
+
+    sleep = 3
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.depth = self.max_depth = 0
+
+    def schedule(self, last_root_prop_depth):
+        self.depth += 1
+        self.max_depth = max(self.max_depth, self.depth)
+        if time.time() - self.infer.last_heartbeat > self.timeout:
+            self.cache_and_print_answer(True)
+        stop_flag = False
+        while True:
+            if self.update_session():
+                stop_flag = True
+                break
+            flag = False
+            reducible = self.infer.G.frontier_head(state=states.REDUCIBLE)
+            if reducible:
+                if self.infer.run_frank(reducible):
+                    self.cache_and_print_answer(False)
+                    flag = True
+            if not flag:
+                unexplored = self.infer.G.frontier_head(state=states.UNEXPLORED)
+                if unexplored:
+                    if self.infer.run_frank(unexplored):
+                        last_root_prop_depth = unexplored.depth
+                        self.cache_and_print_answer(False)
+                        flag = True
+            if not flag:
+                break
+        if stop_flag:
+            self.cache_and_print_answer(True)
+        else:
+            if time.time() - self.infer.last_heartbeat <= self.timeout:
+                time.sleep(self.sleep)
+            if self.infer.G.frontier_head():
+                self.schedule(last_root_prop_depth)
+            else:
+                self.cache_and_print_answer(True)
+        self.depth -= 1
+
+
+def run(launcher_class, batch):
+    graphs = {}
+    depth = 0
+    t = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i, query in enumerate(batch):
+            launcher = launcher_class()
+            launcher.start('', Alist(**query), str(i), graphs)
+            depth = max(depth, getattr(launcher, 'max_depth', 1))
+    return answers(graphs), depth, time.perf_counter() - t
+
+
+def wake_up(query, delay):
+    ''' Seconds between the notify of a thread exploring the root node and the end of the session '''
+    launcher = Launcher()
+    graphs = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        launcher._start_session('', Alist(**query), '0', graphs, 0, False)
+        root = launcher.infer.G.frontier_head()
+        root.state = states.EXPLORING
+        launcher.infer.G.add_alist(root)
+        notified = []
+
+        def explore():
+            time.sleep(delay)
+            with launcher.work:
+                launcher.infer.run_frank(root)
+                notified.append(time.perf_counter())
+                launcher.notify()
+
+        worker = threading.Thread(target=explore)
+        worker.start()
+        launcher.schedule()
+        end = time.perf_counter()
+        worker.join()
+    return answers(graphs)['0'], end - notified[0]
+
+
+def notify_blocking(query):
+    ''' Longest time that Launcher.notify from another thread waits for Launcher.work during a session '''
+    launcher = Launcher()
+    graphs = {}
+    blocked = 0.0
+    with contextlib.redirect_stdout(io.StringIO()):
+        session = threading.Thread(target=launcher.start, args=('', Alist(**query), '0', graphs))
+        session.start()
+        while session.is_alive():
+            t = time.perf_counter()
+            launcher.notify()
+            blocked = max(blocked, time.perf_counter() - t)
+            time.sleep(0.001)
+        session.join()
+    return answers(graphs)['0'], blocked
+
+
+def main(countries, years, delay, sleep):
+    server = start_server(delay)
+    batch = queries(countries, years)
+    SleepingLauncher.sleep = sleep
+    print(f"{len(batch)} sessions, {delay * 1000:.0f} ms per request")
+    print(f"{'scheduler':<28}{'time (s)':>10}{'recursion depth':>17}")
+    try:
+        previous, previous_depth, elapsed = run(SleepingLauncher, batch)
+        print(f"{f'sleep {sleep} s and recurse':<28}{elapsed:>10.2f}{previous_depth:>17}")
+        current, depth, elapsed = run(Launcher, batch)
+        print(f"{'event-driven':<28}{elapsed:>10.2f}{depth:>17}")
+        answer, latency = wake_up(batch[0], 0.5)
+        notified_answer, blocked = notify_blocking(batch[-1])
+    finally:
+        server.shutdown()
+
+    assert current == previous, (current, previous)
+    assert all(a is not None for a in current.values()), current
+    assert previous_depth > 1 and depth == 1
+    assert answer == current['0'] and latency < 0.5 + 10 * delay, (answer, latency)
+    assert notified_answer == current[str(len(batch) - 1)] and blocked < delay, (notified_answer, blocked)
+    print(f"check: same answers, no recursion, session resumed {latency:.2f} s after notify, "
+          f"notify blocked at most {blocked * 1000:.0f} ms")
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument("-c", "--countries", nargs='+', default=['France', 'Ghana'],
+                           help="countries of the population queries")
+    argparser.add_argument("-y", "--years", type=int, nargs='+', default=[2010, 2024],
+                           help="years of the population queries")
+    argparser.add_argument("-d", "--delay", type=float, default=0.05,
+                           help="delay of each request to the mock server (s)")
+    argparser.add_argument("-s", "--sleep", type=float, default=3,
+                           help="sleep of the previous scheduler after a pass (s)")
+    args = argparser.parse_args()
+    main(args.countries, args.years, args.delay, args.sleep)
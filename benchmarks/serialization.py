@@ -0,0 +1,117 @@
+'''
+File: serialization.py
+Description: Compare the binary codec with json and pickle for alists and
+             inference graphs (payload size, encode and decode time).
+
+The check verifies the round trips, including sets and numpy values as KB
+adapters return them (converted to plain Python values).
+
+Run from the repository root:
+
+    python -m benchmarks.serialization
+
+'''
+
+import argparse
+import json
+import pickle
+import timeit
+
+import networkx as nx
+import numpy as np
+
+from graph import codec
+from graph.alist import Alist
+from graph.alist import Attributes as tt
+from graph.alist import States as states
+from graph.alist import NodeTypes as nt
+from graph.inference_graph import InferenceGraph
+
+
+def fact_alist(i):
+    ''' a typical fact node returned from a KB lookup'''
+    alist = Alist(**{tt.OP: 'value', tt.OPVAR: '?x', tt.SUBJECT: 'France',
+                     tt.PROPERTY: 'population', tt.OBJECT: '?x', tt.TIME: str(1960 + i % 60),
+                     tt.CONTEXT: [{}, {}, {'place': 'Europe'}]})
+    alist.set('?x', str(60000000 + i))
+    alist.set(tt.OPVALUE, str(60000000 + i))
+    alist.set(tt.COV, 0.05)
+    alist.state = states.REDUCED
+    alist.node_type = nt.FACT
+    alist.data_sources = ['wikidata']
+    alist.check_variables()
+    return alist
+
+
+def inference_graph(n):
+    ''' a root node with `n` fact leaves '''
+    graph = InferenceGraph()
+    root = Alist(**{tt.OP: 'value', tt.OPVAR: '?x', tt.SUBJECT: 'France',
+                    tt.PROPERTY: 'population', tt.OBJECT: '?x', tt.TIME: '2010'})
+    graph.add_alist(root)
+    for i in range(n):
+        graph.link(root, fact_alist(i), edge_label='lookup')
+    return graph
+
+
+def graph_to_json(graph):
+    return json.dumps(nx.node_link_data(graph))
+
+
+def graph_from_json(data):
+    return nx.node_link_graph(json.loads(data), directed=True)
+
+
+def best_time(fn, repeat):
+    return min(timeit.Timer(fn).repeat(repeat=repeat, number=1))
+
+
+def run(name, obj, encoders, repeat):
+    for fmt, (encode, decode) in encoders.items():
+        data = encode(obj)
+        t_enc = best_time(lambda: encode(obj), repeat)
+        t_dec = best_time(lambda: decode(data), repeat)
+        print(f"{name:<8}{fmt:<8}{len(data):>12}{t_enc * 1e3:>14.3f}{t_dec * 1e3:>14.3f}")
+
+
+def main(n, repeat):
+    alists = [fact_alist(i) for i in range(n)]
+    attributes = [a.attributes for a in alists]
+    graph = inference_graph(n)
+
+    # round trips
+    assert codec.loads(codec.dumps(attributes)) == attributes
+    assert codec.decode_alist(codec.encode_alist(alists[0])).attributes == alists[0].attributes
+    decoded = codec.decode_graph(memoryview(codec.encode_graph(graph)))
+    assert dict(decoded.nodes(data=True)) == dict(graph.nodes(data=True))
+    assert list(decoded.edges(data=True)) == list(graph.edges(data=True))
+    kb_values = {'data_sources': {'wikidata'}, '?x': np.int64(67000000), tt.COV: np.float64(0.05),
+                 'series': np.arange(3), 'flags': [np.bool_(True)] * 10}
+    assert codec.loads(codec.dumps(kb_values)) == \
+        {'data_sources': {'wikidata'}, '?x': 67000000, tt.COV: 0.05, 'series': [0, 1, 2], 'flags': [True] * 10}
+
+    value_encoders = {
+        'codec': (codec.dumps, codec.loads),
+        'json': (lambda x: json.dumps(x).encode('utf-8'), json.loads),
+        'pickle': (pickle.dumps, pickle.loads),
+    }
+    graph_encoders = {
+        'codec': (codec.encode_graph, codec.decode_graph),
+        'json': (lambda x: graph_to_json(x).encode('utf-8'), graph_from_json),
+        'pickle': (pickle.dumps, pickle.loads),
+    }
+
+    print(f"{'object':<8}{'format':<8}{'bytes':>12}{'encode (ms)':>14}{'decode (ms)':>14}")
+    run('alist', attributes[0], value_encoders, repeat * 100)
+    run('alists', attributes, value_encoders, repeat)
+    run('graph', graph, graph_encoders, repeat)
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument("-n", "--nodes", type=int, default=5000,
+                           help="number of fact alists / graph nodes")
+    argparser.add_argument("-r", "--repeat", type=int, default=5,
+                           help="number of timing repetitions")
+    args = argparser.parse_args()
+    main(args.nodes, args.repeat)
@@ -0,0 +1,99 @@
+'''
+File: strategies.py
+Description: Latency, inference graph size and answer rate of the search
+             strategies of frank/strategy.py on the queries of eval.py.
+
+The queries are read from eval.py without running it. By default the
+sessions run against the local mock HTTP server of the knowledge bases of
+benchmarks/async_engine.py, which only has World Bank population data, so
+only the population queries can be answered; use --live to query the real
+knowledge bases. The check verifies that every strategy answers the
+queries that the default strategy answers within the same depth bound
+with the same answers, except beam, which may drop the nodes an answer
+needs.
+
+Run from the repository root:
+
+    python -m benchmarks.strategies
+
+'''
+
+import argparse
+import ast
+import contextlib
+import io
+import os
+import time
+
+from benchmarks.async_engine import start_server
+from frank import config
+from frank.launcher import Launcher
+from frank.strategy import STRATEGIES
+from graph.alist import Alist
+
+
+def eval_queries():
+    ''' the queries list of eval.py '''
+    path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'eval.py')
+    with open(path) as f:
+        tree = ast.parse(f.read())
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(getattr(t, 'id', None) == 'queries' for t in node.targets):
+            return ast.literal_eval(node.value)
+
+
+def run(strategy, batch, timeout):
+    results = []
+    for i, query in enumerate(batch):
+        graphs = {}
+        launcher = Launcher()
+        launcher.timeout = timeout
+        t = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            launcher.start('', Alist(**query), str(i), graphs, strategy=strategy)
+        elapsed = time.perf_counter() - t
+        answer = (graphs[str(i)].get('answer') or {}).get('answer')
+        results.append((answer, len(graphs[str(i)]['graph']), elapsed))
+    return results
+
+
+def main(strategies, delay, live, timeout):
+    server = None if live else start_server(delay)
+    batch = eval_queries()
+    print(f"{len(batch)} queries from eval.py, " +
+          ("live knowledge bases" if live else f"mock server, {delay * 1000:.0f} ms per request"))
+    print(f"{'strategy':<22}{'answered':>10}{'nodes':>8}{'time (s)':>10}{'slowest (s)':>13}")
+    results = {}
+    try:
+        for name in strategies:
+            results[name] = run(name, batch, timeout)
+            answered = sum(1 for answer, _, _ in results[name] if answer is not None)
+            print(f"{name:<22}{f'{answered}/{len(batch)}':>10}"
+                  f"{sum(n for _, n, _ in results[name]):>8}"
+                  f"{sum(t for _, _, t in results[name]):>10.2f}"
+                  f"{max(t for _, _, t in results[name]):>13.2f}")
+    finally:
+        if server:
+            server.shutdown()
+
+    if 'cost' in results:
+        for name, found in results.items():
+            if name == 'beam':
+                continue
+            for i, ((expected, _, _), (answer, _, _)) in enumerate(zip(results['cost'], found)):
+                assert expected is None or answer is not None, (name, i)
+        print("check: every strategy but beam answers the queries answered by cost")
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument("-s", "--strategies", nargs='+', default=list(STRATEGIES),
+                           help="search strategies to compare")
+    argparser.add_argument("-d", "--delay", type=float, default=0.05,
+                           help="delay of each request to the mock server (s)")
+    argparser.add_argument("--live", action="store_true",
+                           help="query the real knowledge bases instead of the mock server")
+    argparser.add_argument("-t", "--timeout", type=float, default=60,
+                           help="Launcher.timeout of each session (s)")
+    args = argparser.parse_args()
+    main(args.strategies, args.delay, args.live, args.timeout)
@@ -0,0 +1,100 @@
+'''
+File: ui_export.py
+Description: Compare polling the full ui_graph with polling export_delta
+             while an inference graph grows by temporal decompositions.
+
+Run from the repository root:
+
+    python -m benchmarks.ui_export
+
+'''
+
+import argparse
+import json
+import time
+
+from graph.alist import Alist
+from graph.alist import Attributes as tt
+from graph.alist import States as st
+from graph.inference_graph import InferenceGraph
+
+
+def apply_delta(replica, delta):
+    ''' update a client copy ({'nodes': {id: node}, 'edges': {(u, v): edge}}) with a delta '''
+    if delta['full']:
+        replica['nodes'].clear()
+        replica['edges'].clear()
+    for e in delta['removed_edges']:
+        replica['edges'].pop((e['source'], e['target']), None)
+    for n in delta['removed_nodes']:
+        replica['nodes'].pop(n, None)
+    for n in delta['nodes']:
+        replica['nodes'][n['id']] = n
+    for e in delta['edges']:
+        replica['edges'][(e['source'], e['target'])] = dict(e['edge'])
+
+
+def grow(G, alist, fanout):
+    ''' decompose a frontier node into `fanout` time points, as the temporal decomposition does '''
+    alist.state = st.EXPLORED
+    G.add_alist(alist)
+    map_op = alist.copy()
+    map_op.set(tt.OP, 'regress')
+    reduce_op = alist.copy()
+    reduce_op.set(tt.OP, 'regress')
+    successors = []
+    for i in range(fanout):
+        succ = alist.copy()
+        succ.set(tt.TIME, str(2000 + i))
+        successors.append(succ)
+    G.subdivide(alist.id, alist.id + '_', map_op, [reduce_op], successors)
+    return successors
+
+
+def main(fanout, steps, check):
+    G = InferenceGraph()
+    root = Alist(**{tt.OP: 'value', tt.OPVAR: '?x', tt.SUBJECT: 'France',
+                    tt.PROPERTY: 'population', tt.OBJECT: '?x', tt.TIME: '2030'})
+    G.add_alist(root, create_complement=True)
+    queue = [root]
+    replica = {'nodes': {}, 'edges': {}}
+    version = None
+    full_time = delta_time = 0.0
+    full_bytes = delta_bytes = 0
+    for step in range(steps):
+        queue.extend(grow(G, queue.pop(0), fanout))
+
+        t = time.perf_counter()
+        full = json.dumps(G.ui_graph())
+        full_time += time.perf_counter() - t
+        full_bytes += len(full)
+
+        t = time.perf_counter()
+        delta = G.export_delta(version)
+        data = json.dumps(delta)
+        delta_time += time.perf_counter() - t
+        delta_bytes += len(data)
+        version = delta['version']
+
+        if check:
+            apply_delta(replica, delta)
+            expected = json.loads(full)
+            assert replica['nodes'] == {n['id']: n for n in expected['nodes']}
+            assert replica['edges'] == {(e['source'], e['target']): e['edge'] for e in expected['edges']}
+
+    print(f"{steps} polls, final graph {len(G)} nodes, {G.number_of_edges()} edges")
+    print(f"{'export':<14}{'total (s)':>12}{'total (MB)':>12}")
+    print(f"{'ui_graph':<14}{full_time:>12.3f}{full_bytes / 2**20:>12.2f}")
+    print(f"{'export_delta':<14}{delta_time:>12.3f}{delta_bytes / 2**20:>12.2f}")
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument("-f", "--fanout", type=int, default=10,
+                           help="number of time points per decomposition")
+    argparser.add_argument("-s", "--steps", type=int, default=300,
+                           help="number of decompositions (one poll after each)")
+    argparser.add_argument("--no-check", dest="check", action="store_false",
+                           help="do not check the client copy against ui_graph after each poll")
+    args = argparser.parse_args()
+    main(args.fanout, args.steps, args.check)
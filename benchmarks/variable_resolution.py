@@ -0,0 +1,97 @@
+'''
+File: variable_resolution.py
+Description: Compare cached (path-compressed) variable resolution in Alist 
+             with recursive resolution on nested alists from normalize.
+
+Run from the repository root:
+
+    python -m benchmarks.variable_resolution
+
+'''
+
+import argparse
+import timeit
+
+from graph.alist import Alist
+from graph.alist import Attributes as tt
+from graph.alist import VarPrefix as vx
+from frank.map.normalize import Normalize
+
+
+def recursive_instantiation_value(attrs, attrName):
+    ''' variable resolution without caching on the dict form of an alist (reference implementation)'''
+    if attrName not in attrs or isinstance(attrs[attrName], dict):
+        return None
+    if str(attrs[attrName]).startswith((vx.AUXILLIARY, vx.NESTING, vx.PROJECTION)):
+        return recursive_instantiation_value(attrs, attrs[attrName])
+    else:
+        return attrs[attrName]
+
+
+def recursive_is_instantiated(attrs, attr_name):
+    ''' instantiation check without caching on the dict form of an alist (reference implementation)'''
+    if attr_name in attrs and (len(str(attrs[attr_name]).strip()) > 0) and \
+            not str(attrs[attr_name]).startswith((vx.AUXILLIARY, vx.NESTING, vx.PROJECTION)) and \
+            isinstance(attrs[attr_name], str):
+        return True
+    elif attr_name not in attrs or not attrs[attr_name]:
+        return False
+    elif attr_name in [tt.SUBJECT, tt.OBJECT, tt.PROPERTY, tt.TIME] or \
+            str(attrs[attr_name]).startswith((vx.AUXILLIARY, vx.NESTING, vx.PROJECTION)):
+        return recursive_is_instantiated(attrs, attrs[attr_name])
+    elif isinstance(attrs[attr_name], dict):
+        return False
+    else:
+        return True
+
+
+def nested_alist(depth):
+    ''' 
+    Normalize the nested query `s -> ?x0 -> $x1 -> ... -> value` and 
+    return the child alist, which keeps the chain of variables.
+    '''
+    prefixes = [vx.PROJECTION, vx.AUXILLIARY, vx.NESTING]
+    names = [f"{prefixes[i % 3]}x{i}" for i in range(depth)]
+    inner = {tt.OP: 'value', tt.OPVAR: names[0], tt.SUBJECT: names[0],
+             tt.PROPERTY: 'population', tt.OBJECT: names[0]}
+    for a, b in zip(names, names[1:]):
+        inner[a] = b
+    inner[names[-1]] = 'France'
+    query = Alist(**{tt.OP: 'value', tt.OPVAR: '?y', tt.SUBJECT: '$z',
+                     tt.PROPERTY: 'capital', tt.OBJECT: '?y', '$z': inner})
+    _, _, successors = Normalize().decompose(query)
+    return successors[0]
+
+
+def resolve_all(alist, instantiation_value, is_instantiated, attrs):
+    for a in attrs:
+        instantiation_value(a)
+        is_instantiated(a)
+
+
+def main(depths, number):
+    print(f"{'depth':>6}{'recursive (us)':>16}{'cached (us)':>14}{'speedup':>10}")
+    for depth in depths:
+        alist = nested_alist(depth)
+        attrs = [tt.SUBJECT, tt.OBJECT, tt.OPVAR] + alist.variable_names()
+        alist_dict = alist.attributes
+        for a in attrs:
+            assert alist.instantiation_value(a) == recursive_instantiation_value(alist_dict, a)
+            assert alist.is_instantiated(a) == recursive_is_instantiated(alist_dict, a)
+
+        t_rec = timeit.timeit(lambda: resolve_all(
+            alist, lambda a: recursive_instantiation_value(alist_dict, a),
+            lambda a: recursive_is_instantiated(alist_dict, a), attrs), number=number) / number
+        t_cache = timeit.timeit(lambda: resolve_all(
+            alist, alist.instantiation_value, alist.is_instantiated, attrs), number=number) / number
+        print(f"{depth:>6}{t_rec * 1e6:>16.2f}{t_cache * 1e6:>14.2f}{t_rec / t_cache:>10.1f}x")
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument("-d", "--depths", type=int, nargs='+', default=[2, 4, 8, 16, 32],
+                           help="lengths of the variable chains")
+    argparser.add_argument("-n", "--number", type=int, default=2000,
+                           help="number of timing iterations")
+    args = argparser.parse_args()
+    main(args.depths, args.number)
@@ -0,0 +1,82 @@
+'''
+File: budget.py
+Description: Per-query limits of the work of a session.
+
+A budget is given per query with the `budget` argument of Launcher.start,
+a Budget or a dict of its limits, e.g. {'kb_calls': 20, 'wall_time': 5}
+(default: config['query_budget']). Infer searches no more knowledge bases
+than `kb_calls`, does not decompose alists deeper than `depth` or once the
+budget is exhausted, and stops waiting for the knowledge bases when the
+`wall_time` is over. Once the budget is exhausted, Launcher only reduces
+the reducible nodes and returns the latest intermediate answer, with its
+error bar and the limit reached in 'budget_exhausted'.
+
+'''
+
+import time
+
+from frank import config
+
+
+class Budget:
+    ''' Limits of the work of a session (None: no limit): knowledge base calls
+        (a search of one knowledge base for an alist), inference graph nodes,
+        wall time in seconds from the start of the session and decomposition depth '''
+
+    LIMITS = ('kb_calls', 'nodes', 'wall_time', 'depth')
+
+    def __init__(self, kb_calls=None, nodes=None, wall_time=None, depth=None):
+        self.kb_calls = kb_calls
+        self.nodes = nodes
+        self.wall_time = wall_time
+        self.depth = depth
+        self.kb_calls_used = 0
+        self.start_time = time.time()
+
+    def limits(self):
+        return {x: getattr(self, x) for x in self.LIMITS}
+
+    def start(self):
+        ''' Start the wall time of the session '''
+        self.start_time = time.time()
+
+    def time_left(self):
+        ''' Seconds left of the wall time (None: no limit) '''
+        if self.wall_time is None:
+            return None
+        return max(0.0, self.start_time + self.wall_time - time.time())
+
+    def kb_calls_left(self):
+        ''' Knowledge base calls left (None: no limit) '''
+        if self.kb_calls is None:
+            return None
+        return max(0, self.kb_calls - self.kb_calls_used)
+
+    def max_depth(self):
+        ''' Maximum decomposition depth: config['max_depth'] or the depth limit if lower '''
+        if self.depth is None:
+            return config.config['max_depth']
+        return min(self.depth, config.config['max_depth'])
+
+    def exhausted(self, G):
+        ''' The limit that has been reached for the inference graph G of the session,
+            'kb_calls', 'nodes' or 'wall_time', or None '''
+        if self.kb_calls is not None and self.kb_calls_used >= self.kb_calls:
+            return 'kb_calls'
+        if self.nodes is not None and len(G) >= self.nodes:
+            return 'nodes'
+        if self.wall_time is not None and self.time_left() <= 0:
+            return 'wall_time'
+        return None
+
+
+def create_budget(budget=None):
+    ''' Create a budget from a dict of limits (default: config['query_budget']);
+        a Budget object is returned as it is '''
+    if isinstance(budget, Budget):
+        return budget
+    limits = config.config['query_budget'] if budget is None else budget
+    unknown = set(limits) - set(Budget.LIMITS)
+    if unknown:
+        raise ValueError(f"unknown budget limits {sorted(unknown)}, expected some of {list(Budget.LIMITS)}")
+    return Budget(**limits)
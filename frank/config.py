@@ -23,6 +23,8 @@ server = {
     "visualize": False,
     "polynomial_degree": 1,
     "sparql_endpoint": "http://172.20.0.1:8890/sparql",
+    # unexplored frontier nodes resolved together by Launcher, with their knowledge base
+    # searches run concurrently (see Infer.run_frank_batch); 1: one node at a time
     "thread_pool": 1,
     "log_level": 10,
     "answer_sigdig": 4,
@@ -36,6 +38,44 @@ server = {
         "product": ["join", ["isa", "feature"]]
     },
     "use_db": False,
+    # keep a single live Alist object per inference graph node. The accessors then return the
+    # graph's own node, so callers must not modify an alist they take from the graph as a copy.
+    "live_alists": False,
+    # inference graph storage: 'networkx' or 'array' (integer-indexed adjacency arrays)
+    "graph_backend": "networkx",
+    # write a checkpoint of each session to this directory every checkpoint_interval
+    # seconds, to resume it with Launcher.resume (None: no checkpoints)
+    "checkpoint_dir": None,
+    "checkpoint_interval": 30,
+    # inference graph plots: "svg", "webgl" or "auto" (webgl above 500 nodes); with webgl, the facts
+    # of a lookup node are drawn as one summary node when there are more than plot_fact_threshold
+    "plot_renderer": "auto",
+    "plot_fact_threshold": 50,
+    # fold fully reduced decompositions into summary nodes during inference (see InferenceGraph.compact);
+    # the folded nodes are written to <compaction_spill_dir>/<session id> if it is set
+    "compact_reduced": False,
+    "compaction_spill_dir": None,
+    # lookups that return at least fact_table_rows facts store them in one fact-table node
+    # (see graph/fact_table.py); None: one node per fact
+    "fact_table_rows": 10,
+    # knowledge bases are searched concurrently by up to kb_search_workers threads; the results
+    # of a source that has not answered kb_search_timeout[source] seconds after the search started
+    # are dropped (no entry: no deadline)
+    "kb_search_workers": 3,
+    "kb_search_timeout": {"wikidata": 30, "worldbank": 30, "musicbrainz": 30},
+    # asyncio engine (AsyncLauncher): frontier nodes resolved at a time per session, and
+    # knowledge base requests in flight at a time for all the sessions of the process
+    "async_frontier_width": 8,
+    "kb_max_requests": 16,
+    # search strategy of the sessions that do not choose one (see frank/strategy.py): "cost",
+    # "best_first", "beam" or "iterative_deepening"; nodes kept per depth by "beam", and depth
+    # bound increment of "iterative_deepening"
+    "search_strategy": "cost",
+    "beam_width": 4,
+    "deepening_step": 2,
+    # limits of the work of the sessions that do not set a budget (see frank/budget.py): knowledge
+    # base calls, inference graph nodes, wall time (s) and decomposition depth; None: no limit
+    "query_budget": {"kb_calls": None, "nodes": None, "wall_time": None, "depth": None},
 
     "user-agent": f"FRANK {VERSION}"
 }
@@ -63,6 +103,8 @@ local = {
     "visualize": False,
     "polynomial_degree": 1,
     "sparql_endpoint": "",
+    # unexplored frontier nodes resolved together by Launcher, with their knowledge base
+    # searches run concurrently (see Infer.run_frank_batch); 1: one node at a time
     "thread_pool": 1,
     "log_level": 10,
     "answer_sigdig": 4,
@@ -76,6 +118,44 @@ local = {
         "product": ["join", ["isa", "feature"]]
     },
     "use_db": False,
+    # keep a single live Alist object per inference graph node. The accessors then return the
+    # graph's own node, so callers must not modify an alist they take from the graph as a copy.
+    "live_alists": False,
+    # inference graph storage: 'networkx' or 'array' (integer-indexed adjacency arrays)
+    "graph_backend": "networkx",
+    # write a checkpoint of each session to this directory every checkpoint_interval
+    # seconds, to resume it with Launcher.resume (None: no checkpoints)
+    "checkpoint_dir": None,
+    "checkpoint_interval": 30,
+    # inference graph plots: "svg", "webgl" or "auto" (webgl above 500 nodes); with webgl, the facts
+    # of a lookup node are drawn as one summary node when there are more than plot_fact_threshold
+    "plot_renderer": "auto",
+    "plot_fact_threshold": 50,
+    # fold fully reduced decompositions into summary nodes during inference (see InferenceGraph.compact);
+    # the folded nodes are written to <compaction_spill_dir>/<session id> if it is set
+    "compact_reduced": False,
+    "compaction_spill_dir": None,
+    # lookups that return at least fact_table_rows facts store them in one fact-table node
+    # (see graph/fact_table.py); None: one node per fact
+    "fact_table_rows": 10,
+    # knowledge bases are searched concurrently by up to kb_search_workers threads; the results
+    # of a source that has not answered kb_search_timeout[source] seconds after the search started
+    # are dropped (no entry: no deadline)
+    "kb_search_workers": 3,
+    "kb_search_timeout": {"wikidata": 30, "worldbank": 30, "musicbrainz": 30},
+    # asyncio engine (AsyncLauncher): frontier nodes resolved at a time per session, and
+    # knowledge base requests in flight at a time for all the sessions of the process
+    "async_frontier_width": 8,
+    "kb_max_requests": 16,
+    # search strategy of the sessions that do not choose one (see frank/strategy.py): "cost",
+    # "best_first", "beam" or "iterative_deepening"; nodes kept per depth by "beam", and depth
+    # bound increment of "iterative_deepening"
+    "search_strategy": "cost",
+    "beam_width": 4,
+    "deepening_step": 2,
+    # limits of the work of the sessions that do not set a budget (see frank/budget.py): knowledge
+    # base calls, inference graph nodes, wall time (s) and decomposition depth; None: no limit
+    "query_budget": {"kb_calls": None, "nodes": None, "wall_time": None, "depth": None},
 
     "user-agent": f"FRANK/{VERSION}"
 }
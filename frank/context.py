@@ -34,8 +34,8 @@ def _get_context(alist: Alist, idx, key):
     if not alist.get(tt.CONTEXT):
         return None
     try:
-        if key in alist.attributes[tt.CONTEXT][idx]:
-            return alist.attributes[tt.CONTEXT][idx][key]
+        if key in alist.get(tt.CONTEXT)[idx]:
+            return alist.get(tt.CONTEXT)[idx][key]
         else:
             return None
     except:
@@ -43,10 +43,10 @@ def _get_context(alist: Alist, idx, key):
 
 
 def _set_context(alist: Alist, idx, key, value):
-    if not alist.attributes[tt.CONTEXT]:
-        alist.attributes[tt.CONTEXT] = [{}, {}, {}]
+    if not alist.get(tt.CONTEXT):
+        alist.set(tt.CONTEXT, [{}, {}, {}])
     try:
-        alist.attributes[tt.CONTEXT][idx][key] = value
+        alist.get_mutable(tt.CONTEXT)[idx][key] = value
     except:
         pass
 
@@ -84,6 +84,7 @@ def inject_query_context(alist: Alist) -> Alist:
     if len(context) == 3 and \
             ctx.accuracy not in context[0] and \
             ctx.device in context[1]:
+        context = alist.get_mutable(tt.CONTEXT)
         if context[1][ctx.device] == 'phone':
             context[0][ctx.accuracy] = 'low'
         elif context[1][ctx.device] == 'computer':
@@ -155,7 +156,7 @@ def flush(alist: Alist, items) -> Alist:
     for k in items:
         try:
             if k in alist.get(tt.CONTEXT)[2] and alist.get(tt.CONTEXT)[2][k] != alist.get(k):
-                del alist.get(tt.CONTEXT)[2][k]
+                del alist.get_mutable(tt.CONTEXT)[2][k]
         except:
             pass
 
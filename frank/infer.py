@@ -5,8 +5,10 @@ Description: Core functions to the FRANK algorithm
 
 '''
 
+import asyncio
+import concurrent.futures
+import contextlib
 import datetime
-import random
 import threading
 import time
 
@@ -43,11 +45,15 @@ from graph.alist import NodeTypes as nt
 from graph.alist import States as states
 from frank import config
 from frank.kb import rdf, wikidata, worldbank, musicbrainz, jsonld
+from frank.kb import aio
 from frank import processLog
+from frank.strategy import create_strategy
+from frank.budget import create_budget
 from frank.uncertainty.sourcePrior import SourcePrior as sourcePrior
 import frank.context
 from graph.alist import Contexts as ctx
 from graph.inference_graph import InferenceGraph
+from graph import fact_table
 
 
 class Infer:
@@ -80,6 +86,18 @@ class Infer:
     root : Alist
         Alist in the root node of inference graph.
 
+    strategy : Strategy
+        Search strategy of the session (see frank.strategy).
+
+    budget : Budget
+        Limits of the work of the session (see frank.budget).
+
+    lock : threading.Condition
+        Lock that the thread running the alists holds while it changes the 
+        graph (Launcher.work), or None. It is released while the KB searches
+        are awaited, so other threads can change the graph or notify the 
+        launcher meanwhile.
+
     """
 
     def __init__(self, G: InferenceGraph):
@@ -97,6 +115,43 @@ class Infer:
         self.max_depth = 0
         self.propagated_alists = []
         self.root = None
+        self.strategy = create_strategy()
+        self.budget = create_budget()
+        self.lock = None
+
+    def checkpoint_state(self):
+        """ Session state to save with the inference graph in a checkpoint
+
+        Return
+        ------
+        dict of values that can be encoded with graph.codec
+        """
+        return {
+            'session_id': self.session_id,
+            'root': self.root.attributes if self.root else None,
+            'max_depth': self.max_depth,
+            'property_refs': self.property_refs,
+            'reverse_property_refs': self.reverse_property_refs,
+            'propagated_alists': [x.attributes for x in self.propagated_alists],
+        }
+
+    def restore_state(self, state):
+        """ Restore the session state saved by `checkpoint_state`
+
+        Nodes that were being explored when the checkpoint was written
+        are set back to unexplored so they are scheduled again. 
+        KB results already in the graph are kept.
+        """
+        self.session_id = state['session_id']
+        self.root = Alist(**state['root']) if state['root'] else None
+        self.max_depth = state['max_depth']
+        self.property_refs = state['property_refs']
+        self.reverse_property_refs = state['reverse_property_refs']
+        self.propagated_alists = [Alist(**x) for x in state['propagated_alists']]
+        for alist in self.G.alists():
+            if alist.state == states.EXPLORING:
+                alist.state = states.UNEXPLORED
+                self.G.add_alist(alist)
 
     def enqueue_root(self, alist):
         """ Add alist as the root node of the inference graph"""
@@ -122,17 +177,111 @@ class Infer:
         variable. If instantiation is successful, attempt to reduce
         Else decompose and add new children to queue
         """
-        self.last_heartbeat = time.time()
-        curr_propagated_alists = []
-        self.max_depth = alist.depth
-        if alist.state is states.PRUNED:
-            self.write_trace(
-                f"{pcol.RED}ignore pruned {alist.id}{pcol.RESET}-{alist}{pcol.RESETALL}")
+        instantiated = self._begin_run(alist)
+        if instantiated is None:
             return self.propagated_alists
 
-        alist.state = states.EXPLORING
+        # if projection var not instantiated, search KB
+        if not instantiated:
+            instantiated = self.search_kb(alist)
+            if self._removed(alist):
+                return []
+        return self._end_run(alist, instantiated)
+
+    def run_frank_batch(self, alists: list):
+        """ Run the FRANK algorithm for several frontier alists
+
+        The alists are run one at a time in the order of `alists`, as 
+        `run_frank` would run them one after the other, but their KB searches 
+        are started together in a thread pool before the first alist is run. 
+        Each property is searched once per batch: the searches of the other 
+        alists with the same property wait for its refs. Everything else, 
+        including adding the facts found to the graph, is done by the calling 
+        thread, so the graph has a single writer and the outcome does not 
+        depend on the order in which the searches finish. An alist that is 
+        pruned by the alists before it is not resolved; an alist that the 
+        alists before it instantiated does not use its search. The searches 
+        of an alist are charged to the kb_calls budget when it uses them; the 
+        pool runs at most max(config['kb_search_workers'], 
+        config['thread_pool']) of them at a time.
 
-        # if not a reduce node, check if its reduce complement instantiated
+        Args
+        ----
+        alists : list of Alist
+
+        Return
+        ------
+        The result of `run_frank` for each alist.
+        """
+        if len(alists) == 1:
+            return [self.run_frank(alists[0])]
+
+        executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max(1, config.config['kb_search_workers'], config.config['thread_pool']),
+            thread_name_prefix='run_frank')
+        start = time.time()
+        planned = {}
+        # (property, source name) -> future of the search of its refs in this batch
+        prop_searches = {}
+        # kb calls of the searches submitted, charged as their alists use them
+        reserved = 0
+        for alist in alists:
+            if not self._needs_search(alist):
+                continue
+            result, searches = self._search_plan(alist, reserved)
+            if searches is None and result is False:
+                # no kb calls left after the alists before it: planned again if it runs
+                continue
+            futures = None
+            if searches is not None:
+                reserved += len(searches)
+                for source_name, (kb, search_alist, search_attr, search_props, refs) in searches.items():
+                    key = (alist.get(tt.PROPERTY), source_name)
+                    if search_props and key in prop_searches:
+                        searches[source_name] = (kb, search_alist, search_attr, False, prop_searches[key])
+                futures = self._submit_searches(executor, alist, searches)
+                for source_name, (_, _, _, search_props, _) in searches.items():
+                    if search_props:
+                        prop_searches[(alist.get(tt.PROPERTY), source_name)] = futures[source_name]
+            planned[alist.id] = (result, searches, futures)
+        executor.shutdown(wait=False)
+
+        results = []
+        for alist in alists:
+            if self._removed(alist):
+                results.append([])
+                continue
+            instantiated = self._begin_run(alist)
+            if instantiated is None:
+                results.append(self.propagated_alists)
+                continue
+            if not instantiated:
+                plan = planned.get(alist.id)
+                if plan is None:
+                    # the alists before it changed what it needs
+                    instantiated = self.search_kb(alist)
+                elif plan[1] is None:
+                    instantiated = plan[0]
+                else:
+                    _, searches, futures = plan
+                    search_results = self._search_results(futures, start)
+                    if self._removed(alist):
+                        results.append([])
+                        continue
+                    self.max_depth = alist.depth
+                    self.budget.kb_calls_used += len(searches)
+                    instantiated = self._add_search_results(alist, searches, search_results)
+            results.append(self._end_run(alist, instantiated))
+        return results
+
+    def _removed(self, alist: Alist):
+        """ True if the node of the alist was removed from the graph or pruned,
+        e.g. while it waited for its KB search """
+        return alist.id not in self.G or self.G.alist(alist.id).state == states.PRUNED
+
+    def _complement_instantiation(self, alist: Alist):
+        """ The reduce complement of an alist and whether its projection 
+        and operation variables are instantiated """
         alist_ = self.G.find_complement_node(alist)[0]  
         alist_.check_variables()   
         proj_instantiated = True if alist_.projected_value() else False
@@ -143,6 +292,36 @@ class Infer:
             opval_instantiated = False
         else:
             opval_instantiated = True
+        return alist_, proj_instantiated, opval_instantiated
+
+    def _needs_search(self, alist: Alist):
+        """ True if `_begin_run` would leave the variables of the alist 
+        uninstantiated, as the graph is now (it does not change the graph) """
+        if alist.state is states.PRUNED or self._removed(alist):
+            return False
+        alist_, proj_instantiated, opval_instantiated = self._complement_instantiation(alist)
+        if proj_instantiated == opval_instantiated:
+            return not proj_instantiated
+        return not (alist_.projection_variable_names()[0] == tt.PRJVAR or alist_.is_all_instantiated())
+
+    def _begin_run(self, alist: Alist):
+        """ The part of `run_frank` before the KB search
+
+        Return
+        ------
+        None if the alist is pruned, else whether its variables are instantiated
+        """
+        self.last_heartbeat = time.time()
+        self.max_depth = alist.depth
+        if alist.state is states.PRUNED:
+            self.write_trace(
+                f"{pcol.RED}ignore pruned {self.G.display_id(alist.id)}{pcol.RESET}-{alist}{pcol.RESETALL}")
+            return None
+
+        alist.state = states.EXPLORING
+
+        # if not a reduce node, check if its reduce complement instantiated
+        alist_, proj_instantiated, opval_instantiated = self._complement_instantiation(alist)
 
         if proj_instantiated and (not opval_instantiated):
             if alist_.projection_variable_names()[0] == tt.PRJVAR or alist_.is_all_instantiated():
@@ -183,11 +362,12 @@ class Infer:
             default_data_node.state = states.REDUCED
             default_data_node.check_variables()
             self.G.subdivide('0','0_', map_op,[reduce_op],[default_data_node], True, True)
+        return instantiated
 
-        # if projection var not instantiated, search KB
-        if not instantiated:
-            instantiated = self.search_kb(alist)
-
+    def _end_run(self, alist: Alist, instantiated):
+        """ The part of `run_frank` after the KB search: propagate the 
+        instantiated variables or decompose the alist """
+        curr_propagated_alists = []
         if instantiated:
             is_propagated = False
             alist.state = states.EXPLORED
@@ -240,6 +420,10 @@ class Infer:
     def search_kb(self, alist: Alist):
         """ Search knowledge bases to instantiate variables in alist.
 
+        The knowledge bases are searched concurrently (see `_search_source`),
+        each until its deadline in config['kb_search_timeout']; their facts are
+        merged in a fixed source order.
+
         Args
         ----
         alist: Alist
@@ -248,21 +432,88 @@ class Infer:
         ------
         Returns `True` if variable instantiation is successful from a KB search.
 
+        """
+        result, searches = self._search_plan(alist)
+        if searches is None:
+            return result
+
+        # search the sources concurrently, each until its own deadline
+        executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max(1, min(config.config['kb_search_workers'], len(searches))),
+            thread_name_prefix='search_kb')
+        self.budget.kb_calls_used += len(searches)
+        start = time.time()
+        futures = self._submit_searches(executor, alist, searches)
+        executor.shutdown(wait=False)
+        results = self._search_results(futures, start)
+        if self._removed(alist):
+            return False
+        return self._add_search_results(alist, searches, results)
+
+    def _submit_searches(self, executor, alist: Alist, searches):
+        """ Submit the searches planned by `_search_plan` to an executor """
+        return {source_name: executor.submit(self._search_source, alist, source_name, *search)
+                for source_name, search in searches.items()}
+
+    def _search_results(self, futures, start):
+        """ Wait for the searches submitted with `_submit_searches` at `start` 
+        until their deadlines (None for the searches past their deadline).
+        The lock is released meanwhile, so the graph may have changed. """
+        results = {}
+        with self._lock_released():
+            for source_name, future in futures.items():
+                try:
+                    results[source_name] = future.result(timeout=self._search_time_left(source_name, start))
+                except concurrent.futures.TimeoutError:
+                    future.cancel()
+                    results[source_name] = None
+        return results
+
+    @contextlib.contextmanager
+    def _lock_released(self):
+        """ Release the lock held by this thread (see `lock`) in the block """
+        if self.lock is None:
+            yield
+            return
+        self.lock.release()
+        try:
+            yield
+        finally:
+            self.lock.acquire()
+
+    def _search_plan(self, alist: Alist, reserved=0):
+        """ The searches of `search_kb` for an alist.
+
+        The searches are not charged to the kb_calls budget: the caller 
+        charges them when it submits them for the alist.
+
+        Args
+        ----
+        alist : Alist
+        reserved : int
+            KB calls of searches planned but not charged yet, which the 
+            searches of the alist cannot use.
+
+        Return
+        ------
+        (result, searches): searches maps the name of each knowledge base to 
+        search to the arguments of `_search_source` after `source_name`, in 
+        the order of the sources; if searches is None, no search is needed 
+        and result is the result of `search_kb`.
+
         """
         self.last_heartbeat = time.time()
-        prop_refs = []
-        found_facts = []
         # cannot search if alist has uninstantiated nested variables
         if alist.uninstantiated_nesting_variables():
-            return found_facts
+            return [], None
 
         self.write_trace(
-            f"{pcol.MAGENTA}search {alist.id}{pcol.RESET} {alist}{pcol.RESETALL}")
+            f"{pcol.MAGENTA}search {self.G.display_id(alist.id)}{pcol.RESET} {alist}{pcol.RESETALL}")
         if alist.state == states.EXPLORED:
             new_alist = alist.copy()
             new_alist.state = states.EXPLORED
             new_alist.set(tt.OPVAR, alist.get(tt.OPVAR))
-            return True
+            return True, None
 
         prop_string = alist.get(tt.PROPERTY)        
         sources = {
@@ -274,39 +525,23 @@ class Infer:
         context_store = {}
         context_store = {**context[0], **context[1],
                          **context[2]} if context else {}
+        # check context for trust before any source is searched
+        if ctx.trust in context_store and context_store[ctx.trust] == 'high':
+            sources = {k: v for k, v in sources.items() if v['trust'] == 'high'}
+
+        # if the property_refs does not contain an entry for the property in this alist
+        # search KB for a ref for the property
+        prop_sources = []
+        if prop_string in self.property_refs:
+            prop_sources = [x[1] for x in self.property_refs[prop_string]]
+
+        searches = {}
         for source_name, source in sources.items():
-            # check context for trust
-            if ctx.trust in context_store:
-                if context_store[ctx.trust] == 'high' and source['trust'] != 'high':
-                    continue
-            # for source_name, source in {'worldbank':worldbank}.items():
             search_alist = alist.copy()
             # inject context into IR
             search_alist = frank.context.inject_retrieval_context(
                 search_alist, source_name)
 
-            # if the property_refs does not contain an entry for the property in this alist
-            # search KB for a ref for the property
-            prop_sources = []
-            if prop_string in self.property_refs:
-                prop_sources = [x[1] for x in self.property_refs[prop_string]]
-
-            if (prop_string not in self.property_refs and not prop_string.startswith('__')) \
-                    or (prop_string in self.property_refs and source_name not in prop_sources):
-
-                props = source['fn'].search_properties(prop_string)
-
-                if len(props) > 0:
-                    maxScore = 0
-                    for p in props:
-                        if p[2] >= maxScore:
-                            prop_refs.append((p, source_name))
-                            self.reverse_property_refs[p[0]] = prop_string
-                            maxScore = p[2]
-                        else:
-                            break
-                self.property_refs[prop_string] = prop_refs
-
             search_attr = tt.SUBJECT
             uninstantiated_variables = search_alist.uninstantiated_attributes()
             if tt.SUBJECT in uninstantiated_variables:
@@ -316,52 +551,79 @@ class Infer:
             elif tt.TIME in uninstantiated_variables:
                 search_attr = tt.TIME
 
-            cache_found_flag = False
-            if config.config['use_cache']:
-                searchable_attr = list(filter(lambda x: x != search_attr,
-                                              [tt.SUBJECT, tt.PROPERTY, tt.OBJECT, tt.TIME]))
-                # search with original property name
-                (cache_found_flag, results) = (False, [])
-                if cache_found_flag == True:
-                    found_facts.append(results[0])
-                # search with source-specific property IDs
-
-                for (propid, _source_name) in self.property_refs[prop_string]:
-                    self.last_heartbeat = time.time()
-                    search_alist.set(tt.PROPERTY, propid[0])
-                    (cache_found_flag, results) = (False, [])
-                    if cache_found_flag == True:
-                        found_facts.append(results[0])
-                        self.write_trace(
-                            f'{pcol.MAGENTA}found: cache{pcol.RESETALL}')
-            if not cache_found_flag and prop_string in self.property_refs:
-                # search for data for each property reference source
-                for propid_label, _source_name in self.property_refs[prop_string]:
-                    self.last_heartbeat = time.time()
-
-                    try:
-                        if _source_name == source_name:
-                            search_alist.set(tt.PROPERTY, propid_label[0])
-                            found_facts.extend(source['fn'].find_property_values(
-                                search_alist, search_attr))
-                            # TODO: handle location search in less adhoc manner
-                            if alist.get(tt.PROPERTY).lower() == "location":
-                                if search_attr == tt.SUBJECT:
-                                    found_facts.extend(
-                                        wikidata.part_of_relation_subject(search_alist))
-                                elif search_attr == tt.OBJECT:
-                                    found_facts.extend(
-                                        wikidata.part_of_relation_object(search_alist))
-                            break
-                    except Exception as ex:
-                        self.write_trace(
-                            f"{pcol.RED}Search Error{pcol.RESETALL}", processLog.LogLevel.ERROR)
-                        # print(str(ex))
+            search_props = (prop_string not in self.property_refs and not prop_string.startswith('__')) \
+                or (prop_string in self.property_refs and source_name not in prop_sources)
+            refs = [x for x in self.property_refs.get(prop_string, []) if x[1] == source_name]
+            searches[source_name] = (source['fn'], search_alist, search_attr, search_props, refs)
+
+        # search no more knowledge bases than the budget allows
+        kb_calls_left = self.budget.kb_calls_left()
+        if kb_calls_left is not None:
+            kb_calls_left = max(0, kb_calls_left - reserved)
+        if kb_calls_left is not None and kb_calls_left < len(searches):
+            searches = dict(list(searches.items())[:kb_calls_left])
+            if not searches:
+                self.write_trace(f"{pcol.RED}budget exhausted: kb_calls{pcol.RESETALL}")
+                return False, None
+        return None, searches
+
+    def _search_time_left(self, source_name, start):
+        """ Seconds left to the deadline of a knowledge base searched since `start`,
+        or to the end of the wall time of the budget if it is earlier (None: no deadline) """
+        timeout = config.config['kb_search_timeout'].get(source_name)
+        time_left = None if timeout is None else max(0.0, start + timeout - time.time())
+        budget_left = self.budget.time_left()
+        if budget_left is not None and (time_left is None or budget_left < time_left):
+            return budget_left
+        return time_left
+
+    def _add_search_results(self, alist: Alist, searches, results):
+        """ Merge the results of the searches planned by `_search_plan` 
+        in the order of the sources and add the facts found to the graph.
+
+        Args
+        ----
+        alist : Alist
+        searches : dict
+            The searches returned by `_search_plan`.
+        results : dict
+            The result of `_search_source` for each source in searches, 
+            or None if its deadline passed.
+
+        Return
+        ------
+        Returns `True` if variable instantiation is successful from a KB search.
+
+        """
+        prop_string = alist.get(tt.PROPERTY)
+        prop_refs = []
+        found_facts = []
+        searched_props = False
+        for source_name, (_, search_alist, search_attr, search_props, _) in searches.items():
+            uninstantiated_variables = search_alist.uninstantiated_attributes()
+            if results[source_name] is None:
+                self.write_trace(
+                    f"{pcol.RED}Search timeout: {source_name}{pcol.RESETALL}", processLog.LogLevel.ERROR)
+                source_refs, facts, errors = [], [], 0
+            else:
+                source_refs, facts, errors = results[source_name]
+            self.last_heartbeat = time.time()
+            if search_props:
+                searched_props = True
+                for p, _source_name in source_refs:
+                    prop_refs.append((p, _source_name))
+                    self.reverse_property_refs[p[0]] = prop_string
+            for _ in range(errors):
+                self.write_trace(
+                    f"{pcol.RED}Search Error{pcol.RESETALL}", processLog.LogLevel.ERROR)
+            found_facts.extend(facts)
             if not found_facts and alist.get(tt.PROPERTY).startswith('__geopolitical:'):
                 if search_attr == tt.SUBJECT:
                     found_facts.extend(
                         wikidata.part_of_geopolitical_subject(search_alist))
-            # TODO: save facts found to cache if caching is enabled
+        if searched_props:
+            self.property_refs[prop_string] = self.property_refs.get(prop_string, []) + prop_refs
+        # TODO: save facts found to cache if caching is enabled
 
         if found_facts:
             self.last_heartbeat = time.time()
@@ -397,6 +659,13 @@ class Infer:
                 self.write_trace(
                     f'  {pcol.MAGENTA}found:{pcol.RESET} {str(ff)}{pcol.RESETALL}')
 
+            # store the facts of a wide lookup column-wise in one fact-table node
+            min_rows = config.config['fact_table_rows']
+            if min_rows is not None and len(fact_nodes) >= min_rows:
+                table = fact_table.make_fact_table(fact_nodes)
+                if table is not None:
+                    fact_nodes = [table]
+
             map_op_node = alist.copy()
             map_op_node.set(tt.OP, "lookup")
             map_op_node.set(tt.OPVAR, alist.getOpVar())
@@ -413,6 +682,92 @@ class Infer:
                 self.G.plot_plotly()
         return len(found_facts) > 0
 
+    def _search_source(self, alist: Alist, source_name, kb, search_alist: Alist, search_attr,
+                       search_props, refs):
+        """ Search one knowledge base for the facts of an alist.
+
+        Runs in a worker thread of `search_kb`: it reads but does not update
+        the session state.
+
+        Args
+        ----
+        alist : Alist
+            The alist being searched.
+        source_name : str
+        kb : module
+            The knowledge base interface (e.g. frank.kb.wikidata).
+        search_alist : Alist
+            Copy of the alist with the retrieval context of the source.
+        search_attr : str
+            The attribute to instantiate.
+        search_props : bool
+            Search the knowledge base for refs of the property first.
+        refs : list
+            Known refs of the property in this knowledge base, or the future 
+            of the search of another alist of a `run_frank_batch` that 
+            searches them.
+
+        Return
+        ------
+        (property refs found, facts found, number of search errors)
+
+        """
+        prop_string = alist.get(tt.PROPERTY)
+        found_refs = []
+        if isinstance(refs, concurrent.futures.Future):
+            try:
+                refs = refs.result()[0]
+            except Exception:
+                refs = []
+        if search_props:
+            props = kb.search_properties(prop_string)
+            if len(props) > 0:
+                maxScore = 0
+                for p in props:
+                    if p[2] >= maxScore:
+                        found_refs.append((p, source_name))
+                        maxScore = p[2]
+                    else:
+                        break
+            refs = found_refs
+
+        found_facts = []
+        errors = 0
+        cache_found_flag = False
+        if config.config['use_cache']:
+            searchable_attr = list(filter(lambda x: x != search_attr,
+                                          [tt.SUBJECT, tt.PROPERTY, tt.OBJECT, tt.TIME]))
+            # search with original property name
+            (cache_found_flag, results) = (False, [])
+            if cache_found_flag == True:
+                found_facts.append(results[0])
+            # search with source-specific property IDs
+
+            for (propid, _source_name) in refs:
+                search_alist.set(tt.PROPERTY, propid[0])
+                (cache_found_flag, results) = (False, [])
+                if cache_found_flag == True:
+                    found_facts.append(results[0])
+        if not cache_found_flag:
+            # search for data with the first property ref that succeeds
+            for propid_label, _source_name in refs:
+                try:
+                    search_alist.set(tt.PROPERTY, propid_label[0])
+                    found_facts.extend(kb.find_property_values(
+                        search_alist, search_attr))
+                    # TODO: handle location search in less adhoc manner
+                    if prop_string.lower() == "location":
+                        if search_attr == tt.SUBJECT:
+                            found_facts.extend(
+                                wikidata.part_of_relation_subject(search_alist))
+                        elif search_attr == tt.OBJECT:
+                            found_facts.extend(
+                                wikidata.part_of_relation_object(search_alist))
+                    break
+                except Exception as ex:
+                    errors += 1
+        return found_refs, found_facts, errors
+
     def get_map_strategy(self, alist: Alist):
         """ Get decomposition rules to apply to an alist
 
@@ -427,6 +782,7 @@ class Infer:
         """
         # TODO: learn to predict best strategy given path of root from
         # node and attributes in alist
+        # the order of the decomposition rules is given by self.strategy
         self.last_heartbeat = time.time()
         # if alist.get(tt.OP).lower() in ['eq', 'lt', 'gt', 'lte', 'gte']:
         #     return [(frank.map.map_wrapper.get_mapper_fn("comparison"), "comparison")]
@@ -441,8 +797,7 @@ class Infer:
                         (frank.map.map_wrapper.get_mapper_fn(allowed_op), allowed_op))
                 except Exception as ex:
                     print("Error in decomposition mapper: " + str(ex))
-            random.shuffle(ops)
-            return ops
+            return self.strategy.map_ops(alist, ops)
 
     def decompose(self, alist: Alist, map_op):
         """ Apply a decomposition rule to create successors of an alist
@@ -481,16 +836,25 @@ class Infer:
         self.write_trace('{blue}{bold}T{thread}{reset} > {op}:{id}-{alist}{resetall}'.format(
             blue=pcol.BLUE, reset=pcol.RESET, bold=pcol.RESET, resetall=pcol.RESETALL,
             thread=threading.get_ident(),
-            op=map_op[1], alist=alist, id=alist.id))
+            op=map_op[1], alist=alist, id=self.G.display_id(alist.id)))
+
+        exhausted = self.budget.exhausted(self.G)
+        if exhausted:
+            self.write_trace(f"{pcol.RED}budget exhausted: {exhausted}{pcol.RESETALL}")
+            return
 
         # check for query context
         context = alist.get(tt.CONTEXT)
-        map_op_node, reduce_op_node, map_op_successors = self.G.decompose(alist, map_op, max_depth=config.config['max_depth'])
+        decomposition = self.G.decompose(alist, map_op, max_depth=self.budget.max_depth())
+        if not isinstance(decomposition, tuple):
+            # max depth reached
+            return
+        map_op_node, reduce_op_node, map_op_successors = decomposition
         if map_op_node:
-            self.write_trace(f'{pcol.BLUE}>> {map_op_node.id}{pcol.RESET}-{str(map_op_node)}{pcol.RESETALL}')                
+            self.write_trace(f'{pcol.BLUE}>> {self.G.display_id(map_op_node.id)}{pcol.RESET}-{str(map_op_node)}{pcol.RESETALL}')                
             for succ in map_op_successors:
-                self.write_trace(f'  {pcol.BLUE}>>> {succ.id}{pcol.RESET}-{str(succ)}{pcol.RESETALL}')
-            self.write_trace(f'{pcol.BLUE}>> {" ; ".join([x.id for x in reduce_op_node])}{pcol.RESET}-{str(reduce_op_node[0])}{pcol.RESETALL}')
+                self.write_trace(f'  {pcol.BLUE}>>> {self.G.display_id(succ.id)}{pcol.RESET}-{str(succ)}{pcol.RESETALL}')
+            self.write_trace(f'{pcol.BLUE}>> {" ; ".join([self.G.display_id(x.id) for x in reduce_op_node])}{pcol.RESET}-{str(reduce_op_node[0])}{pcol.RESETALL}')
 
             if self.debug == 1:
                 self.G.plot_plotly()
@@ -520,7 +884,7 @@ class Infer:
         #     return False
         self.last_heartbeat = time.time()
         self.write_trace(
-            f'{pcol.YELLOW}reducing {alist.id}{pcol.RESET}-{alist}{pcol.RESETALL}')
+            f'{pcol.YELLOW}reducing {self.G.display_id(alist.id)}{pcol.RESET}-{alist}{pcol.RESETALL}')
 
         reduce_op = None
         try:
@@ -538,14 +902,18 @@ class Infer:
         if reducibles:
             for x in reducibles:
                 self.write_trace(
-                    f'  {pcol.YELLOW}<<< {x.id}{pcol.RESET}-{x}{pcol.RESETALL}')
+                    f'  {pcol.YELLOW}<<< {self.G.display_id(x.id)}{pcol.RESET}-{x}{pcol.RESETALL}')
 
             unexplored = [
                 x for x in predecessors if x.state == states.UNEXPLORED]
             if not reducibles or len(unexplored) == len(predecessors):
                 return False  # there's nothing to reduce
 
-            reduced_alists = reduce_op.reduce(alist, reducibles, self.G)
+            # reduce ops that do not read fact tables get their rows as fact alists
+            operands = reducibles
+            if not getattr(reduce_op, 'fact_tables', False):
+                operands = fact_table.expand(reducibles)
+            reduced_alists = reduce_op.reduce(alist, operands, self.G)
 
             last_heartbeat = time.time()
 
@@ -565,11 +933,11 @@ class Infer:
                         self.G.add_alist(complement_node)
                 self.G.add_alist(alist)
                 self.write_trace(
-                    f"{pcol.GREEN}reduced {alist.id}{pcol.RESET}-{alist}{pcol.RESETALL}")
+                    f"{pcol.GREEN}reduced {self.G.display_id(alist.id)}{pcol.RESET}-{alist}{pcol.RESETALL}")
                 return True
             else:
                 self.write_trace(
-                    f"{pcol.YELLOW}reduce {alist.id} failed {pcol.RESET}-{alist}{pcol.RESETALL}")
+                    f"{pcol.YELLOW}reduce {self.G.display_id(alist.id)} failed {pcol.RESET}-{alist}{pcol.RESETALL}")
                 return False
         else:
             # if no reducibles but node has an instantiated projection variable, the 
@@ -591,7 +959,7 @@ class Infer:
         self.last_heartbeat = time.time()
         curr_alist = self.G.alist(alist_id)
         self.write_trace(
-            f'{pcol.GREEN}propagate {curr_alist.id}{pcol.RESET}-{curr_alist}{pcol.RESETALL}')
+            f'{pcol.GREEN}propagate {self.G.display_id(curr_alist.id)}{pcol.RESET}-{curr_alist}{pcol.RESETALL}')
         
         # iter until node 0_
         while curr_alist != None:
@@ -615,3 +983,57 @@ class Infer:
 
     def write_trace(self, content, loglevel=processLog.LogLevel.INFO):
         processLog.println(content, processLog.LogLevel.INFO)
+
+
+class AsyncInfer(Infer):
+    """ 
+    Infer with awaitable `run_frank` and `search_kb`
+
+    The knowledge bases are searched through `frank.kb.aio`, so the inference
+    of many frontier nodes and of many sessions can share one event loop, 
+    with their KB requests in flight together. The KB interfaces themselves 
+    stay blocking (requests): `aio.call` runs them in a shared thread pool 
+    of config['kb_max_requests'] threads. The inference graph is only 
+    changed on the event loop, so while a node awaits its KB search, the 
+    other nodes can change the graph, and prune the node.
+
+    Infer is not a wrapper of this class: both share the parts of 
+    `run_frank` before and after the KB search (`_begin_run`, `_end_run`) 
+    and of `search_kb` (`_search_plan`, `_add_search_results`).
+
+    """
+
+    async def run_frank(self, alist: Alist):
+        """ Run the FRANK algorithm for an alist (see `Infer.run_frank`) """
+        if alist.id not in self.G:
+            return []
+        instantiated = self._begin_run(alist)
+        if instantiated is None:
+            return self.propagated_alists
+
+        # if projection var not instantiated, search KB
+        if not instantiated:
+            instantiated = await self.search_kb(alist)
+            if self._removed(alist):
+                return []
+        return self._end_run(alist, instantiated)
+
+    async def search_kb(self, alist: Alist):
+        """ Search knowledge bases to instantiate variables in alist (see `Infer.search_kb`) """
+        result, searches = self._search_plan(alist)
+        if searches is None:
+            return result
+
+        self.budget.kb_calls_used += len(searches)
+        start = time.time()
+        tasks = {source_name: asyncio.ensure_future(aio.call(self._search_source, alist, source_name, *search))
+                 for source_name, search in searches.items()}
+        results = {}
+        for source_name, task in tasks.items():
+            try:
+                results[source_name] = await asyncio.wait_for(task, self._search_time_left(source_name, start))
+            except asyncio.TimeoutError:
+                results[source_name] = None
+        if self._removed(alist):
+            return False
+        return self._add_search_results(alist, searches, results)
@@ -0,0 +1,40 @@
+'''
+File: aio.py
+Description: Awaitable calls to the knowledge base interfaces.
+
+The interfaces in frank.kb make blocking HTTP requests. `call` runs them in
+a thread pool shared by all the sessions on an event loop, so the loop keeps
+scheduling the inference of other nodes and sessions while up to
+config['kb_max_requests'] requests are in flight:
+
+    facts = await aio.call(worldbank.find_property_values, alist, tt.OBJECT)
+
+'''
+
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from frank import config
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def executor():
+    ''' The thread pool of the knowledge base requests, 
+        replaced when config['kb_max_requests'] changes '''
+    global _executor
+    with _executor_lock:
+        size = config.config['kb_max_requests']
+        if _executor is None or _executor._max_workers != size:
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+            _executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix='kb')
+        return _executor
+
+
+async def call(fn, *args, **kwargs):
+    ''' Await fn(*args, **kwargs) run in the knowledge base request pool '''
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor(), functools.partial(fn, *args, **kwargs))
@@ -11,6 +11,8 @@ from graph.alist import Alist
 from graph.alist import Attributes as tt
 from frank import config
 
+API_URL = 'http://api.conceptnet.io'
+
 
 def search_properties(search_term):
     results = []
@@ -50,7 +52,7 @@ def find_instance_elements(entity_name: str):
     results = []
     try:
         response = requests.get(
-            f'http://api.conceptnet.io/query?end=/c/en/{entity_name.lower()}&rel=/r/IsA')
+            f'{API_URL}/query?end=/c/en/{entity_name.lower()}&rel=/r/IsA')
         obj = response.json()
         results = [edge['start']['label'] for edge in obj['edges']]
     except Exception as ex:
@@ -62,7 +64,7 @@ def find_relation_subject(entity_name: str, relationName: str):
     results = []
     try:
         response = requests.get(
-            f'http://api.conceptnet.io/query?end=/c/en/{entity_name.lower()}&rel=/r/{relationName}')
+            f'{API_URL}/query?end=/c/en/{entity_name.lower()}&rel=/r/{relationName}')
         obj = response.json()
         results = [edge['start']['label'] for edge in obj['edges']]
     except Exception as ex:
@@ -85,7 +87,7 @@ def find_relation_object(entity_name: str, relationName: str):
     results = []
     try:
         response = requests.get(
-            f'http://api.conceptnet.io/query?start=/c/en/{entity_name.lower()}&rel=/r/{relationName}')
+            f'{API_URL}/query?start=/c/en/{entity_name.lower()}&rel=/r/{relationName}')
         obj = response.json()
         results = [edge['end']['label'] for edge in obj['edges']]
     except Exception as ex:
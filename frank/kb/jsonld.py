@@ -136,17 +136,9 @@ class JSONLD(KB):
         if search_element == tt.OBJECT:
             subject = alist.instantiation_value(tt.SUBJECT)
             nodes = self._get_nodes(subject)
-            results = []
-            for node in nodes:
-                try:
-                    data_alist = alist.copy()
-                    data_alist.set(tt.OBJECT, node[alist.get(tt.PROPERTY)])
-                    data_alist.data_sources = list(
-                        set(data_alist.data_sources + [self.name]))
-                    results.append(data_alist)
-                except:
-                    pass
-            return results
+            prop = alist.get(tt.PROPERTY)
+            values = [node[prop] for node in nodes if prop in node]
+            return Alist.from_template(alist, tt.OBJECT, values, self.name)
 
     def _get_introspection_entity(self, id_name: str):
         introspection_entity = next(
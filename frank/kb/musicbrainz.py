@@ -10,6 +10,8 @@ from graph.alist import Alist
 from graph.alist import Attributes as tt
 from frank import config
 
+API_URL = 'http://musicbrainz.org/ws/2'
+
 #format : artist sang/recorded title in date
 
 def search_properties(search_term):
@@ -39,40 +41,23 @@ def find_property_values(alist: Alist, search_element: str):
 
 
 def find_property_subject(alist: Alist):
-    alist_arr = []
     results = find_recording(
                 artist=None,
                 title=alist.get(tt.OBJECT),
                 date=alist.get(tt.TIME))
-    for item in results:
-        data_alist = alist.copy()
-        data_alist.set(tt.SUBJECT, item['artist'])
-        data_alist.data_sources = list(
-            set(data_alist.data_sources + ['musicbrainz']))
-        alist_arr.append(data_alist)
-        
-    return alist_arr
+    return Alist.from_template(alist, tt.SUBJECT, [item['artist'] for item in results], 'musicbrainz')
 
 
 def find_property_object(alist: Alist):
-    alist_arr = []
     results = find_recording(
                 artist=alist.get(tt.SUBJECT),
                 title=None,        
                 date=alist.get(tt.TIME))
 
-    for item in results:
-        data_alist = alist.copy()
-        data_alist.set(tt.OBJECT, item['title'])
-        data_alist.data_sources = list(
-            set(data_alist.data_sources + ['musicbrainz']))
-        alist_arr.append(data_alist)
-        
-    return alist_arr
+    return Alist.from_template(alist, tt.OBJECT, [item['title'] for item in results], 'musicbrainz')
 
 
 def find_propert_time(alist: Alist):
-    alist_arr = []
     results = find_recording(
                 artist=alist.get(tt.SUBJECT),
                 title=alist.get(tt.OBJECT),
@@ -91,15 +76,8 @@ def find_propert_time(alist: Alist):
     results_sorted = [k for k in sorted(results, key=lambda x: x['date'])]
 
 
-    for item in results_sorted:
-        data_alist = alist.copy()
-        data_alist.set(tt.TIME, item['date'])
-        data_alist.data_sources = list(
-            set(data_alist.data_sources + ['musicbrainz']))
-        alist_arr.append(data_alist)    
-        break #  greedy; take only the first answer returned
-        
-    return alist_arr
+    #  greedy; take only the first answer returned
+    return Alist.from_template(alist, tt.TIME, [item['date'] for item in results_sorted[:1]], 'musicbrainz')
 
 
 def find_recording(title=None, artist=None, date=None):
@@ -115,7 +93,7 @@ def find_recording(title=None, artist=None, date=None):
     results = []
     try:
         response = requests.get(
-            f'http://musicbrainz.org/ws/2/recording/?query={query}&inc=aliases&fmt=json')
+            f'{API_URL}/recording/?query={query}&inc=aliases&fmt=json')
         obj = response.json()
         if 'recordings' in obj:
             maxScore = -1
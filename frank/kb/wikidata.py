@@ -18,6 +18,9 @@ import frank.util.utils
 from datetime import datetime
 import frank.dataloader
 
+API_URL = 'https://www.wikidata.org/w/api.php'
+SPARQL_URL = 'https://query.wikidata.org/sparql'
+
 
 def search_properties(search_term):
     cache = {
@@ -82,7 +85,7 @@ def find_entity(entity_name: str, property_id: str, is_head=True):
         'format': 'json'
     }
     response = requests.get(
-        url='https://www.wikidata.org/w/api.php',
+        url=API_URL,
         params=params
     )
     data = response.json()
@@ -98,7 +101,7 @@ def find_entity(entity_name: str, property_id: str, is_head=True):
                         SERVICE wikibase:label {{  bd:serviceParam wikibase:language "en" .  }} }}
                     """.format(property_id=property_id)
             params = {'format': 'json', 'query': query_domain}
-            response = requests.get(url='https://query.wikidata.org/sparql', params=params)  
+            response = requests.get(url=SPARQL_URL, params=params)  
         try:
             if response:
                 data_domain = response.json()
@@ -115,7 +118,7 @@ def find_entity(entity_name: str, property_id: str, is_head=True):
                             SERVICE wikibase:label {{  bd:serviceParam wikibase:language "en" .  }} }}
                         """.format(entity_id=d['id'])            
                     params = {'format': 'json', 'query': query_entity_class}
-                    response = requests.get(url='https://query.wikidata.org/sparql', params=params)
+                    response = requests.get(url=SPARQL_URL, params=params)
                     
                     data_class = response.json()
                     classes = []
@@ -177,22 +180,19 @@ def find_property_subject(alist: Alist):
 
     params = {'format': 'json', 'query': query}
     response = requests.get(
-        url='https://query.wikidata.org/sparql', params=params)
-    alist_arr = []
+        url=SPARQL_URL, params=params)
+    rows = []
     try:
         data = response.json()
         for d in data['results']['bindings']:
-            data_alist = alist.copy()
-            data_alist.set(tt.SUBJECT, d['sLabel']['value'])
+            row = {tt.SUBJECT: d['sLabel']['value']}
             if 'year' in d:
-                data_alist.set(tt.TIME, d['year']['value'])
-            data_alist.data_sources = list(
-                set(data_alist.data_sources + ['wikidata']))
-            alist_arr.append(data_alist)
+                row[tt.TIME] = d['year']['value']
+            rows.append(row)
     except Exception as e:
         print("wikidata query response error: " + str(e))
 
-    return alist_arr
+    return Alist.from_template(alist, tt.SUBJECT, rows, 'wikidata')
 
 
 def find_property_object(alist: Alist):
@@ -223,8 +223,8 @@ def find_property_object(alist: Alist):
 
     params = {'format': 'json', 'query': query}
     response = requests.get(
-        url='https://query.wikidata.org/sparql', params=params)
-    alist_arr = []
+        url=SPARQL_URL, params=params)
+    rows = []
     try:
         data = response.json()
         ctx = {}
@@ -244,12 +244,7 @@ def find_property_object(alist: Alist):
             # then result must include time
             if (alist.get(tt.TIME) and tt.TIME not in ctx):
                 if ('year' in d) and (d['year']['value'] == alist.get(tt.TIME)):
-                    data_alist = alist.copy()
-                    data_alist.set(tt.OBJECT, d['oLabel']['value'])
-                    data_alist.set(tt.TIME, d['year']['value'])
-                    data_alist.data_sources = list(
-                        set(data_alist.data_sources + ['wikidata']))
-                    alist_arr.append(data_alist)
+                    rows.append({tt.OBJECT: d['oLabel']['value'], tt.TIME: d['year']['value']})
 
             # else if time is injected from context
             # then only append results that have no time only if the dataset is empty..
@@ -257,8 +252,8 @@ def find_property_object(alist: Alist):
             elif alist.get(tt.TIME) and tt.TIME in ctx:
                 current_year = str(datetime.now().year)
                 if (('year' in d) and (d['year']['value'] == alist.get(tt.TIME))) or  \
-                        ((((('year' in d) and (d['year']['value'] != alist.get(tt.TIME))) and len(alist_arr) == 0) or
-                          (('year' not in d) and len(alist_arr) == 0)) and
+                        ((((('year' in d) and (d['year']['value'] != alist.get(tt.TIME))) and len(rows) == 0) or
+                          (('year' not in d) and len(rows) == 0)) and
                          (
                             (alist.get(tt.TIME) == current_year and (not frank.util.utils.is_numeric(d['oLabel']['value']))) or
                             (alist.get(tt.TIME) ==
@@ -266,26 +261,18 @@ def find_property_object(alist: Alist):
                         )):
                     # last condition: append this value only if time (i.e the context time) is the current year and the data value is not numeric.
 
-                    data_alist = alist.copy()
-                    data_alist.set(tt.OBJECT, d['oLabel']['value'])
                     # if 'year' in d: # use time in dataset optionally
-                    #     data_alist.set(tt.TIME, d['year']['value'])
-                    data_alist.data_sources = list(
-                        set(data_alist.data_sources + ['wikidata']))
-                    alist_arr.append(data_alist)
+                    #     row[tt.TIME] = d['year']['value']
+                    rows.append({tt.OBJECT: d['oLabel']['value']})
             else:
-                data_alist = alist.copy()
-                data_alist.set(tt.OBJECT, d['oLabel']['value'])
                 # if 'year' in d: # use time in dataset optionally
-                #     data_alist.set(tt.TIME, d['year']['value'])
-                data_alist.data_sources = list(
-                    set(data_alist.data_sources + ['wikidata']))
-                alist_arr.append(data_alist)
+                #     row[tt.TIME] = d['year']['value']
+                rows.append({tt.OBJECT: d['oLabel']['value']})
 
     except Exception as ex:
         print("wikidata query response error: " + str(ex))
 
-    return alist_arr
+    return Alist.from_template(alist, tt.OBJECT, rows, 'wikidata')
 
 
 def find_propert_time(alist: Alist):
@@ -304,7 +291,7 @@ def isLocation(entity_name: str, property_id: str):
             """.format(entity_id=entity_id, property_id=property_id)
     params = {'format': 'json', 'query': query}
     response = requests.get(
-        url='https://query.wikidata.org/sparql', params=params)
+        url=SPARQL_URL, params=params)
     results = []
     try:
         data = response.json()
@@ -335,7 +322,7 @@ def findEntitiesOfGivenType(entity_class: str):
             """.format(entity_class_id=entity_class_id)
     params = {'format': 'json', 'query': query}
     response = requests.get(
-        url='https://query.wikidata.org/sparql', params=params)
+        url=SPARQL_URL, params=params)
     results = []
     try:
         data = response.json()
@@ -359,7 +346,7 @@ def find_entity_property_with_id(entity_name: str, property_id: str):
             """.format(entity_id=entity_id, property_id=property_id)
     params = {'format': 'json', 'query': query}
     response = requests.get(
-        url='https://query.wikidata.org/sparql', params=params)
+        url=SPARQL_URL, params=params)
     results = []
     try:
         data = response.json()
@@ -395,7 +382,7 @@ def find_sub_elements(entity_name: str, entity_class: str, sub_class: str):
             """.format(entity_id=entity_id, sub_class_id=sub_class_id, property_id=property_id)
     params = {'format': 'json', 'query': query}
     response = requests.get(
-        url='https://query.wikidata.org/sparql', params=params)
+        url=SPARQL_URL, params=params)
     results = []
     try:
         data = response.json()
@@ -429,7 +416,7 @@ def find_geopolitical_subelements(entity_name: str, sub_class: str):
             """
     params = {'format': 'json', 'query': query}
     response = requests.get(
-        url='https://query.wikidata.org/sparql', params=params)
+        url=SPARQL_URL, params=params)
     results = []
     try:
         data = response.json()
@@ -459,14 +446,8 @@ def _part_of_relation_subject(entity_name: str, relationName: str):
 
 
 def part_of_relation_subject(alist: Alist):
-    results = []
-    for r in _part_of_relation_subject(alist.get(tt.OBJECT), "location"):
-        fact_alist = alist.copy()
-        fact_alist.data_sources = list(
-            set(fact_alist.data_sources + ['wikidata']))
-        fact_alist.set(tt.SUBJECT, r)
-        results.append(fact_alist)
-    return results
+    return Alist.from_template(alist, tt.SUBJECT,
+                               _part_of_relation_subject(alist.get(tt.OBJECT), "location"), 'wikidata')
 
 
 # entity partOf ?x
@@ -492,26 +473,16 @@ def _part_of_relation_object(entity_name: str, relationName: str):
 
 
 def part_of_relation_object(alist: Alist):
-    results = []
-    for r in _part_of_relation_object(alist.get(tt.SUBJECT), "location"):
-        fact_alist = alist.copy()
-        fact_alist.data_sources = list(
-            set(fact_alist.data_sources + ['wikidata']))
-        fact_alist.set(tt.OBJECT, r)
-        results.append(fact_alist)
-    return results
+    return Alist.from_template(alist, tt.OBJECT,
+                               _part_of_relation_object(alist.get(tt.SUBJECT), "location"), 'wikidata')
 
 
 def part_of_geopolitical_subject(alist: Alist):
-    results = []
     geopolitical_type = alist.get(tt.PROPERTY).split(':')
-    for r in find_geopolitical_subelements(alist.get(tt.OBJECT), geopolitical_type[-1]):
-        fact_alist = alist.copy()
-        fact_alist.data_sources = list(
-            set(fact_alist.data_sources + ['wikidata']))
-        fact_alist.set(tt.SUBJECT, r)
-        results.append(fact_alist)
-    return results
+    # no sub-elements if the entity is not found
+    return Alist.from_template(alist, tt.SUBJECT,
+                               find_geopolitical_subelements(alist.get(tt.OBJECT), geopolitical_type[-1]) or [],
+                               'wikidata')
 
 
 def find_location_of_entity(entity_name: str):
@@ -535,7 +506,7 @@ def find_location_of_entity(entity_name: str):
             """
     params = {'format': 'json', 'query': query}
     response = requests.get(
-        url='https://query.wikidata.org/sparql', params=params)
+        url=SPARQL_URL, params=params)
     results = []
     try:
         data = response.json()
@@ -14,6 +14,8 @@ from frank.kb import rdf
 from frank import config
 import frank.dataloader
 
+API_URL = 'http://api.worldbank.org/v2'
+
 indicators = {
     "population": "SP.POP.TOTL",
     "gdp": "NY.GDP.MKTP.CD",
@@ -70,18 +72,13 @@ def find_property_object(alist: Alist):
         params = {'date': str(alist.get(tt.TIME)).replace(
             ".0", ""), 'format': 'json', 'per_page': 1000}
         response = requests.get(
-            url=f'http://api.worldbank.org/v2/countries/{country_id}/indicators/{alist.get(tt.PROPERTY)}',
+            url=f'{API_URL}/countries/{country_id}/indicators/{alist.get(tt.PROPERTY)}',
             params=params)
         try:
             data = response.json()
             if len(data) > 1 and data[1]:
-                for d in data[1]:
-                    if d['value']:
-                        data_alist = alist.copy()
-                        data_alist.set(tt.OBJECT, d['value'])
-                        data_alist.data_sources = list(
-                            set(data_alist.data_sources + ['worldbank']))
-                        results.append(data_alist)
+                results = Alist.from_template(alist, tt.OBJECT,
+                                              [d['value'] for d in data[1] if d['value']], 'worldbank')
         except Exception as ex:
             print("worldbank query response error: " + str(ex))
     except Exception as ex:
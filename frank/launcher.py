@@ -4,12 +4,16 @@ Description:
 
 
 '''
+import asyncio
+import os
 import time
 import timeit
 import uuid
 import json
 import threading
-from frank.infer import Infer
+from frank.infer import Infer, AsyncInfer
+from frank.strategy import create_strategy
+from frank.budget import create_budget
 
 from graph.alist import Alist
 from graph.alist import Attributes as tt
@@ -17,13 +21,16 @@ from graph.alist import States as states
 from graph.alist import Branching as branching
 from frank import config
 from frank.util import utils
-from graph.inference_graph import InferenceGraph
+from graph.inference_graph import create_inference_graph, GRAPH_BACKENDS
+from frank import processLog
 from frank.processLog import pcolors as pcol
 import frank.context
 
 
 class Launcher():
 
+    infer_class = Infer
+
     def __init__(self, **kwargs):
         self.infer: Infer = None
         self.timeout = 60  # self.timeout in seconds
@@ -32,11 +39,27 @@ class Launcher():
         self.question = ''
         self.debug = 0
         self.is_cli = False
+        self.last_checkpoint = time.time()
+        self.work = threading.Condition()
+        self.budget_exhausted = None
+
+    def start(self, question, alist: Alist, session_id, inference_graphs, debug=0, is_cli=False,
+              strategy=None, budget=None):
+        ''' Create new inference graph to infere answer.
+            strategy: search strategy of the session, a name or a Strategy (see frank.strategy)
+            budget: limits of the work of the session, a dict or a Budget (see frank.budget)'''
+        self._start_session(question, alist, session_id, inference_graphs, debug, is_cli, 
+                            strategy, budget)
+        self.schedule(-1)
 
-    def start(self, question, alist: Alist, session_id, inference_graphs, debug=0, is_cli=False):
-        ''' Create new inference graph to infere answer'''
-        G = InferenceGraph()
-        self.infer = Infer(G)
+    def _start_session(self, question, alist: Alist, session_id, inference_graphs, debug, is_cli,
+                       strategy=None, budget=None):
+        G = create_inference_graph(config.config['graph_backend'],
+                                   live_alists=config.config['live_alists'])
+        self.infer = self.infer_class(G)
+        self.infer.strategy = create_strategy(strategy)
+        self.infer.budget = create_budget(budget)
+        self.budget_exhausted = None
         self.infer.session_id = session_id
         self.inference_graphs = inference_graphs
         self.question = question
@@ -45,82 +68,196 @@ class Launcher():
         self.infer.debug = debug
         self.start_time = time.time()
         self.infer.last_heartbeat = time.time()
+        self.infer.budget.start()
         alist = frank.context.inject_query_context(alist)
         alist.check_variables()
         self.infer.enqueue_root(alist)
+        self.last_checkpoint = time.time()
+
+    def resume(self, checkpoint_path, inference_graphs, debug=0, is_cli=False, strategy=None,
+               budget=None):
+        ''' Continue a session from a checkpoint written by `checkpoint`.
+            The search continues from the frontier of the saved inference graph, 
+            so KB lookups done before the checkpoint are not repeated.
+            The session keeps its search strategy and budget limits unless strategy 
+            or budget is given; the use of the budget is counted from the resume.'''
+        self._resume_session(checkpoint_path, inference_graphs, debug, is_cli, strategy, budget)
         self.schedule(-1)
 
-    def api_start(self, question, alist_obj, session_id, inference_graphs):
+    def _resume_session(self, checkpoint_path, inference_graphs, debug, is_cli, strategy=None,
+                        budget=None):
+        graph_class = GRAPH_BACKENDS[config.config['graph_backend']]
+        G, extra = graph_class.load(checkpoint_path, 
+                                    live_alists=config.config['live_alists'], with_extra=True)
+        self.infer = self.infer_class(G)
+        self.infer.restore_state(extra['infer'])
+        self.infer.strategy = create_strategy(strategy or extra.get('strategy'))
+        self.infer.budget = create_budget(budget if budget is not None else extra.get('budget'))
+        self.budget_exhausted = None
+        self.inference_graphs = inference_graphs
+        self.question = extra.get('question', '')
+        self.debug = debug
+        self.is_cli = is_cli
+        self.infer.debug = debug
+        self.start_time = time.time()
+        self.infer.last_heartbeat = time.time()
+        self.last_checkpoint = time.time()
+
+    def checkpoint_path(self, session_id):
+        return os.path.join(config.config['checkpoint_dir'], f"{session_id}.frkc")
+
+    def checkpoint(self, force=False):
+        ''' Save the inference graph and session state if checkpoints are enabled 
+            and checkpoint_interval seconds have passed since the last one.
+            A failed checkpoint is logged and the session goes on; the previous
+            checkpoint file, if any, is kept.'''
+        if not config.config['checkpoint_dir']:
+            return
+        if not force and time.time() - self.last_checkpoint < config.config['checkpoint_interval']:
+            return
+        try:
+            os.makedirs(config.config['checkpoint_dir'], exist_ok=True)
+            self.infer.G.save(self.checkpoint_path(self.infer.session_id),
+                              extra={'infer': self.infer.checkpoint_state(), 'question': self.question,
+                                     'strategy': self.infer.strategy.name,
+                                     'budget': self.infer.budget.limits()})
+        except (TypeError, ValueError, OSError) as ex:
+            self.infer.write_trace(
+                f"{pcol.RED}Checkpoint failed: {ex}{pcol.RESETALL}", processLog.LogLevel.ERROR)
+        # a failing checkpoint is not retried before the next interval
+        self.last_checkpoint = time.time()
+
+    def compact(self):
+        ''' Fold the fully reduced parts of the inference graph into summary nodes if compaction is enabled'''
+        if not config.config['compact_reduced']:
+            return
+        spill_dir = config.config['compaction_spill_dir']
+        if spill_dir:
+            spill_dir = os.path.join(spill_dir, str(self.infer.session_id))
+        self.infer.G.compact(spill_dir=spill_dir)
+
+    def api_start(self, question, alist_obj, session_id, inference_graphs, strategy=None, budget=None):
 
         alist = Alist(**alist_obj)
         t = threading.Thread(target=self.start, args=(
-            question, alist, session_id, inference_graphs))
+            question, alist, session_id, inference_graphs), 
+            kwargs={'strategy': strategy, 'budget': budget})
         t.start()
         return session_id
 
-    def schedule(self, last_root_prop_depth):
+    def schedule(self, last_root_prop_depth=-1):
         ''' Loop through the leaves of the inference graph and 
-        schedule nodes to resolve.
+        schedule nodes to resolve, until the frontier is empty or the 
+        session is cancelled. 
+        
+        When no node can be resolved while frontier nodes are being 
+        explored elsewhere, wait until `notify` is called or self.timeout 
+        seconds have passed without inference activity.
+        Once the budget of the session is exhausted, only reducible nodes 
+        are resolved. self.work is held while the graph is changed, and
+        released while the KB searches of the nodes are awaited.
         '''
-        if time.time() - self.infer.last_heartbeat > self.timeout:
-            # stop and print any answer found
-            self.cache_and_print_answer(True)
-
         max_prop_depth_diff = 1
-        stop_flag = False
+        self.infer.lock = self.work
         while True:
-            if self.infer.session_id in self.inference_graphs:
-                self.inference_graphs[self.infer.session_id]['graph'] = self.infer.G
-                if self.inference_graphs[self.infer.session_id]['command'] == 'cancel':
-                    print(f"\n{pcol.RED}Session Cancelled{pcol.RESETALL} \n")
-                    stop_flag = True
-                    break                
-            else:
-                self.inference_graphs[self.infer.session_id] = {
-                    'graph': self.infer.G,
-                    'command' : None,
-                    'intermediate_answer': None,
-                    'answer': None,
-                }
-            flag = False
-            # first check if there are any leaf nodes that can be reduced
-            reducible, _ = self.infer.G.frontier(state=states.REDUCIBLE, update_state=False)
-            if reducible:
-                propagatedToRoot = self.infer.run_frank(reducible[0])
-                if propagatedToRoot:
-                    self.cache_and_print_answer(False)
-                    flag = True
-
-            if not flag:
-                # check if there are any unexplored leaf nodes
-                unexplored, _ = self.infer.G.frontier(state=states.UNEXPLORED, update_state=False)
-                # if unexplored and last_root_prop_depth > 0 and (unexplored[0].depth > last_root_prop_depth + max_prop_depth_diff):
-                #     stop_flag = True
-                #     break
-                if unexplored:
-                    propagatedToRoot = self.infer.run_frank(unexplored[0])
+            if self.update_session():
+                break
+            # other threads change the graph while holding self.work (see notify)
+            with self.work:
+                self.compact()
+                self.checkpoint()
+                self.check_budget()
+                flag = False
+                resolved = False
+                # first check if there are any leaf nodes that can be reduced
+                reducible = self.infer.G.frontier_head(state=states.REDUCIBLE)
+                if reducible:
+                    resolved = True
+                    propagatedToRoot = self.infer.run_frank(reducible)
+                    self.work.notify_all()
                     if propagatedToRoot:
-                        last_root_prop_depth = unexplored[0].depth
                         self.cache_and_print_answer(False)
                         flag = True
-                # else:
-                #     stop_flag = True
-                #     break
-            if not flag:
+
+                if not flag and not self.budget_exhausted:
+                    # check if there are any unexplored leaf nodes
+                    unexplored = self.unexplored_batch()
+                    # if unexplored and last_root_prop_depth > 0 and (unexplored.depth > last_root_prop_depth + max_prop_depth_diff):
+                    #     break
+                    if unexplored:
+                        resolved = True
+                        results = self.infer.run_frank_batch(unexplored)
+                        self.work.notify_all()
+                        for node, propagatedToRoot in zip(unexplored, results):
+                            if propagatedToRoot:
+                                last_root_prop_depth = node.depth
+                                flag = True
+                        if flag:
+                            self.cache_and_print_answer(False)
+            if not resolved and (self.budget_exhausted or not self.wait_for_work()):
                 break
 
-        if stop_flag:
-            self.cache_and_print_answer(True)
+        # stop and print any answer found
+        self.cache_and_print_answer(True)
+
+    def wait_for_work(self):
+        ''' Wait for frontier nodes being explored elsewhere to add new work.
+            Return False if no frontier node is being explored or there has been 
+            no inference activity for self.timeout seconds.'''
+        G = self.infer.G
+        with self.work:
+            if not G.frontier_head(state=states.EXPLORING):
+                return False
+            if G.frontier_head(state=states.REDUCIBLE) or G.frontier_head(state=states.UNEXPLORED):
+                return True
+            timeout = self.wait_timeout()
+            if timeout <= 0:
+                return False
+            self.work.wait(timeout)
+            return True
+
+    def wait_timeout(self):
+        ''' Seconds left until self.timeout seconds without inference activity
+            or the end of the wall time of the budget '''
+        timeout = self.timeout - (time.time() - self.infer.last_heartbeat)
+        budget_left = self.infer.budget.time_left()
+        return timeout if budget_left is None else min(timeout, budget_left)
+
+    def check_budget(self):
+        ''' Record the limit of the budget that has been reached in self.budget_exhausted '''
+        if not self.budget_exhausted:
+            self.budget_exhausted = self.infer.budget.exhausted(self.infer.G)
+            if self.budget_exhausted:
+                print(f"\n{pcol.RED}Budget exhausted: {self.budget_exhausted}{pcol.RESETALL} \n")
+
+    def notify(self):
+        ''' Wake the threads waiting for work in the session, e.g. after changing 
+            its command or, while holding self.work, its inference graph from 
+            another thread. The scheduler notifies after each node it resolves. '''
+        with self.work:
+            self.work.notify_all()
+
+    def unexplored_batch(self):
+        ''' The unexplored frontier nodes to resolve together, chosen by the 
+            search strategy of the session: up to config['thread_pool'] nodes '''
+        return self.infer.strategy.select(self.infer, max(1, config.config['thread_pool']))
+
+    def update_session(self):
+        ''' Publish the inference graph of the session in inference_graphs.
+            Return True if the session has been cancelled.'''
+        if self.infer.session_id in self.inference_graphs:
+            self.inference_graphs[self.infer.session_id]['graph'] = self.infer.G
+            if self.inference_graphs[self.infer.session_id]['command'] == 'cancel':
+                print(f"\n{pcol.RED}Session Cancelled{pcol.RESETALL} \n")
+                return True
         else:
-            # if no answer has been propagated to root and
-            if time.time() - self.infer.last_heartbeat <= self.timeout:
-                time.sleep(3)
-            unexplored, _ = self.infer.G.frontier(update_state=False)
-            if unexplored:
-                self.schedule(last_root_prop_depth)
-            else:
-                # stop and print any answer found
-                self.cache_and_print_answer(True)
+            self.inference_graphs[self.infer.session_id] = {
+                'graph': self.infer.G,
+                'command' : None,
+                'intermediate_answer': None,
+                'answer': None,
+            }
+        return False
 
     def cache_and_print_answer(self, isFinal=False):
         elapsed_time = time.time() - self.start_time
@@ -157,22 +294,100 @@ class Launcher():
                        "elapsed_time": f"{round(elapsed_time)}s",
                        "alist": self.infer.propagated_alists[-1].attributes
                        }
+            if self.budget_exhausted:
+                # the latest intermediate answer, with its error bar
+                ans_obj["budget_exhausted"] = self.budget_exhausted
 
             self.inference_graphs[self.infer.session_id]['graph'] = self.infer.G
             self.inference_graphs[self.infer.session_id]['intermediate_answer'] = ans_obj
             self.inference_graphs[self.infer.session_id]['answer'] = ans_obj if isFinal else None
 
             if self.debug == 1 and self.is_cli:
-                self.infer.G.plot_plotly(question=self.question, answer=answer)
+                self.infer.G.plot_plotly(question=self.question, answer=answer,
+                                         renderer=config.config['plot_renderer'],
+                                         fact_threshold=config.config['plot_fact_threshold'])
 
 
             if isFinal:
                 print(f"\n{pcol.CYAN}Answer alist{pcol.RESETALL} \n" +
                       json.dumps(ans_obj, indent=2))
                 if self.is_cli:
-                    self.infer.G.plot_plotly(question=self.question, answer=answer)
+                    self.infer.G.plot_plotly(question=self.question, answer=answer,
+                                             renderer=config.config['plot_renderer'],
+                                             fact_threshold=config.config['plot_fact_threshold'])
                 
 
+class AsyncLauncher(Launcher):
+    ''' Launcher of sessions on an asyncio event loop.
+
+        Up to config['async_frontier_width'] frontier nodes of a session are 
+        resolved at a time with AsyncInfer, and many sessions can run on the 
+        same loop, e.g. with asyncio.gather(*[AsyncLauncher().start(...), ...]).
+    '''
+
+    infer_class = AsyncInfer
+
+    async def start(self, question, alist: Alist, session_id, inference_graphs, debug=0, is_cli=False,
+                    strategy=None, budget=None):
+        ''' Create new inference graph to infere answer (see `Launcher.start`)'''
+        self._start_session(question, alist, session_id, inference_graphs, debug, is_cli, 
+                            strategy, budget)
+        await self.schedule()
+
+    async def resume(self, checkpoint_path, inference_graphs, debug=0, is_cli=False, strategy=None,
+                     budget=None):
+        ''' Continue a session from a checkpoint (see `Launcher.resume`)'''
+        self._resume_session(checkpoint_path, inference_graphs, debug, is_cli, strategy, budget)
+        await self.schedule()
+
+    async def api_start(self, question, alist_obj, session_id, inference_graphs, strategy=None,
+                        budget=None):
+        alist = Alist(**alist_obj)
+        asyncio.ensure_future(self.start(question, alist, session_id, inference_graphs, 
+                                         strategy=strategy, budget=budget))
+        return session_id
+
+    async def schedule(self):
+        ''' Resolve the frontier nodes of the inference graph, reducible ones first,
+            until the frontier is empty, the session is cancelled or times out.
+            Once the budget of the session is exhausted, only reducible nodes 
+            are resolved.
+        '''
+        G = self.infer.G
+        width = max(1, config.config['async_frontier_width'])
+        running = set()
+        while True:
+            if self.update_session():
+                break
+            self.compact()
+            self.checkpoint()
+            self.check_budget()
+            while len(running) < width:
+                node = G.frontier_head(state=states.REDUCIBLE)
+                if not node and not self.budget_exhausted:
+                    node = next(iter(self.infer.strategy.select(self.infer)), None)
+                if not node:
+                    break
+                # take the node off the frontier before its first await
+                node.state = states.EXPLORING
+                G.add_alist(node)
+                running.add(asyncio.ensure_future(self.infer.run_frank(node)))
+            if not running:
+                break
+            done, running = await asyncio.wait(running, timeout=max(0.0, self.wait_timeout()), 
+                                               return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                # no inference activity for self.timeout seconds or the wall time is over
+                break
+            for task in done:
+                if task.result():
+                    self.cache_and_print_answer(False)
+
+        for task in running:
+            task.cancel()
+        self.cache_and_print_answer(True)
+
+
 # if __name__ == '__main__':
 #     launcher = Launcher()
 #     launcher.cli()
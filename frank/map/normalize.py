@@ -40,7 +40,7 @@ class Normalize(Map):
                 map_op_node = alist.copy()
                 map_op_node.set(tt.OP, map_op)
                 map_op_node.set(tt.OPVAR, nest_attr)
-                del map_op_node.attributes[nest_attr]
+                map_op_node.remove(nest_attr)
                 map_op_node.cost = alist.cost + 1
                 map_op_node.branch_type = br.AND
                 map_op_node.state = states.EXPLORED
@@ -103,7 +103,7 @@ class Normalize(Map):
                 map_op_node = alist.copy()
                 map_op_node.set(tt.OPVAR, nest_attr)
                 map_op_node.set(tt.OP, map_op)
-                del map_op_node.attributes[nest_attr]
+                map_op_node.remove(nest_attr)
                 map_op_node.cost = alist.cost + 1
                 map_op_node.state = states.EXPLORED
                 map_op_node.parent_decomposition = 'normalize'
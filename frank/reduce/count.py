@@ -16,12 +16,16 @@ from graph.alist import NodeTypes as nt
 from frank.util import utils
 from frank.uncertainty.aggregateUncertainty import estimate_uncertainty
 from graph.inference_graph import InferenceGraph
+from graph import fact_table
+
+fact_tables = True
 
 # FIXME opvars and getting instantiations of variables
 def reduce(alist: Alist, children: List[Alist], G: InferenceGraph):
     variables = alist.variables()
-    data = [x.instantiation_value(alist.get(tt.OPVAR)) for x in children
-            if (x not in list(variables.keys()) and x not in list(variables.values()))]
+    data = [v for x in children
+            if (x not in list(variables.keys()) and x not in list(variables.values()))
+            for v in fact_table.instantiation_values(x, alist.get(tt.OPVAR))]
     item_count = len(data)
     try:
         if item_count == 1 and children[0].get(tt.OP) == 'list':
@@ -31,6 +35,6 @@ def reduce(alist: Alist, children: List[Alist], G: InferenceGraph):
     alist.instantiate_variable(alist.get(tt.OPVAR), item_count)
 
     alist.instantiate_variable(tt.COV, estimate_uncertainty(
-        children, False, alist.get(tt.OP), len(children)
+        children, False, alist.get(tt.OP), fact_table.row_count(children)
     ))
     return alist
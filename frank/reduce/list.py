@@ -16,6 +16,9 @@ from frank.util import utils
 from frank.uncertainty.aggregateUncertainty import estimate_uncertainty
 from frank.reduce import propagate
 from graph.inference_graph import InferenceGraph
+from graph import fact_table
+
+fact_tables = True
 
 
 def reduce(node: Alist, children: List[Alist], G: InferenceGraph):
@@ -29,15 +32,15 @@ def reduce(node: Alist, children: List[Alist], G: InferenceGraph):
             opvs = opv
 
         for ov in opvs:
-            v = x.instantiation_value(ov)
-            if v and type(v) == str and v[0] == '[' and v[-1] == ']':
-                try:
-                    v = json.loads(v)
-                    data.extend(v)
-                except:
-                    pass
-            else:
-                data.append(v)
+            for v in fact_table.instantiation_values(x, ov):
+                if v and type(v) == str and v[0] == '[' and v[-1] == ']':
+                    try:
+                        v = json.loads(v)
+                        data.extend(v)
+                    except:
+                        pass
+                else:
+                    data.append(v)
        
     data_str = json.dumps(data)
     node.instantiate_variable(node.getOpVar(), data_str)
@@ -48,6 +51,6 @@ def reduce(node: Alist, children: List[Alist], G: InferenceGraph):
 
     # TODO: port code for cov calculations
     node.instantiate_variable(tt.COV, estimate_uncertainty(
-        children, False, node.get(tt.OP), len(children)
+        children, False, node.get(tt.OP), fact_table.row_count(children)
     ))
     return node
@@ -17,11 +17,15 @@ from frank.util import utils
 from frank.uncertainty.aggregateUncertainty import estimate_uncertainty
 from frank.reduce import propagate
 from graph.inference_graph import InferenceGraph
+from graph import fact_table
+
+fact_tables = True
 
 
 def reduce(node: Alist, children: List[Alist], G: InferenceGraph):
     opvars = node.getOpVar()
     if len(opvars) > 1:
+        children = fact_table.expand(children)
         operands = []
         opvarval = {}
         for ov in opvars:
@@ -33,7 +37,7 @@ def reduce(node: Alist, children: List[Alist], G: InferenceGraph):
             result = min(operands)
         else:
             return None
-    elif len(opvars) == 1 and len(children) == 1 and '[' in str(children[0].instantiation_value(opvars[0])) and ']' in str(children[0].instantiation_value(opvars[0])):
+    elif len(opvars) == 1 and len(children) == 1 and not fact_table.is_fact_table(children[0]) and '[' in str(children[0].instantiation_value(opvars[0])) and ']' in str(children[0].instantiation_value(opvars[0])):
         operands = []
         opvarval = {}
         try:
@@ -48,14 +52,18 @@ def reduce(node: Alist, children: List[Alist], G: InferenceGraph):
             
     else:
         projvar = node.projection_variable_names()[0]
-        data = {x: utils.get_number(x.instantiation_value(
-        node.get(tt.OPVAR)), 999999999999999) for x in children if x.instantiation_value(
-          node.get(tt.OPVAR))}
+        # (value, projection) of the first row with the smallest value
+        data = None
+        for x in children:
+            for v, p in zip(fact_table.instantiation_values(x, node.get(tt.OPVAR)),
+                            fact_table.values(x, projvar)):
+                if v:
+                    number = utils.get_number(v, 999999999999999)
+                    if data is None or number < data[0]:
+                        data = (number, p)
         if data:
-            minNode = min(data, key=data.get)
-            minValue = data[minNode]
+            minValue, result = data
             node.instantiate_variable(node.get(tt.OPVAR), minValue)
-            result = minNode.get(projvar)
         else:
             return None
 
@@ -67,6 +75,6 @@ def reduce(node: Alist, children: List[Alist], G: InferenceGraph):
 
 
     node.instantiate_variable(tt.COV, estimate_uncertainty(
-        children, True, node.get(tt.OP), len(children)
+        children, True, node.get(tt.OP), fact_table.row_count(children)
     ))
     return node
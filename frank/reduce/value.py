@@ -21,8 +21,9 @@ from frank.util import utils
 from frank.uncertainty.aggregateUncertainty import estimate_uncertainty
 from frank.reduce import propagate
 from graph.inference_graph import InferenceGraph
+from graph import fact_table
 
-
+fact_tables = True
 
 def reduce(node: Alist, children: List[Alist], G: InferenceGraph):
     total = 0.0
@@ -30,27 +31,27 @@ def reduce(node: Alist, children: List[Alist], G: InferenceGraph):
     nonNumList = []
     inst_vars = node.instantiated_attributes().keys()
     for c in children:
-        for k, v in c.instantiated_attributes().items():
+        for k, v in fact_table.shared_instantiated_attributes(c).items():
             if k not in inst_vars and k in node.attributes and k != tt.OP:
                 c.instantiate_variable(k, v)
 
         # opVarValue = c.operation_value()
-        opVarValue = c.get(tt.OPVALUE)
-        if isinstance(opVarValue, str) and opVarValue[0] == '[' and opVarValue[-1] == ']':
-            try:
-                opVarValue = json.loads(opVarValue)
-            except:
-                pass
-        else:
-            opVarValue = [opVarValue]
-        
-
-        for opval in opVarValue:
-            if utils.is_numeric(opval):
-                total += float(opval)
-                numList.append(float(opval))
+        for opVarValue in fact_table.values(c, tt.OPVALUE):
+            if isinstance(opVarValue, str) and opVarValue[0] == '[' and opVarValue[-1] == ']':
+                try:
+                    opVarValue = json.loads(opVarValue)
+                except:
+                    pass
             else:
-                 nonNumList.append(opval)
+                opVarValue = [opVarValue]
+            
+
+            for opval in opVarValue:
+                if utils.is_numeric(opval):
+                    total += float(opval)
+                    numList.append(float(opval))
+                else:
+                     nonNumList.append(opval)
 
     if not isinstance(node.get(tt.OPVAR), list):
         if numList or nonNumList:
@@ -88,7 +89,7 @@ def reduce(node: Alist, children: List[Alist], G: InferenceGraph):
 
 
     node.instantiate_variable(tt.COV, estimate_uncertainty(
-        children, len(numList) == len(
-            children), node.get(tt.OP), len(children)
+        children, len(numList) == fact_table.row_count(
+            children), node.get(tt.OP), fact_table.row_count(children)
     ))
     return node
@@ -0,0 +1,145 @@
+'''
+File: strategy.py
+Description: Search strategies of a session: the order in which Launcher
+             resolves the unexplored frontier nodes of the inference graph
+             and Infer applies the decomposition rules to an alist.
+
+A strategy is chosen per query with the `strategy` argument of
+Launcher.start, a name or a Strategy object such as Beam(width=4)
+(default: config['search_strategy']):
+
+    cost                 lowest accumulated cost first (the default)
+    best_first           lowest accumulated cost plus `heuristic` first
+    beam                 best_first keeping the config['beam_width'] best
+                         nodes of each depth; the others are ignored
+    iterative_deepening  lowest cost first among the nodes no deeper than a
+                         bound, deepened by config['deepening_step'] up to
+                         config['max_depth'] until an answer is found
+
+'''
+
+import random
+
+from graph.alist import Attributes as tt
+from graph.alist import States as states
+from frank import config
+from frank.processLog import pcolors as pcol
+
+
+def heuristic(alist):
+    ''' Estimate of the decompositions still needed to resolve an alist:
+        one for each uninstantiated nesting variable (normalize) and for each
+        uninstantiated s, p, o or t attribute after the one a lookup instantiates '''
+    uninstantiated = alist.uninstantiated_attributes()
+    lookup_vars = sum(1 for x in (tt.SUBJECT, tt.PROPERTY, tt.OBJECT, tt.TIME) if x in uninstantiated)
+    return len(alist.uninstantiated_nesting_variables() or {}) + max(0, lookup_vars - 1)
+
+
+class Strategy:
+    ''' Lowest accumulated cost first, decomposition rules in random order '''
+
+    name = 'cost'
+
+    def map_ops(self, alist, ops):
+        ''' Order in which the decomposition rules in ops are applied to an alist '''
+        random.shuffle(ops)
+        return ops
+
+    def select(self, infer, width=1):
+        ''' Up to width unexplored frontier nodes of infer.G to resolve next,
+            with distinct fingerprints '''
+        G = infer.G
+        if width == 1:
+            head = G.frontier_head(state=states.UNEXPLORED)
+            return [head] if head else []
+        return G.frontier(size=width, state=states.UNEXPLORED, dedupe=True)[0]
+
+
+class BestFirst(Strategy):
+    ''' Lowest accumulated cost plus `heuristic` first,
+        decomposition rules in the order of config['base_decompositions'] '''
+
+    name = 'best_first'
+
+    def map_ops(self, alist, ops):
+        return ops
+
+    def ranked(self, infer):
+        ''' The unexplored frontier nodes sorted by accumulated cost plus heuristic '''
+        nodes = infer.G.frontier(state=states.UNEXPLORED, dedupe=True)[0]
+        # nodes are sorted by cost: ties keep the frontier order
+        return sorted(nodes, key=lambda x: x.cost + heuristic(x))
+
+    def select(self, infer, width=1):
+        return self.ranked(infer)[:width]
+
+
+class Beam(BestFirst):
+    ''' best_first that resolves only the `width` best nodes of each depth,
+        shallowest depth first; the other nodes of the depth are ignored '''
+
+    name = 'beam'
+
+    def __init__(self, width=None):
+        self.width = width or config.config['beam_width']
+        self.resolved = {}
+
+    def select(self, infer, width=1):
+        G = infer.G
+        while True:
+            nodes = self.ranked(infer)
+            if not nodes:
+                return []
+            depth = min(x.depth for x in nodes)
+            level = [x for x in nodes if x.depth == depth]
+            quota = max(0, self.width - self.resolved.get(depth, 0))
+            for x in level[quota:]:
+                infer.write_trace(
+                    f"{pcol.RED}outside beam {G.display_id(x.id)}{pcol.RESET}-{x}{pcol.RESETALL}")
+                x.state = states.IGNORE
+                G.add_alist(x)
+            selected = level[:min(quota, width)]
+            if selected:
+                self.resolved[depth] = self.resolved.get(depth, 0) + len(selected)
+                return selected
+
+
+class IterativeDeepening(Strategy):
+    ''' Lowest accumulated cost first among the nodes no deeper than a bound.
+        When none is left, the bound is deepened by `step` unless an answer
+        has been found, nodes are still being explored or the bound is
+        config['max_depth']. The graph built within the previous bound is kept. '''
+
+    name = 'iterative_deepening'
+
+    def __init__(self, step=None):
+        self.step = step or config.config['deepening_step']
+        self.bound = self.step
+
+    def select(self, infer, width=1):
+        G = infer.G
+        while True:
+            nodes = [x for x in G.frontier(state=states.UNEXPLORED, dedupe=True)[0]
+                     if x.depth <= self.bound]
+            if nodes:
+                return nodes[:width]
+            if infer.propagated_alists or G.frontier_head(state=states.EXPLORING) \
+                    or self.bound >= config.config['max_depth'] \
+                    or not G.frontier_head(state=states.UNEXPLORED):
+                return []
+            self.bound = min(self.bound + self.step, config.config['max_depth'])
+            infer.write_trace(f"{pcol.BLUE}depth bound {self.bound}{pcol.RESETALL}")
+
+
+STRATEGIES = {s.name: s for s in (Strategy, BestFirst, Beam, IterativeDeepening)}
+
+
+def create_strategy(strategy=None):
+    ''' Create a search strategy by name (default: config['search_strategy']);
+        a Strategy object is returned as it is '''
+    if isinstance(strategy, Strategy):
+        return strategy
+    name = strategy or config.config['search_strategy']
+    if name not in STRATEGIES:
+        raise ValueError(f"unknown search strategy '{name}', expected one of {list(STRATEGIES)}")
+    return STRATEGIES[name]()
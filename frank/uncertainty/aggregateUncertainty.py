@@ -7,6 +7,7 @@ Description: Estimate uncertainty in a reduce operation given a list of alists t
 import math
 from graph.alist import Alist
 from graph.alist import Attributes as tt
+from graph import fact_table
 from frank.util import utils
 
 
@@ -16,23 +17,25 @@ def estimate_uncertainty(nodes: list, all_numeric: bool, operation: str, child_c
         variance_values = []
         sum_variance = 0.0
         sum_mean = 0.0
-        n = len(nodes)
+        n = fact_table.row_count(nodes)
         # todo: for now assume the real-valued objects are being estimated
         for r in nodes:
-            node_variance = 0.0
-            objValue = r.instantiation_value(tt.OBJECT)
-            if utils.is_numeric(objValue):
-                numeric_value = utils.get_number(objValue, 0)
-                node_variance = math.pow(r.get(tt.COV) * numeric_value, 2)
-                sum_mean += numeric_value
-            else:
-                # todo: work on this later; may not work as expected for non-real-valued objects
-                node_variance = math.pow(r.get(tt.COV), 2)
-                sum_mean += 1.0
-            variance_values.append(node_variance)
-            sum_variance += node_variance
-
-        missRatio = 1 - (len(nodes)/child_count)
+            # one (object, cov) pair per row of a fact table
+            for objValue, cov in zip(fact_table.instantiation_values(r, tt.OBJECT),
+                                     fact_table.values(r, tt.COV)):
+                node_variance = 0.0
+                if utils.is_numeric(objValue):
+                    numeric_value = utils.get_number(objValue, 0)
+                    node_variance = math.pow(cov * numeric_value, 2)
+                    sum_mean += numeric_value
+                else:
+                    # todo: work on this later; may not work as expected for non-real-valued objects
+                    node_variance = math.pow(cov, 2)
+                    sum_mean += 1.0
+                variance_values.append(node_variance)
+                sum_variance += node_variance
+
+        missRatio = 1 - (n/child_count)
         if operation.lower() in ["value", "mean", "avg", "regress", "product"]:
             combined_confidence = math.sqrt(sum_variance/n)/(sum_mean/n)
         else:
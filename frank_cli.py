@@ -31,9 +31,15 @@ argparser.add_argument("-o", "--output", type=str,
     default="output.json", help="file to output batch query results to; (default = output.json)")
 argparser.add_argument("-d", "--debug", type=int,
     default=0, help="plot inference graph during decompositions")
+argparser.add_argument("-r", "--resume", type=str,
+    help="checkpoint file of a session to resume; see checkpoint_dir in frank/config.py")
+argparser.add_argument("-b", "--budget", type=str,
+    help='limits of the work of the query, e.g. \'{"kb_calls": 20, "nodes": 500, "wall_time": 10, "depth": 6}\'; (default = query_budget in frank/config.py)')
+argparser.add_argument("-s", "--strategy", type=str,
+    help="search strategy: cost, best_first, beam or iterative_deepening; (default = search_strategy in frank/config.py)")
 
 
-def cli(query, context={}, debug=0):
+def cli(query, context={}, debug=0, strategy=None, budget=None):
     session_id = uuid.uuid4().hex
     interactive = False
     answer = None
@@ -62,7 +68,10 @@ def cli(query, context={}, debug=0):
         print(f"{pcol.YELLOW} ├── query alist:{json.dumps(alist.attributes)} {pcol.RESETALL}")
         print(f"{pcol.YELLOW} └── session id:{session_id} {pcol.RESETALL}\n")
         launch = Launcher()
-        launch.start(query, alist, session_id, inference_graphs, debug, is_cli=True)
+        if type(budget) == str:
+            budget = json.loads(budget)
+        launch.start(query, alist, session_id, inference_graphs, debug, is_cli=True, strategy=strategy,
+                     budget=budget)
 
         if session_id in inference_graphs:
             answer = inference_graphs[session_id]['answer']['answer']
@@ -74,12 +83,24 @@ def cli(query, context={}, debug=0):
         print("\nCould not parse question. Please try again.")
     return answer
 
-def batch(batch_file, output, debug=0):
+def resume(checkpoint_path, debug=0, strategy=None, budget=None):
+    if type(budget) == str:
+        budget = json.loads(budget)
+    launch = Launcher()
+    launch.resume(checkpoint_path, inference_graphs, debug, is_cli=True, strategy=strategy, budget=budget)
+    session_id = launch.infer.session_id
+    answer = None
+    if session_id in inference_graphs and inference_graphs[session_id]['answer']:
+        answer = inference_graphs[session_id]['answer']['answer']
+    return answer
+
+def batch(batch_file, output, debug=0, strategy=None, budget=None):
     results = []
     with open(batch_file) as json_file:
         queries = json.load(json_file)
         for q in queries:
-            answer = cli(q['question'], q['context'], debug)
+            answer = cli(q['question'], q['context'], debug, q.get('strategy', strategy), 
+                         q.get('budget', budget))
             results.append({'id': q['id'], 'answer': answer})
             with open(output, 'w') as out_file:
                 json.dump(results, out_file)
@@ -96,8 +117,10 @@ if __name__ == '__main__':
     if args.file and args.context:
         print("\nCannot use --context together with the --file flag.")  
 
-    if args.file:
-        batch(args.file, args.output, args.debug)
+    if args.resume:
+        resume(args.resume, args.debug, args.strategy, args.budget)
+    elif args.file:
+        batch(args.file, args.output, args.debug, args.strategy, args.budget)
     else:
-        cli(args.query, args.context, args.debug)
+        cli(args.query, args.context, args.debug, args.strategy, args.budget)
  
\ No newline at end of file
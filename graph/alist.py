@@ -6,117 +6,302 @@ Description: Alist class and functions
 '''
 
 from copy import deepcopy
+import hashlib
 import json
 
 
+# marker for attributes that are not set
+_UNSET = object()
+
+
 class Alist:
-    def __init__(self, **kwargs):
-        self.attributes = {
-            Attributes.ID: kwargs[Attributes.ID] if Attributes.ID in kwargs else "0",
-            Attributes.OP: kwargs[Attributes.OP] if Attributes.OP in kwargs else 'value',
-            Attributes.SUBJECT: kwargs[Attributes.SUBJECT] if Attributes.SUBJECT in kwargs else '',
-            Attributes.PROPERTY: kwargs[Attributes.PROPERTY] if Attributes.PROPERTY in kwargs else '',
-            Attributes.OBJECT: kwargs[Attributes.OBJECT] if Attributes.OBJECT in kwargs else '',
-            Attributes.OPVAR: kwargs[Attributes.OPVAR] if Attributes.OPVAR in kwargs else '',
-            Attributes.COV: kwargs[Attributes.COV] if Attributes.COV in kwargs else 0.0,
-            Attributes.TIME: kwargs[Attributes.TIME] if Attributes.TIME in kwargs else '',
-            Attributes.EXPLAIN: kwargs[Attributes.EXPLAIN] if Attributes.EXPLAIN in kwargs else '',
-            Attributes.FNPLOT: kwargs[Attributes.FNPLOT] if Attributes.FNPLOT in kwargs else '',
-            Attributes.CONTEXT: kwargs[Attributes.CONTEXT] if Attributes.CONTEXT in kwargs else '',
-            'meta': {
-                'cost': kwargs[Attributes.COST] if Attributes.COST in kwargs else 0.0,
-                'depth': 0,
-                'state': States.UNEXPLORED,
-                'data_sources': [],
-                'branch_type': Branching.OR,
-                'node_type': NodeTypes.ZNODE,
-                'is_map' : 1,
-                'is_frontier' : 0
-            }
-        }
+    # fixed instance layout: no per-instance __dict__.
+    # The core attributes (id, h, s, p, o, v, u, t, xp, fp, cx and the operation
+    # value) and the meta data (cost, depth, state, ...) are kept in slots; the
+    # other attributes, mostly variables (?x, $y, #z), in the _vars side map.
+    # `attributes` returns the dict form, with the meta data in 'meta'.
+    __slots__ = ('_id', '_h', '_s', '_p', '_o', '_v', '_u', '_t', '_xp', '_fp', '_cx', '_opvalue',
+                 '_cost', '_depth', '_state', '_data_sources', '_branch_type', '_node_type',
+                 '_is_map', '_is_frontier', '_meta', '_vars',
+                 '_owned', '_var_refs', '_dict_keys', '_value_cache', '_instantiated_cache',
+                 '_opvars', '_fingerprint', '_graph',
+                 '_children', '_parent', '_enqueue_only', '_enqueue_and_process',
+                 'parent_decomposition')
 
-        for k in set(kwargs) - {Attributes.OP, Attributes.SUBJECT, Attributes.PROPERTY, Attributes.OBJECT,
-                                Attributes.OPVAR, Attributes.COV, Attributes.TIME, Attributes.EXPLAIN,
-                                Attributes.FNPLOT, Attributes.CONTEXT}:
-            self.attributes[k] = kwargs[k]
-        self.children = []
-        self.parent = []
-        # these are for set comprehension operations when a node spawns new nodes after reducing
-        self.nodes_to_enqueue_only = []
-        self.nodes_to_enqueue_and_process = []
+    def __init__(self, **kwargs):
+        get = kwargs.get
+        self._id = get(Attributes.ID, "0")
+        self._h = get(Attributes.OP, 'value')
+        self._s = get(Attributes.SUBJECT, '')
+        self._p = get(Attributes.PROPERTY, '')
+        self._o = get(Attributes.OBJECT, '')
+        self._v = get(Attributes.OPVAR, '')
+        self._u = get(Attributes.COV, 0.0)
+        self._t = get(Attributes.TIME, '')
+        self._xp = get(Attributes.EXPLAIN, '')
+        self._fp = get(Attributes.FNPLOT, '')
+        self._cx = get(Attributes.CONTEXT, '')
+        self._opvalue = get(Attributes.OPVALUE, _UNSET)
+        meta = get('meta')
+        if meta is None:
+            self._cost = get(Attributes.COST, 0.0)
+            self._depth = 0
+            self._state = States.UNEXPLORED
+            self._data_sources = []
+            self._branch_type = Branching.OR
+            self._node_type = NodeTypes.ZNODE
+            self._is_map = 1
+            self._is_frontier = 0
+            self._meta = None
+        else:
+            self._load_meta(meta)
+
+        # the other attributes; None when there are none
+        self._vars = None
+        if not kwargs.keys() <= _INIT_KEYS:
+            self._vars = {k: v for k, v in kwargs.items() if k not in _INIT_KEYS}
+        # attributes whose nested values (context, nested alists, lists) were
+        # copied by this alist and are not referenced by any other. Other nested
+        # values may be shared and are copied before being modified in place.
+        # None when there are none.
+        self._owned = None
+
+        # variable index, built on first use (see _variable_index) and then
+        # kept up to date by _store and remove; None until built.
+        # The variables themselves are the keys of _vars.
+        #   _var_refs: variable name -> attributes whose value is that variable
+        #   _dict_keys: attributes with dict values (e.g. nested alists)
+        self._var_refs = None
+        self._dict_keys = None
+
+        # resolved variable chains: attribute -> instantiation value / is_instantiated.
+        # Every attribute on a resolved chain is cached (path compression);
+        # both caches are cleared when an attribute on a cached chain is reassigned.
+        # None until first used.
+        self._value_cache = None
+        self._instantiated_cache = None
+        # parsed operation variables; reset when the OPVAR attribute is set
+        self._opvars = None
+        # structural fingerprint (see _Fingerprint); None until first used
+        self._fingerprint = None
+        # inference graph that holds this alist; notified of changes
+        # (see _meta_changed and _touch)
+        self._graph = None
+        # see the children, parent, nodes_to_enqueue_only and
+        # nodes_to_enqueue_and_process properties; None until used
+        self._children = None
+        self._parent = None
+        self._enqueue_only = None
+        self._enqueue_and_process = None
         self.parent_decomposition = ''
 
+    def _load_meta(self, meta):
+        """ Set the meta data from the 'meta' dict of the dict form """
+        get = meta.get
+        self._cost = get('cost', 0.0)
+        self._depth = get('depth', 0)
+        self._state = get('state', States.UNEXPLORED)
+        self._data_sources = meta['data_sources'] if 'data_sources' in meta else []
+        self._branch_type = get('branch_type', Branching.OR)
+        self._node_type = get('node_type', NodeTypes.ZNODE)
+        self._is_map = get('is_map', 1)
+        self._is_frontier = get('is_frontier', 0)
+        # other meta data, e.g. the columns of a fact table; None when there is none
+        self._meta = None
+        if not meta.keys() <= _META_KEYS:
+            self._meta = {k: v for k, v in meta.items() if k not in _META_KEYS}
+
     @property
     def id(self):
-        return self.attributes[Attributes.ID]
+        return self._id
 
     @id.setter
     def id(self, value):
-        self.attributes[Attributes.ID] = value
+        self._store(Attributes.ID, value)
 
     @property
     def cost(self):
-        return self.attributes['meta']['cost']
+        return self._cost
 
     @cost.setter
     def cost(self, value):
-        self.attributes['meta']['cost'] = value
+        self._cost = value
+        self._meta_changed('cost')
 
     @property
     def depth(self):
-        return self.attributes['meta']['depth']
+        return self._depth
 
     @depth.setter
     def depth(self, value):
-        self.attributes['meta']['depth'] = value
+        self._depth = value
+        self._meta_changed('depth')
 
     @property
     def state(self):
-        return self.attributes['meta']['state']
+        return self._state
 
     @state.setter
     def state(self, value):
-        self.attributes['meta']['state'] = value
+        self._state = value
+        self._meta_changed('state')
 
     @property
     def data_sources(self):
-        return self.attributes['meta']['data_sources']
+        return self._data_sources
 
     @data_sources.setter
     def data_sources(self, value):
-        self.attributes['meta']['data_sources'] = value
+        self._data_sources = value
+        self._meta_changed('data_sources')
 
     @property
     def branch_type(self):
-        return self.attributes['meta']['branch_type']
+        return self._branch_type
 
     @branch_type.setter
     def branch_type(self, value):
-        self.attributes['meta']['branch_type'] = value
+        self._branch_type = value
+        self._meta_changed('branch_type')
 
     @property
     def node_type(self):
-        return self.attributes['meta']['node_type']
+        return self._node_type
 
     @node_type.setter
     def node_type(self, value):
-        self.attributes['meta']['node_type'] = value
+        self._node_type = value
+        self._meta_changed('node_type')
 
     @property
     def is_map(self):
-        return self.attributes['meta']['is_map']
+        return self._is_map
 
     @is_map.setter
     def is_map(self, value):
-        self.attributes['meta']['is_map'] = value
+        self._is_map = value
+        self._meta_changed('is_map')
 
     @property
     def is_frontier(self):
-        return self.attributes['meta']['is_frontier']
+        return self._is_frontier
 
-    @is_map.setter
+    @is_frontier.setter
     def is_frontier(self, value):
-        self.attributes['meta']['is_frontier'] = value
+        self._is_frontier = value
+        self._meta_changed('is_frontier')
+
+    @property
+    def meta(self):
+        """ The meta data as in the dict form of the alist (a new dict) """
+        meta = {
+            'cost': self._cost,
+            'depth': self._depth,
+            'state': self._state,
+            'data_sources': self._data_sources,
+            'branch_type': self._branch_type,
+            'node_type': self._node_type,
+            'is_map': self._is_map,
+            'is_frontier': self._is_frontier
+        }
+        if self._meta:
+            meta.update(self._meta)
+        return meta
+
+    def get_meta(self, key):
+        """ Returns the value of a meta data attribute, or None if it is not set """
+        if key in _META_KEYS:
+            return getattr(self, '_' + key)
+        return self._meta.get(key) if self._meta else None
+
+    def set_meta(self, key, value):
+        """ Sets a meta data attribute, e.g. 'fact_table' or 'state' """
+        if key in _META_KEYS:
+            setattr(self, key, value)
+            return
+        if self._meta is None:
+            self._meta = {}
+        self._meta[key] = value
+        self._meta_changed(key)
+
+    def remove_meta(self, key):
+        """ Removes a meta data attribute other than the ones with a property (cost, state, ...) """
+        if self._meta and key in self._meta:
+            del self._meta[key]
+            if not self._meta:
+                self._meta = None
+            self._meta_changed(key)
+
+    @property
+    def attributes(self):
+        """ 
+        Returns the alist in its dict form: the attributes and the meta 
+        data in 'meta'. This is a new dict; nested values are shared with
+        the alist and should not be modified.
+        """
+        attrs = {}
+        for k, slot in _CORE_ITEMS:
+            value = getattr(self, slot)
+            if value is not _UNSET:
+                attrs[k] = value
+        attrs['meta'] = self.meta
+        if self._vars:
+            attrs.update(self._vars)
+        if self._opvalue is not _UNSET:
+            attrs[Attributes.OPVALUE] = self._opvalue
+        return attrs
+
+    def _items(self):
+        """ The attributes and their values, without the meta data """
+        for k, slot in _CORE_ITEMS:
+            value = getattr(self, slot)
+            if value is not _UNSET:
+                yield k, value
+        if self._vars:
+            yield from self._vars.items()
+        if self._opvalue is not _UNSET:
+            yield Attributes.OPVALUE, self._opvalue
+
+    @property
+    def children(self):
+        if self._children is None:
+            self._children = []
+        return self._children
+
+    @children.setter
+    def children(self, value):
+        self._children = value
+
+    @property
+    def parent(self):
+        if self._parent is None:
+            self._parent = []
+        return self._parent
+
+    @parent.setter
+    def parent(self, value):
+        self._parent = value
+
+    # these are for set comprehension operations when a node spawns new nodes after reducing
+    @property
+    def nodes_to_enqueue_only(self):
+        if self._enqueue_only is None:
+            self._enqueue_only = []
+        return self._enqueue_only
+
+    @nodes_to_enqueue_only.setter
+    def nodes_to_enqueue_only(self, value):
+        self._enqueue_only = value
+
+    @property
+    def nodes_to_enqueue_and_process(self):
+        if self._enqueue_and_process is None:
+            self._enqueue_and_process = []
+        return self._enqueue_and_process
+
+    @nodes_to_enqueue_and_process.setter
+    def nodes_to_enqueue_and_process(self, value):
+        self._enqueue_and_process = value
 
     def set(self, attribute, value):
         """
@@ -124,36 +309,179 @@ class Alist:
         Do not use this for instantiating a variable.
         """
         if isinstance(attribute, str):
-            self.attributes[attribute] = value
-        if attribute == Attributes.ID:
-            self.id = value
+            self._store(attribute, value)
+
+    def remove(self, attribute):
+        """ Removes an attribute from the alist """
+        value = self._get(attribute)
+        if value is _UNSET:
+            return
+        self._unindex(attribute, value)
+        if self._owned:
+            self._owned.discard(attribute)
+        self._invalidate(attribute)
+        slot = _CORE_SLOTS.get(attribute)
+        if slot is not None:
+            setattr(self, slot, _UNSET)
+        else:
+            del self._vars[attribute]
+        self._touch(attribute)
+
+    def _get(self, attribute):
+        """ The value of an attribute, _UNSET if it is not set """
+        slot = _CORE_SLOTS.get(attribute)
+        if slot is not None:
+            return getattr(self, slot)
+        if self._vars is not None:
+            return self._vars.get(attribute, _UNSET)
+        return _UNSET
+
+    def _store(self, attribute, value):
+        """ Assign an attribute value and update the variable index """
+        if attribute == 'meta':
+            self._load_meta(value)
+            for k in value:
+                self._meta_changed(k)
+            return
+        if attribute == Attributes.ID and self._graph is not None and value != self._id:
+            self._graph._detach_alist(self)
+        slot = _CORE_SLOTS.get(attribute)
+        if slot is not None:
+            old = getattr(self, slot)
+        elif self._vars is not None:
+            old = self._vars.get(attribute, _UNSET)
+        else:
+            old = _UNSET
+        if old is not _UNSET:
+            self._unindex(attribute, old)
+        if self._owned:
+            self._owned.discard(attribute)
+        self._invalidate(attribute)
+        if slot is not None:
+            setattr(self, slot, value)
+        else:
+            if self._vars is None:
+                self._vars = {}
+            self._vars[attribute] = value
+        self._index(attribute, value)
+        self._touch(attribute)
+
+    def _touch(self, attribute):
+        """ Tell the inference graph that holds this alist that an attribute changed """
+        if self._graph is not None:
+            self._graph._alist_attribute_changed(self, attribute)
+
+    def _meta_changed(self, key):
+        """ Tell the inference graph that holds this alist that its meta data changed """
+        if self._graph is not None:
+            self._graph._alist_meta_changed(self, key)
+
+    def _invalidate(self, attribute):
+        """ Clear cached values derived from the attribute """
+        if (self._value_cache and attribute in self._value_cache) or \
+                (self._instantiated_cache and attribute in self._instantiated_cache):
+            self._value_cache = None
+            self._instantiated_cache = None
+        if attribute == Attributes.OPVAR:
+            self._opvars = None
+        fp = self._fingerprint
+        if fp is not None and attribute in fp.all_deps:
+            if fp.shared:
+                fp = self._fingerprint = fp.copy()
+            fp.invalidate(attribute)
+
+    def _variable_index(self):
+        """ The variable index (_var_refs, _dict_keys), built on first use """
+        if self._var_refs is None:
+            self._var_refs = {}
+            self._dict_keys = {}
+            for k, v in self._items():
+                self._index(k, v)
+        return self._var_refs, self._dict_keys
+
+    def _index(self, attribute, value):
+        if self._var_refs is None:
+            return
+        if isinstance(value, str):
+            if is_variable(value):
+                self._var_refs.setdefault(value, {})[attribute] = None
+        elif isinstance(value, dict):
+            self._dict_keys[attribute] = None
+
+    def _unindex(self, attribute, value):
+        if self._var_refs is None:
+            return
+        if isinstance(value, str):
+            refs = self._var_refs.get(value)
+            if refs is not None:
+                refs.pop(attribute, None)
+                if not refs:
+                    del self._var_refs[value]
+        elif isinstance(value, dict):
+            self._dict_keys.pop(attribute, None)
+
+    def _variable_keys(self, prefixes=None):
+        """ Attribute names that are variables (with one of the prefixes) """
+        if not self._vars:
+            return []
+        prefixes = prefixes or _VAR_PREFIXES
+        return [k for k in self._vars if k[:1] in prefixes]
 
     def get(self, attribute):
         """ 
         Returns the value assigned to the attribute, 
         not necessarily its instantiated value
         """
-        if attribute in self.attributes:
-            return self.attributes[attribute]
-        else:
-            return None
+        slot = _CORE_SLOTS.get(attribute)
+        if slot is not None:
+            value = getattr(self, slot)
+            return None if value is _UNSET else value
+        if self._vars is not None and attribute in self._vars:
+            return self._vars[attribute]
+        if attribute == 'meta':
+            return self.meta
+        return None
+
+    def get_mutable(self, attribute):
+        """
+        Returns the value of an attribute for in-place modification.
+        A nested value that is shared with copies of this alist is 
+        duplicated first (copy-on-write).
+        """
+        value = self._get(attribute)
+        if isinstance(value, (dict, list)) and not (self._owned and attribute in self._owned):
+            if self._owned is None:
+                self._owned = set()
+            self._owned.add(attribute)
+            slot = _CORE_SLOTS.get(attribute)
+            if slot is not None:
+                setattr(self, slot, deepcopy(value))
+            else:
+                self._vars[attribute] = deepcopy(value)
+        # the caller may change the value in place
+        self._invalidate(attribute)
+        self._touch(attribute)
+        return self.get(attribute)
 
     def getOpVar(self):
-        v = self.attributes[Attributes.OPVAR]
-        try:
-            v = json.loads(v) # if there list of vars
-        except:
-            pass
-        if isinstance(v, list) == False:
-            v = [v]
-        v = [x for x in v if str(x).startswith((VarPrefix.AUXILLIARY, VarPrefix.NESTING, VarPrefix.PROJECTION))]
-        return v
+        """ Returns the list of operation variables in the OPVAR attribute """
+        if self._opvars is None:
+            v = self._v
+            if isinstance(v, str) and v.strip().startswith('['):
+                try:
+                    v = json.loads(v) # if there list of vars
+                except ValueError:
+                    pass
+            if isinstance(v, list) == False:
+                v = [] if v is _UNSET else [v]
+            self._opvars = [x for x in v if str(x).startswith((VarPrefix.AUXILLIARY, VarPrefix.NESTING, VarPrefix.PROJECTION))]
+        return list(self._opvars)
 
     def check_variables(self):
         # ensure all variables are attribute keys too
         variables = self.variable_names()
         for v in variables:
-            if v not in list(self.attributes.keys()):
+            if self._get(v) is _UNSET:
                 self.set(v, '')
 
         proj_vars = self.projection_variables()
@@ -168,7 +496,7 @@ class Alist:
             def_proj_var = self.__default_projection_variable()
             self.set(def_proj_var, op_vars[0])
 
-        if Attributes.OPVALUE not in self.attributes:
+        if self._opvalue is _UNSET:
             self.set(Attributes.OPVALUE, '')
         
     def __default_projection_variable(self):
@@ -176,52 +504,163 @@ class Alist:
 
     def has_default_projection_variable(self):
         def_proj_var = self.__default_projection_variable()
-        return def_proj_var in self.attributes
+        return self._get(def_proj_var) is not _UNSET
 
 
     def copy(self, same_state=False, exclude_attr=[]):
-        """ create a copy of the Alist"""
-        new_alist_attrs = deepcopy(self.attributes)
+        """ 
+        Create a copy of the Alist.
+        Nested attribute values (context, nested alists) are shared 
+        with the copy and only duplicated when either alist modifies them 
+        through `get_mutable`. The meta data, including the data sources, 
+        is copied.
+        """
+        new_alist = self._clone()
         for excl in exclude_attr:
-            del new_alist_attrs[excl]
+            if excl in _CORE_DEFAULTS:
+                new_alist._store(excl, _CORE_DEFAULTS[excl])
+            else:
+                new_alist.remove(excl)
         # remove default projection variable
-        if self.__default_projection_variable() in new_alist_attrs:
-            del new_alist_attrs[self.__default_projection_variable()]
-        new_alist = Alist(**new_alist_attrs)
-        new_alist.id = "0"
-        new_alist.cost = 0
-        new_alist.depth = 0
-        new_alist.state = self.state if same_state else States.UNEXPLORED
-        new_alist.nodes_to_enqueue_only = []
-        new_alist.nodes_to_enqueue_and_process = []
-        
-        new_alist.data_sources = deepcopy(self.data_sources)
+        new_alist.remove(self.__default_projection_variable())
+        new_alist._store(Attributes.ID, "0")
+        new_alist._cost = 0
+        new_alist._depth = 0
+        new_alist._state = self._state if same_state else States.UNEXPLORED
+        return new_alist
+
+    @classmethod
+    def from_template(cls, template, column, values, source=None):
+        """
+        Create one alist per value from a template alist, e.g. the fact 
+        alists for the bindings of a KB query result.
+        Each alist is a copy of the template with `column` set to the value.
+        A value can also be a dict of attribute values to set 
+        (e.g. {OBJECT: ..., TIME: ...}), in which case `column` is not used.
+        `source` is added to the data sources of the new alists.
+        The copies share the nested attribute values of the prototype 
+        built from the template; each has its own meta data and data 
+        sources list.
+        """
+        prototype = template.copy()
+        if source is not None and source not in prototype.data_sources:
+            prototype.data_sources = prototype.data_sources + [source]
+        alists = []
+        for value in values:
+            alist = prototype._clone()
+            if isinstance(value, dict):
+                for k, v in value.items():
+                    alist._store(k, v)
+            else:
+                alist._store(column, value)
+            alists.append(alist)
+        return alists
+
+    def _clone(self):
+        """ 
+        Copy the alist together with its variable index and caches, 
+        without rebuilding them. Nested values are shared with the copy
+        (copy-on-write); the meta data, including the data sources, is copied.
+        """
+        new_alist = Alist.__new__(Alist)
+        for slot in _VALUE_SLOTS:
+            setattr(new_alist, slot, getattr(self, slot))
+        ds = self._data_sources
+        new_alist._data_sources = ds.copy() if isinstance(ds, (list, set, dict)) else ds
+        new_alist._meta = copy_meta(self._meta) if self._meta else None
+        new_alist._vars = dict(self._vars) if self._vars else None
+        # nested values are now shared by both alists
+        self._owned = new_alist._owned = None
+        if self._var_refs is not None:
+            new_alist._var_refs = {k: dict(v) for k, v in self._var_refs.items()}
+            new_alist._dict_keys = dict(self._dict_keys)
+        else:
+            new_alist._var_refs = new_alist._dict_keys = None
+        new_alist._value_cache = dict(self._value_cache) if self._value_cache else None
+        new_alist._instantiated_cache = dict(self._instantiated_cache) if self._instantiated_cache else None
+        # replaced (never modified in place) when invalidated
+        new_alist._opvars = self._opvars
+        # copied before it is updated (copy-on-write)
+        if self._fingerprint is not None:
+            self._fingerprint.shared = True
+        new_alist._fingerprint = self._fingerprint
+        new_alist._graph = None
+        new_alist._children = None
+        new_alist._parent = None
+        new_alist._enqueue_only = None
+        new_alist._enqueue_and_process = None
+        new_alist.parent_decomposition = ''
         return new_alist
 
     def get_alist_json_with_metadata(self):
-        Alist = deepcopy(self.attributes)
-        Alist[Attributes.ID] = self.id
-        return Alist
+        """ 
+        Returns the attributes dict of the alist. 
+        Nested values are shared with the alist and should not be modified.
+        """
+        return self.attributes
+
+    def fingerprint(self):
+        """
+        Returns a stable fingerprint (hex digest) of the subproblem described 
+        by the alist: its operation, subject, property, object, time, 
+        operation variables and effective context.
+        Instantiated variables contribute their values. Uninstantiated 
+        variables are renamed after the first term they appear in, so alists 
+        that only differ in the names of their variables have the same fingerprint.
+        Only the parts of the fingerprint that depend on a changed attribute
+        are recomputed (see _Fingerprint).
+        """
+        fp = self._fingerprint
+        if fp is None:
+            fp = self._fingerprint = _Fingerprint()
+        elif not fp.dirty:
+            return fp.value
+        elif fp.shared:
+            fp = self._fingerprint = fp.copy()
+        fp.update(self)
+        return fp.value
 
     def is_instantiated(self, attr_name):
         """ 
         Returns FALSE if the value of the attribute is a variable
         or an empty string.
         """
-        if attr_name in self.attributes and (len(str(self.attributes[attr_name]).strip()) > 0) and \
-             not str(self.attributes[attr_name]).startswith((VarPrefix.AUXILLIARY, VarPrefix.NESTING, VarPrefix.PROJECTION)) and \
-             isinstance(self.attributes[attr_name], str):
-            return True
-        elif attr_name not in self.attributes or not self.attributes[attr_name]:
-            return False
-        else:
-            if attr_name in [Attributes.SUBJECT, Attributes.OBJECT, Attributes.PROPERTY, Attributes.TIME] or \
-                str(self.attributes[attr_name]).startswith((VarPrefix.AUXILLIARY, VarPrefix.NESTING, VarPrefix.PROJECTION)):
-                return self.is_instantiated(self.attributes[attr_name])
-            elif isinstance(self.attributes[attr_name], dict):
-                return False
+        cache = self._instantiated_cache
+        if cache is None:
+            cache = self._instantiated_cache = {}
+        elif attr_name in cache:
+            return cache[attr_name]
+
+        # follow the variable chain and cache the result for every attribute on it
+        path = []
+        name = attr_name
+        while True:
+            if name in cache:
+                result = cache[name]
+                break
+            path.append(name)
+            value = self._get(name)
+            if value is _UNSET:
+                result = False
+                break
+            if isinstance(value, str) and value.strip() and not is_variable(value):
+                result = True
+                break
+            elif not value:
+                result = False
+                break
+            elif name in [Attributes.SUBJECT, Attributes.OBJECT, Attributes.PROPERTY, Attributes.TIME] or \
+                    str(value).startswith((VarPrefix.AUXILLIARY, VarPrefix.NESTING, VarPrefix.PROJECTION)):
+                if value in path:
+                    result = False
+                    break
+                name = value
             else:
-                return True
+                result = not isinstance(value, dict)
+                break
+        for n in path:
+            cache[n] = result
+        return result
 
     def is_all_instantiated(self):
         """ 
@@ -235,31 +674,31 @@ class Alist:
 
 
     def variables(self):
-        """ Returns a list of all variables in the Alist"""
-        variables = {x: y for (x, y) in self.attributes.items()
-                     if str(x).startswith((VarPrefix.AUXILLIARY, VarPrefix.NESTING, VarPrefix.PROJECTION)) or
-                     str(y).startswith((VarPrefix.AUXILLIARY,
-                                        VarPrefix.NESTING, VarPrefix.PROJECTION))
-                     }
+        """ 
+        Returns a dict of all attributes that are variables 
+        or whose values are variables
+        """
+        variables = {x: self._vars[x] for x in self._variable_keys()}
+        for refs in self._variable_index()[0].values():
+            for x in refs:
+                variables[x] = self._get(x)
         return variables
 
     def variable_names(self):
         """ Returns a list of all variables in the Alist"""
-        variables = [x for x in list(self.attributes.keys()) + list(self.attributes.values())
-                     if str(x).startswith((VarPrefix.AUXILLIARY, VarPrefix.NESTING, VarPrefix.PROJECTION))]
-        return list(set(variables))
+        variables = dict.fromkeys(self._variable_keys())
+        variables.update(dict.fromkeys(self._variable_index()[0]))
+        return list(variables)
     
 
     def instantiated_attributes(self):
         """ Returns a dictionary of variables and their instantiations"""
-        variables = {x: y for (x, y) in self.attributes.items()
+        variables = {x: y for (x, y) in self._items()
                      if self.is_instantiated(x)}
         return variables
 
     def uninstantiated_attributes(self):
-        variables = set(self.variables())
-        inst_variables = set(self.instantiated_attributes())
-        return {x:self.get(x) for  x in list(variables - inst_variables)}
+        return {x: y for x, y in self.variables().items() if not self.is_instantiated(x)}
 
     def instantiation_value(self, attrName):
         """
@@ -267,12 +706,35 @@ class Alist:
         For an attribute whose values is a variables, 
         find the value that the variable is instantiated to.
         """
-        if attrName not in self.attributes or isinstance(self.attributes[attrName], dict):
-            return None
-        if str(self.attributes[attrName]).startswith((VarPrefix.AUXILLIARY, VarPrefix.NESTING, VarPrefix.PROJECTION)):
-            return self.instantiation_value(self.attributes[attrName])
-        else:
-            return self.attributes[attrName]
+        cache = self._value_cache
+        if cache is None:
+            cache = self._value_cache = {}
+        elif attrName in cache:
+            return cache[attrName]
+
+        # follow the variable chain and cache the result for every attribute on it
+        path = []
+        name = attrName
+        while True:
+            if name in cache:
+                result = cache[name]
+                break
+            path.append(name)
+            value = self._get(name)
+            if value is _UNSET or isinstance(value, dict):
+                result = None
+                break
+            if str(value).startswith((VarPrefix.AUXILLIARY, VarPrefix.NESTING, VarPrefix.PROJECTION)):
+                if value in path:
+                    result = None
+                    break
+                name = value
+            else:
+                result = value
+                break
+        for n in path:
+            cache[n] = result
+        return result
 
     def projected_value(self):
         projection_var = self.projection_variable_names()
@@ -299,39 +761,38 @@ class Alist:
 
     def variable_references(self, varName):
         """ Get all attribute names that reference the variable name"""
+        if is_variable(varName):
+            refs = self._variable_index()[0].get(varName, {})
+            return {x: self._get(x) for x in refs}
         varRefs = {x: y for (x, y) in self.attributes.items() if y == varName}
         return varRefs
 
     def projection_variables(self):
-        variables = {x: y for (x, y) in self.attributes.items()
-                     if str(x).startswith(VarPrefix.PROJECTION)}
+        variables = {x: self._vars[x] for x in self._variable_keys((VarPrefix.PROJECTION,))}
         if variables:
             return variables
         else:
             return None
     
     def projection_variable_names(self):
-        variables = [x for x in self.attributes.keys()
-                     if str(x).startswith(VarPrefix.PROJECTION)]
+        variables = self._variable_keys((VarPrefix.PROJECTION,))
         if variables:
             return variables
         else:
             return None
 
     def nesting_variables(self):
-        variables = {x: y for (x, y) in self.attributes.items()
-                     if str(x).startswith(VarPrefix.NESTING) or isinstance(y, dict)
-                     }
+        variables = {x: self._vars[x] for x in self._variable_keys((VarPrefix.NESTING,))}
+        for x in self._variable_index()[1]:
+            variables[x] = self._get(x)
         if variables:
             return variables
         else:
             return None
 
     def uninstantiated_nesting_variables(self):
-        variables = {x: y for (x, y) in self.attributes.items()
-                     if str(x).startswith((VarPrefix.AUXILLIARY, VarPrefix.NESTING, VarPrefix.PROJECTION))
-                     and isinstance(y, dict)
-                     and x != Attributes.CONTEXT
+        variables = {x: self._get(x) for x in self._variable_index()[1]
+                     if is_variable(x) and x != Attributes.CONTEXT
                      }
         if variables:
             return variables
@@ -339,8 +800,9 @@ class Alist:
             return None
 
     def instantiated_nesting_variables(self):
-        variables = {x: y for (x, y) in self.attributes.items()
-                     if str(x).startswith((VarPrefix.AUXILLIARY, VarPrefix.NESTING, VarPrefix.PROJECTION)) and (isinstance(y, dict) == False)
+        dict_keys = self._variable_index()[1]
+        variables = {x: self._vars[x] for x in self._variable_keys()
+                     if x not in dict_keys
                      }
         if variables:
             return variables
@@ -374,17 +836,21 @@ class Alist:
             if not isinstance(varName, str):
                 return;
 
-            if insert_missing or varName in self.attributes:
-                self.attributes[varName] = varValue
-
-            for (k, v) in self.attributes.items():
-                if str(v) == varName and \
-                        str(k).startswith((VarPrefix.AUXILLIARY, VarPrefix.NESTING, VarPrefix.PROJECTION)):
-                    self.attributes[k] = varValue
-                if str(v) == varName and \
-                        str(v).startswith((VarPrefix.AUXILLIARY, VarPrefix.NESTING, VarPrefix.PROJECTION)):
-                    if insert_missing or k in self.attributes:
-                        self.attributes[v] = varValue
+            if insert_missing or self._get(varName) is not _UNSET:
+                self._store(varName, varValue)
+
+            if is_variable(varName):
+                # variables that reference varName take its value
+                refs = list(self._variable_index()[0].get(varName, {}))
+                for k in refs:
+                    if is_variable(k):
+                        self._store(k, varValue)
+                if refs:
+                    self._store(varName, varValue)
+            else:
+                for k in self._variable_keys():
+                    if str(self._vars[k]) == varName:
+                        self._store(k, varValue)
 
     def get_object_level_attributes(self):
         olattrs = {x: y for (x, y) in self.attributes.items()
@@ -396,7 +862,11 @@ class Alist:
         return Alist1.cost < Alist2.cost
 
     def __str__(self):
-        return str(self.get_alist_json_with_metadata())
+        return str(self.attributes)
+
+    def __contains__(self, attribute):
+        """ Returns TRUE if the attribute is set """
+        return self._get(attribute) is not _UNSET
 
     def __getitem__(self, key):
         return self.get(key)
@@ -404,6 +874,9 @@ class Alist:
     def __setitem__(self, key, value):
         self.set(key, value)
 
+    def __delitem__(self, key):
+        self.remove(key)
+
 
 
 # Alist States
@@ -450,10 +923,213 @@ class VarPrefix:
     NESTING = '#'
 
 
+def copy_meta(meta):
+    """ 
+    Copy the meta data of an alist that has no property (see Alist.get_meta).
+    Mutable values are copied too, since callers may modify them in place;
+    the nested values of a fact table are read-only and stay shared.
+    """
+    meta = dict(meta)
+    for k, v in meta.items():
+        if isinstance(v, (list, set, dict)):
+            meta[k] = v.copy()
+    return meta
+
+
+def is_variable(name):
+    """ Returns TRUE if the attribute name or value is a variable name """
+    return isinstance(name, str) and name[:1] in (VarPrefix.PROJECTION, VarPrefix.AUXILLIARY, VarPrefix.NESTING)
+
+
 class NodeTypes:
     ZNODE = 'znode'
     HNODE = 'hnode'
     FACT = 'fact'
+    SUMMARY = 'summary'
+    FACT_TABLE = 'fact_table'
+
+
+# slots of the core attributes of Alist, in the order of the dict form
+_CORE_ITEMS = ((Attributes.ID, '_id'), (Attributes.OP, '_h'), (Attributes.SUBJECT, '_s'),
+               (Attributes.PROPERTY, '_p'), (Attributes.OBJECT, '_o'), (Attributes.OPVAR, '_v'),
+               (Attributes.COV, '_u'), (Attributes.TIME, '_t'), (Attributes.EXPLAIN, '_xp'),
+               (Attributes.FNPLOT, '_fp'), (Attributes.CONTEXT, '_cx'))
+_CORE_SLOTS = dict(_CORE_ITEMS, **{Attributes.OPVALUE: '_opvalue'})
+_CORE_DEFAULTS = {Attributes.ID: "0", Attributes.OP: 'value', Attributes.SUBJECT: '',
+                  Attributes.PROPERTY: '', Attributes.OBJECT: '', Attributes.OPVAR: '',
+                  Attributes.COV: 0.0, Attributes.TIME: '', Attributes.EXPLAIN: '',
+                  Attributes.FNPLOT: '', Attributes.CONTEXT: ''}
+# keyword arguments of Alist() that are not kept in _vars
+_INIT_KEYS = frozenset(_CORE_SLOTS) | {'meta'}
+# meta data with an Alist property (and slot)
+_META_KEYS = frozenset(('cost', 'depth', 'state', 'data_sources', 'branch_type',
+                        'node_type', 'is_map', 'is_frontier'))
+# slots that Alist._clone copies as they are
+_VALUE_SLOTS = tuple(_CORE_SLOTS.values()) + tuple('_' + k for k in _META_KEYS if k != 'data_sources')
+_VAR_PREFIXES = (VarPrefix.PROJECTION, VarPrefix.AUXILLIARY, VarPrefix.NESTING)
+# attributes of the terms 0-3 of a fingerprint (see _Fingerprint)
+_TERM_ATTRIBUTES = (Attributes.SUBJECT, Attributes.PROPERTY, Attributes.OBJECT, Attributes.TIME)
+_FINGERPRINT_JSON = json.JSONEncoder(sort_keys=True, default=str, separators=(',', ':'))
+
+
+class _Fingerprint:
+    """
+    Incremental fingerprint of an alist (see Alist.fingerprint).
+    The fingerprint is the XOR of the hashes of its parts: the operation ('h'),
+    the number of operation variables ('v'), the effective context ('cx') and
+    one part per term: subject (0), property (1), object (2), time (3) and
+    each operation variable (4, 5, ...). A term follows its variable chain,
+    so it depends on the attribute and on every variable of the chain.
+    A change to one of these attributes marks the part dirty, and the next
+    update rehashes only the dirty parts.
+    An uninstantiated variable is named after the first term that ends at it;
+    when the variable a term ends at changes, the terms ending at the old or 
+    the new variable are rehashed as well.
+    """
+    __slots__ = ('hashes', 'deps', 'all_deps', 'values', 'ends', 'opvars', 'dirty', 'digest', 'shared')
+
+    def __init__(self):
+        # part -> hash
+        self.hashes = {}
+        # part -> attributes the part was computed from
+        self.deps = {}
+        self.all_deps = frozenset()
+        # term -> resolved value, or the uninstantiated variable the term ends at
+        self.values = {}
+        self.ends = {}
+        self.opvars = []
+        self.dirty = {'h', 'v', 'cx', 0, 1, 2, 3}
+        self.digest = 0
+        # referenced by more than one alist (see Alist._clone)
+        self.shared = False
+
+    @property
+    def value(self):
+        return f"{self.digest:032x}"
+
+    def copy(self):
+        fp = _Fingerprint.__new__(_Fingerprint)
+        fp.hashes = dict(self.hashes)
+        fp.deps = dict(self.deps)
+        fp.all_deps = self.all_deps
+        fp.values = dict(self.values)
+        fp.ends = dict(self.ends)
+        fp.opvars = self.opvars
+        fp.dirty = set(self.dirty)
+        fp.digest = self.digest
+        fp.shared = False
+        return fp
+
+    def invalidate(self, attribute):
+        for part, deps in self.deps.items():
+            if attribute in deps:
+                self.dirty.add(part)
+
+    def _drop(self, part):
+        self.digest ^= self.hashes.pop(part, 0)
+        self.deps.pop(part, None)
+        self.values.pop(part, None)
+        self.dirty.discard(part)
+        return self.ends.pop(part, None)
+
+    def update(self, alist):
+        dirty = self.dirty
+        deps = self.deps
+        ends = self.ends
+        # part -> value to hash
+        parts = {}
+        affected = set()
+        if 'v' in dirty:
+            opvars = alist.get(Attributes.OPVAR)
+            if isinstance(opvars, str) and opvars.strip().startswith('['):
+                try:
+                    opvars = json.loads(opvars)
+                except ValueError:
+                    pass
+            if not isinstance(opvars, list):
+                opvars = [opvars]
+            for part in range(4 + len(opvars), 4 + len(self.opvars)):
+                affected.add(self._drop(part))
+            self.opvars = opvars
+            dirty.update(range(4, 4 + len(opvars)))
+            parts['v'] = len(opvars)
+            deps['v'] = (Attributes.OPVAR,)
+        if 'h' in dirty:
+            parts['h'] = alist.get(Attributes.OP)
+            deps['h'] = (Attributes.OP,)
+        if 'cx' in dirty:
+            context = alist.get(Attributes.CONTEXT)
+            if isinstance(context, list):
+                effective_context = {}
+                for c in context:
+                    if isinstance(c, dict):
+                        effective_context.update(c)
+                context = effective_context
+            parts['cx'] = context
+            deps['cx'] = (Attributes.CONTEXT,)
+
+        for part in dirty:
+            if part.__class__ is not int:
+                continue
+            if part < 4:
+                attribute = _TERM_ATTRIBUTES[part]
+                value = alist.get(attribute)
+                part_deps = (attribute,)
+            else:
+                value = self.opvars[part - 4]
+                part_deps = ()
+            end = None
+            if value.__class__ is str and value[:1] in _VAR_PREFIXES:
+                # follow the variable chain to its value
+                path = []
+                while isinstance(value, str) and is_variable(value) and value not in path:
+                    path.append(value)
+                    next_value = alist.get(value)
+                    if isinstance(next_value, dict):
+                        value = {k: v for k, v in next_value.items() if k not in (Attributes.ID, 'meta')}
+                        break
+                    if next_value is None or next_value == '':
+                        break
+                    value = next_value
+                part_deps += tuple(path)
+                if isinstance(value, str) and is_variable(value):
+                    end = value
+                    affected.add(end)
+            old_end = ends.pop(part, None)
+            if old_end is not None:
+                affected.add(old_end)
+            if end is not None:
+                ends[part] = end
+            self.values[part] = value
+            deps[part] = part_deps
+            parts[part] = value
+
+        if affected:
+            affected.discard(None)
+            first = {}
+            for part, var in sorted(ends.items()):
+                if var in affected and var not in first:
+                    first[var] = part
+            for part, var in ends.items():
+                if var in affected:
+                    parts[part] = f"{var[0]}{first[var]}"
+
+        hashes = self.hashes
+        digest = self.digest
+        blake2b = hashlib.blake2b
+        for part, value in parts.items():
+            if value.__class__ is str:
+                key = f"{part}:s:{value}"
+            elif value is None or value.__class__ in (int, float, bool):
+                key = f"{part}:r:{value!r}"
+            else:
+                key = f"{part}:j:{_FINGERPRINT_JSON.encode(value)}"
+            new = int.from_bytes(blake2b(key.encode('utf-8'), digest_size=16).digest(), 'big')
+            digest ^= hashes.get(part, 0) ^ new
+            hashes[part] = new
+        self.digest = digest
+        dirty.clear()
+        self.all_deps = frozenset().union(*deps.values())
 
 
 class Contexts:
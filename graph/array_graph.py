@@ -0,0 +1,556 @@
+'''
+File: array_graph.py
+Description: Directed graph with array-backed adjacency and packed edge flags.
+
+ArrayDiGraph implements the part of the networkx DiGraph API used by the
+inference graph. Nodes are mapped to integer indices and edges to integer
+slots; the indices and slots of removed nodes and edges are kept in free
+lists and reused. The topology is stored in integer arrays (array('i')):
+per edge slot its source and target index and the next and previous
+slots in the successor list of its source and in the predecessor list
+of its target; per node index the first and last slot of both lists and
+the degrees. The lists are doubly linked, so adding and removing an edge
+take constant time. An edge is found through a map from the packed
+(source, target) index pair to its slot. The boolean edge attributes
+(frontier, hidden, complement) are packed into one byte per edge slot.
+Edge labels and any other edge attributes are kept in side maps by slot
+that only hold non-default values.
+
+Compared with networkx, this trades speed for memory: the topology takes
+less than half the memory, but walking the linked lists in Python makes
+traversal and edge churn slower (see benchmarks/graph_backend.py).
+
+Iteration orders (nodes, edges, successors, predecessors) are the same as
+for a networkx DiGraph built with the same operations.
+
+'''
+
+from array import array
+
+import networkx as nx
+
+FRONTIER = 1
+HIDDEN = 2
+COMPLEMENT = 4
+
+# edge attribute -> bit in the edge flags
+EDGE_FLAGS = {'frontier': FRONTIER, 'hidden': HIDDEN, 'complement': COMPLEMENT}
+
+# no slot (end of an adjacency list)
+NONE = -1
+
+
+class EdgeAttributes(dict):
+    '''
+    Attribute dict of an edge. Setting an attribute writes it back to the
+    graph, so `G[u][v]['hidden'] = True` works as with networkx.
+    '''
+    __slots__ = ('_graph', '_u', '_v')
+
+    def __init__(self, graph, u, v, flags, label, extra):
+        dict.__init__(self, label=label, frontier=bool(flags & FRONTIER),
+                      hidden=bool(flags & HIDDEN), complement=bool(flags & COMPLEMENT))
+        if extra:
+            dict.update(self, extra)
+        self._graph = graph
+        self._u = u
+        self._v = v
+
+    def __setitem__(self, key, value):
+        dict.__setitem__(self, key, value)
+        self._graph._set_edge_attr(self._u, self._v, key, value)
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+
+class AdjacencyView:
+    ''' Successors of a node with their edge attributes, i.e. `G[u]` '''
+    __slots__ = ('_graph', '_i')
+
+    def __init__(self, graph, i):
+        self._graph = graph
+        self._i = i
+
+    def __contains__(self, v):
+        j = self._graph._index.get(v)
+        return j is not None and (self._i << 32 | j) in self._graph._slots
+
+    def __iter__(self):
+        return self._graph._successor_ids(self._i)
+
+    def __len__(self):
+        return self._graph._out_degree[self._i]
+
+    def __getitem__(self, v):
+        graph = self._graph
+        j = graph._index.get(v)
+        slot = None if j is None else graph._slots.get(self._i << 32 | j)
+        if slot is None:
+            raise KeyError(v)
+        return graph._edge_attributes(self._i, j, slot)
+
+    def keys(self):
+        return list(self)
+
+    def items(self):
+        return [(v, self[v]) for v in self]
+
+
+class NodeView:
+    ''' The nodes of the graph, i.e. `G.nodes` '''
+    __slots__ = ('_graph',)
+
+    def __init__(self, graph):
+        self._graph = graph
+
+    def __call__(self, data=False, default=None):
+        nodes = self._graph._node
+        if data is False:
+            return list(nodes)
+        if data is True:
+            return list(nodes.items())
+        return [(n, d.get(data, default)) for n, d in nodes.items()]
+
+    def __getitem__(self, n):
+        return self._graph._node[n]
+
+    def __iter__(self):
+        return iter(self._graph._node)
+
+    def __len__(self):
+        return len(self._graph._node)
+
+    def __contains__(self, n):
+        return n in self._graph._node
+
+
+class EdgeView:
+    ''' The edges of the graph, i.e. `G.edges`; call it with data=True or an attribute name to get (u, v, data) '''
+    __slots__ = ('_graph',)
+
+    def __init__(self, graph):
+        self._graph = graph
+
+    def __call__(self, data=False, default=None):
+        return self._graph._edges(data, default)
+
+    def __getitem__(self, e):
+        return self._graph[e[0]][e[1]]
+
+    def __iter__(self):
+        return iter(self._graph._edges())
+
+    def __len__(self):
+        return self._graph._n_edges
+
+    def __contains__(self, e):
+        try:
+            u, v = e
+        except (TypeError, ValueError):
+            return False
+        return self._graph.has_edge(u, v)
+
+
+class ArrayDiGraph:
+    ''' Directed graph stored as linked adjacency lists in integer arrays and an edge flag array '''
+
+    def __init__(self):
+        self.graph = {}
+        # node id -> attribute dict, in insertion order
+        self._node = {}
+        # node id -> index and index -> node id (None for removed nodes)
+        self._index = {}
+        self._ids = []
+        self._free_nodes = []
+        # per node index: first and last edge slot of the successor and predecessor
+        # lists (in the order the edges were added) and the lengths of the lists
+        self._first_out = array('i')
+        self._last_out = array('i')
+        self._first_in = array('i')
+        self._last_in = array('i')
+        self._out_degree = array('i')
+        self._in_degree = array('i')
+        # per edge slot: source and target index, next and previous slot in the
+        # successor list of the source and in the predecessor list of the target
+        self._src = array('i')
+        self._dst = array('i')
+        self._next_out = array('i')
+        self._prev_out = array('i')
+        self._next_in = array('i')
+        self._prev_in = array('i')
+        # per edge slot: edge flags; slots of removed edges are reused
+        self._flags = bytearray()
+        self._free_edges = []
+        # source index << 32 | target index -> edge slot
+        self._slots = {}
+        # edge slot -> label / other attributes, only for non-default values
+        self._labels = {}
+        self._edge_extra = {}
+        self._n_edges = 0
+
+    @property
+    def nodes(self):
+        return NodeView(self)
+
+    def __len__(self):
+        return len(self._node)
+
+    def __iter__(self):
+        return iter(self._node)
+
+    def __contains__(self, n):
+        try:
+            return n in self._node
+        except TypeError:
+            return False
+
+    def __getitem__(self, n):
+        return AdjacencyView(self, self._index[n])
+
+    def is_directed(self):
+        return True
+
+    def is_multigraph(self):
+        return False
+
+    def has_node(self, n):
+        return n in self
+
+    def number_of_nodes(self):
+        return len(self._node)
+
+    def order(self):
+        return len(self._node)
+
+    def number_of_edges(self):
+        return self._n_edges
+
+    def _add_index(self, n):
+        if self._free_nodes:
+            i = self._free_nodes.pop()
+            self._ids[i] = n
+            self._first_out[i] = self._last_out[i] = self._first_in[i] = self._last_in[i] = NONE
+            self._out_degree[i] = self._in_degree[i] = 0
+        else:
+            i = len(self._ids)
+            self._ids.append(n)
+            for a in (self._first_out, self._last_out, self._first_in, self._last_in):
+                a.append(NONE)
+            self._out_degree.append(0)
+            self._in_degree.append(0)
+        self._index[n] = i
+        return i
+
+    def add_node(self, n, **attr):
+        if n not in self._node:
+            self._add_index(n)
+            self._node[n] = {}
+        self._node[n].update(attr)
+
+    def add_nodes_from(self, nodes, **attr):
+        node = self._node
+        for n in nodes:
+            data = None
+            if isinstance(n, (tuple, list)) and len(n) == 2 and isinstance(n[1], dict):
+                n, data = n
+            d = node.get(n)
+            if d is None:
+                self._add_index(n)
+                d = node[n] = {}
+            if attr:
+                d.update(attr)
+            if data:
+                d.update(data)
+
+    def remove_node(self, n):
+        if n not in self._index:
+            raise nx.NetworkXError(f"The node {n} is not in the digraph.")
+        self.remove_nodes_from((n,))
+
+    def remove_nodes_from(self, nodes):
+        index = self._index
+        for n in list(nodes):
+            i = index.pop(n, None)
+            if i is None:
+                continue
+            # a self-loop is in both lists
+            slots = set(self._out_slots(i))
+            slots.update(self._in_slots(i))
+            for slot in slots:
+                self._unlink_edge(slot)
+            del self._node[n]
+            self._ids[i] = None
+            self._free_nodes.append(i)
+
+    def _out_slots(self, i):
+        ''' The edge slots of the successor list of a node index '''
+        next_out = self._next_out
+        slots = []
+        slot = self._first_out[i]
+        while slot != NONE:
+            slots.append(slot)
+            slot = next_out[slot]
+        return slots
+
+    def _in_slots(self, i):
+        ''' The edge slots of the predecessor list of a node index '''
+        next_in = self._next_in
+        slots = []
+        slot = self._first_in[i]
+        while slot != NONE:
+            slots.append(slot)
+            slot = next_in[slot]
+        return slots
+
+    def _successor_ids(self, i):
+        ids = self._ids
+        dst = self._dst
+        next_out = self._next_out
+        slot = self._first_out[i]
+        while slot != NONE:
+            yield ids[dst[slot]]
+            slot = next_out[slot]
+
+    def _predecessor_ids(self, i):
+        ids = self._ids
+        src = self._src
+        next_in = self._next_in
+        slot = self._first_in[i]
+        while slot != NONE:
+            yield ids[src[slot]]
+            slot = next_in[slot]
+
+    def _edge_slot(self, u, v):
+        ''' The edge slot of u -> v, or None if there is no such edge '''
+        i = self._index.get(u)
+        j = self._index.get(v)
+        if i is None or j is None:
+            return None
+        return self._slots.get(i << 32 | j)
+
+    def add_edge(self, u, v, **attr):
+        i = self._index.get(u)
+        if i is None:
+            self.add_node(u)
+            i = self._index[u]
+        j = self._index.get(v)
+        if j is None:
+            self.add_node(v)
+            j = self._index[v]
+        key = i << 32 | j
+        slot = self._slots.get(key)
+        if slot is None:
+            slot = self._link_edge(i, j)
+            self._slots[key] = slot
+        if not attr:
+            return
+        flags = self._flags[slot]
+        for key, value in attr.items():
+            flag = EDGE_FLAGS.get(key)
+            if flag is not None and value.__class__ is bool:
+                flags = (flags | flag) if value else (flags & ~flag)
+            elif key == 'label' and not value and value.__class__ is str:
+                if self._labels:
+                    self._labels.pop(slot, None)
+            else:
+                self._set_edge_attr_slot(slot, key, value)
+        self._flags[slot] = flags
+
+    def _link_edge(self, i, j):
+        ''' Allocate an edge slot for i -> j at the end of both adjacency lists '''
+        if self._free_edges:
+            slot = self._free_edges.pop()
+            self._src[slot] = i
+            self._dst[slot] = j
+            self._flags[slot] = 0
+        else:
+            slot = len(self._flags)
+            self._src.append(i)
+            self._dst.append(j)
+            for a in (self._next_out, self._prev_out, self._next_in, self._prev_in):
+                a.append(NONE)
+            self._flags.append(0)
+        last = self._last_out[i]
+        self._prev_out[slot] = last
+        self._next_out[slot] = NONE
+        if last == NONE:
+            self._first_out[i] = slot
+        else:
+            self._next_out[last] = slot
+        self._last_out[i] = slot
+        last = self._last_in[j]
+        self._prev_in[slot] = last
+        self._next_in[slot] = NONE
+        if last == NONE:
+            self._first_in[j] = slot
+        else:
+            self._next_in[last] = slot
+        self._last_in[j] = slot
+        self._out_degree[i] += 1
+        self._in_degree[j] += 1
+        self._n_edges += 1
+        return slot
+
+    def _unlink_edge(self, slot):
+        ''' Remove an edge slot from both adjacency lists and free it for reuse '''
+        i = self._src[slot]
+        j = self._dst[slot]
+        prev, next_ = self._prev_out[slot], self._next_out[slot]
+        if prev == NONE:
+            self._first_out[i] = next_
+        else:
+            self._next_out[prev] = next_
+        if next_ == NONE:
+            self._last_out[i] = prev
+        else:
+            self._prev_out[next_] = prev
+        prev, next_ = self._prev_in[slot], self._next_in[slot]
+        if prev == NONE:
+            self._first_in[j] = next_
+        else:
+            self._next_in[prev] = next_
+        if next_ == NONE:
+            self._last_in[j] = prev
+        else:
+            self._prev_in[next_] = prev
+        self._out_degree[i] -= 1
+        self._in_degree[j] -= 1
+        del self._slots[i << 32 | j]
+        if self._labels:
+            self._labels.pop(slot, None)
+        if self._edge_extra:
+            self._edge_extra.pop(slot, None)
+        self._free_edges.append(slot)
+        self._n_edges -= 1
+
+    def add_edges_from(self, ebunch, **attr):
+        for e in ebunch:
+            if len(e) == 3:
+                u, v, data = e
+                self.add_edge(u, v, **{**attr, **data})
+            else:
+                u, v = e
+                self.add_edge(u, v, **attr)
+
+    def remove_edge(self, u, v):
+        slot = self._edge_slot(u, v)
+        if slot is None:
+            raise nx.NetworkXError(f"The edge {u}-{v} not in graph.")
+        self._unlink_edge(slot)
+
+    def has_edge(self, u, v):
+        return self._edge_slot(u, v) is not None
+
+    def _set_edge_attr_slot(self, slot, key, value):
+        flag = EDGE_FLAGS.get(key)
+        if flag is not None and isinstance(value, bool):
+            if value:
+                self._flags[slot] |= flag
+            else:
+                self._flags[slot] &= ~flag
+        elif key == 'label' and isinstance(value, str):
+            if value:
+                self._labels[slot] = value
+            else:
+                self._labels.pop(slot, None)
+        else:
+            self._edge_extra.setdefault(slot, {})[key] = value
+
+    def _set_edge_attr(self, u, v, key, value):
+        slot = self._edge_slot(u, v)
+        if slot is None:
+            raise KeyError((u, v))
+        self._set_edge_attr_slot(slot, key, value)
+
+    def _edge_attr(self, u, v, key):
+        ''' Get one attribute of an edge without building its attribute dict '''
+        slot = self._edge_slot(u, v)
+        if slot is None:
+            raise KeyError((u, v))
+        flag = EDGE_FLAGS.get(key)
+        if flag is not None:
+            return bool(self._flags[slot] & flag)
+        if key == 'label':
+            return self._labels.get(slot, '')
+        return self._edge_extra.get(slot, {}).get(key)
+
+    def _edge_attributes(self, i, j, slot):
+        return EdgeAttributes(self, self._ids[i], self._ids[j], self._flags[slot],
+                              self._labels.get(slot, ''), self._edge_extra.get(slot))
+
+    @property
+    def edges(self):
+        return EdgeView(self)
+
+    def _edges(self, data=False, default=None):
+        ids = self._ids
+        dst = self._dst
+        result = []
+        for u in self._node:
+            i = self._index[u]
+            for slot in self._out_slots(i):
+                j = dst[slot]
+                if data is False:
+                    result.append((u, ids[j]))
+                elif data is True:
+                    result.append((u, ids[j], self._edge_attributes(i, j, slot)))
+                else:
+                    attrs = self._edge_attributes(i, j, slot)
+                    result.append((u, ids[j], attrs.get(data, default)))
+        return result
+
+    def successors(self, n):
+        i = self._index.get(n)
+        if i is None:
+            raise nx.NetworkXError(f"The node {n} is not in the digraph.")
+        return self._successor_ids(i)
+
+    neighbors = successors
+
+    def predecessors(self, n):
+        i = self._index.get(n)
+        if i is None:
+            raise nx.NetworkXError(f"The node {n} is not in the digraph.")
+        return self._predecessor_ids(i)
+
+    def _neighbor_ids(self, n, successors, without_flag):
+        ''' The successor (or predecessor) ids of a node whose edge does not have a flag '''
+        i = self._index.get(n)
+        if i is None:
+            raise nx.NetworkXError(f"The node {n} is not in the digraph.")
+        flags = self._flags
+        ids = self._ids
+        if successors:
+            first, next_, other = self._first_out, self._next_out, self._dst
+        else:
+            first, next_, other = self._first_in, self._next_in, self._src
+        result = []
+        slot = first[i]
+        while slot != NONE:
+            if not flags[slot] & without_flag:
+                result.append(ids[other[slot]])
+            slot = next_[slot]
+        return result
+
+    def adjacency(self):
+        return ((n, AdjacencyView(self, self._index[n])) for n in self._node)
+
+    def out_degree(self, n=None):
+        if n is None:
+            return [(x, self._out_degree[self._index[x]]) for x in self._node]
+        return self._out_degree[self._index[n]]
+
+    def in_degree(self, n=None):
+        if n is None:
+            return [(x, self._in_degree[self._index[x]]) for x in self._node]
+        return self._in_degree[self._index[n]]
+
+    def to_networkx(self):
+        ''' Export as a networkx DiGraph (for plotting and graph algorithms) '''
+        G = nx.DiGraph()
+        G.graph.update(self.graph)
+        G.add_nodes_from(self._node.items())
+        G.add_edges_from((u, v, dict(d)) for u, v, d in self._edges(data=True))
+        return G
@@ -0,0 +1,585 @@
+'''
+File: codec.py
+Description: Compact binary codec for Alists and InferenceGraphs.
+
+Layout:
+    header   MAGIC (4 bytes) | version (1 byte) | kind (1 byte)
+    strings  character length of each string (array), then the strings
+             joined and encoded as utf-8
+    shapes   varint count, then varint key count + string indices for each shape
+    body     one typed value
+
+Every str in the payload (keys and values) is written once to the string
+table and referenced by its index. The key sequence of a dict with str keys
+is written once to the shape table, so dicts with the same keys in the same
+order (e.g. alist attributes and their meta) are encoded as a shape index
+followed by their values only. Values are a type tag followed by the
+value: varints for ints and lengths, 8-byte little endian doubles for floats,
+and length-prefixed lists, tuples, sets and dicts. Small ints (0..63) and the
+first 128 strings of the table are encoded in the tag byte itself.
+
+Lists of 8 or more values are written column-wise when all their values
+have the same type: strings as an array of string table indices, ints,
+floats and bools as packed arrays, lists as an array of lengths followed by
+the column of their concatenated items, and dicts (e.g. the attribute dicts
+of the nodes of a graph) as a table with one column per key for each shape.
+Arrays are converted with the array module, so most of the encoding and
+decoding of a graph runs in C rather than value by value.
+
+Dict order, tuples, sets and the bool/int/float distinction are preserved,
+so decoding an encoded attribute dict gives back an equal dict. Subclasses
+of the supported types and numpy scalars and arrays (e.g. from KB adapters)
+are converted to the plain Python types.
+
+Decoding works on a memoryview of the input and only copies the arrays
+it converts.
+
+'''
+
+from array import array
+from itertools import accumulate, compress, repeat
+import numbers
+import struct
+import sys
+
+from graph.alist import Alist
+from graph.alist import NodeTypes
+
+MAGIC = b'FRKC'
+VERSION = 2
+
+KIND_VALUE = 0
+KIND_ALIST = 1
+KIND_GRAPH = 2
+KIND_CHECKPOINT = 3
+
+_NONE = 0
+_TRUE = 1
+_FALSE = 2
+_INT = 3      # zigzag varint
+_NEG_BIGINT = 4
+_BIGINT = 5   # length-prefixed big-endian magnitude
+_FLOAT = 6
+_STR = 7      # string table index
+_LIST = 8
+_TUPLE = 9
+_DICT = 10
+_RECORD = 11  # dict with interned keys: shape index, then values
+_SET = 12
+_FROZENSET = 13
+_COLUMN = 14  # list written column-wise: column type, then the column
+_FIXINT = 64  # tags 64..127: ints 0..63
+_FIXSTR = 128 # tags 128..255: string table index 0..127
+
+# column types
+_COL_ANY = 0    # values written one by one
+_COL_STR = 1    # array of string table indices
+_COL_INT = 2    # array of signed 64-bit ints
+_COL_FLOAT = 3  # array of doubles
+_COL_BOOL = 4   # one byte per value
+_COL_NONE = 5   # no data
+_COL_LIST = 6   # array of lengths, then the column of the concatenated items
+_COL_TABLE = 7  # dicts: the shape of each row, then one column per key of each shape
+
+# lists with fewer values are written value by value
+_COLUMN_MIN = 8
+
+_DOUBLE = struct.Struct('<d')
+_HEADER_SIZE = len(MAGIC) + 2
+_INT64 = (-(1 << 63), (1 << 63) - 1)
+
+# array type codes by item size, for unsigned and signed arrays
+_UNSIGNED = {array(t).itemsize: t for t in 'BHIQ'}
+_SIGNED = {array(t).itemsize: t for t in 'bhiq'}
+_SWAP = sys.byteorder != 'little'
+
+
+def _write_varint(out, n):
+    while n > 0x7f:
+        out.append((n & 0x7f) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _write_array(out, values, signed=False):
+    ''' Write ints as the smallest little endian array that holds them:
+        item size (1 byte), varint count, items '''
+    if signed:
+        low, high = (min(values), max(values)) if values else (0, 0)
+        size = next(s for s in (1, 2, 4, 8) if -(1 << (8 * s - 1)) <= low and high < (1 << (8 * s - 1)))
+        a = array(_SIGNED[size], values)
+    else:
+        high = max(values) if values else 0
+        size = next(s for s in (1, 2, 4, 8) if high < (1 << (8 * s)))
+        a = array(_UNSIGNED[size], values)
+    if _SWAP:
+        a.byteswap()
+    out.append(size)
+    _write_varint(out, len(a))
+    out.extend(a.tobytes())
+
+
+def _plain(v):
+    ''' The plain Python value of a subclass of a supported type or a numpy value, or None '''
+    if isinstance(v, bool):
+        return bool(v)
+    if isinstance(v, numbers.Integral):
+        return int(v)
+    if isinstance(v, numbers.Real):
+        return float(v)
+    for t in (str, dict, list, tuple, set, frozenset):
+        if isinstance(v, t):
+            return t(v)
+    # numpy bools, 0-d arrays and arrays (without importing numpy)
+    if hasattr(v, 'dtype') and hasattr(v, 'tolist'):
+        return v.tolist()
+    return None
+
+
+def _encode(value, kind):
+    strings = {}
+    shapes = {}
+    body = bytearray()
+    append = body.append
+    pack_double = _DOUBLE.pack
+
+    def write_varint(n):
+        if n < 0x80:
+            append(n)
+        else:
+            _write_varint(body, n)
+
+    def write_str(s):
+        idx = strings.get(s)
+        if idx is None:
+            idx = strings[s] = len(strings)
+        if idx < 0x80:
+            append(_FIXSTR + idx)
+        else:
+            append(_STR)
+            write_varint(idx)
+
+    def write_int(n):
+        if 0 <= n < 64:
+            append(_FIXINT + n)
+        elif -(1 << 62) <= n < (1 << 62):
+            append(_INT)
+            write_varint((n << 1) if n >= 0 else ((-n << 1) - 1))
+        else:
+            append(_BIGINT if n >= 0 else _NEG_BIGINT)
+            magnitude = abs(n).to_bytes((abs(n).bit_length() + 7) // 8, 'big')
+            write_varint(len(magnitude))
+            body.extend(magnitude)
+
+    def write_float(f):
+        append(_FLOAT)
+        body.extend(pack_double(f))
+
+    def write_items(items, tag):
+        append(tag)
+        write_varint(len(items))
+        for item in items:
+            write(item)
+
+    def write_list(items):
+        if len(items) >= _COLUMN_MIN:
+            append(_COLUMN)
+            write_column(items)
+        else:
+            write_items(items, _LIST)
+
+    def write_tuple(items):
+        write_items(items, _TUPLE)
+
+    def write_set(items):
+        write_items(items, _SET)
+
+    def write_frozenset(items):
+        write_items(items, _FROZENSET)
+
+    def shape_index(keys):
+        ''' Index of an interned key sequence, or None if not all keys are str '''
+        idx = shapes.get(keys)
+        if idx is None:
+            if not all(type(k) is str for k in keys):
+                return None
+            for k in keys:
+                if k not in strings:
+                    strings[k] = len(strings)
+            idx = shapes[keys] = len(shapes)
+        return idx
+
+    def write_dict(d):
+        idx = shape_index(tuple(d))
+        if idx is None:
+            append(_DICT)
+            write_varint(len(d))
+            for k, v in d.items():
+                write(k)
+                write(v)
+            return
+        append(_RECORD)
+        write_varint(idx)
+        for v in d.values():
+            write(v)
+
+    def write_none(_):
+        append(_NONE)
+
+    def write_bool(b):
+        append(_TRUE if b else _FALSE)
+
+    writers = {str: write_str, int: write_int, float: write_float, bool: write_bool,
+               type(None): write_none, list: write_list, tuple: write_tuple, dict: write_dict,
+               set: write_set, frozenset: write_frozenset}
+
+    def write(v):
+        writer = writers.get(type(v))
+        if writer is None:
+            plain = _plain(v)
+            if plain is None:
+                raise TypeError(f"cannot encode value of type {type(v).__name__}")
+            writer = writers[type(plain)]
+            v = plain
+        writer(v)
+
+    def write_column(items):
+        ''' Write a list column-wise if all its values have the same type '''
+        types = set(map(type, items))
+        t = types.pop() if len(types) == 1 else None
+        if t is str:
+            append(_COL_STR)
+            new = [s for s in dict.fromkeys(items) if s not in strings]
+            strings.update(zip(new, range(len(strings), len(strings) + len(new))))
+            _write_array(body, list(map(strings.__getitem__, items)))
+        elif t is int and _INT64[0] <= min(items) and max(items) <= _INT64[1]:
+            append(_COL_INT)
+            _write_array(body, items, signed=True)
+        elif t is float:
+            append(_COL_FLOAT)
+            a = array('d', items)
+            if _SWAP:
+                a.byteswap()
+            write_varint(len(a))
+            body.extend(a.tobytes())
+        elif t is bool:
+            append(_COL_BOOL)
+            write_varint(len(items))
+            body.extend(bytes(items))
+        elif t is type(None):
+            append(_COL_NONE)
+            write_varint(len(items))
+        elif t is list:
+            append(_COL_LIST)
+            _write_array(body, [len(x) for x in items])
+            write_column([y for x in items for y in x])
+        elif t is dict and write_table(items):
+            pass
+        else:
+            append(_COL_ANY)
+            write_varint(len(items))
+            for item in items:
+                write(item)
+
+    def write_table(rows):
+        ''' Write dicts with str keys as a table: the rows grouped by shape,
+            one column per key in each group. Returns False if a key is not a str. '''
+        row_shapes = list(map(tuple, rows))
+        groups = {keys: i for i, keys in enumerate(dict.fromkeys(row_shapes))}
+        if any(shape_index(keys) is None for keys in groups):
+            return False
+        append(_COL_TABLE)
+        write_varint(len(groups))
+        if len(groups) > 1:
+            shape_of = list(map(groups.__getitem__, row_shapes))
+            _write_array(body, shape_of)
+            members = [list(compress(rows, map(i.__eq__, shape_of))) for i in groups.values()]
+        else:
+            members = [rows]
+        for keys, group_rows in zip(groups, members):
+            write_varint(shapes[keys])
+            write_varint(len(group_rows))
+            if keys:
+                for column in zip(*map(dict.values, group_rows)):
+                    write_column(list(column))
+        return True
+
+    write(value)
+
+    out = bytearray(MAGIC)
+    out.append(VERSION)
+    out.append(kind)
+    _write_array(out, [len(s) for s in strings])
+    text = ''.join(strings).encode('utf-8', 'surrogatepass')
+    _write_varint(out, len(text))
+    out.extend(text)
+    _write_varint(out, len(shapes))
+    for keys in shapes:
+        _write_varint(out, len(keys))
+        for k in keys:
+            _write_varint(out, strings[k])
+    out.extend(body)
+    return bytes(out)
+
+
+def _decode(data, kind):
+    buf = memoryview(data)
+    if buf.ndim != 1 or buf.itemsize != 1:
+        buf = buf.cast('B')
+    if len(buf) < _HEADER_SIZE or buf[:len(MAGIC)] != MAGIC:
+        raise ValueError("not an encoded FRANK payload")
+    if buf[len(MAGIC)] != VERSION:
+        raise ValueError(f"unsupported codec version {buf[len(MAGIC)]}")
+    if buf[len(MAGIC) + 1] != kind:
+        raise ValueError(f"payload kind {buf[len(MAGIC) + 1]} does not match {kind}")
+
+    pos = _HEADER_SIZE
+    unpack_double = _DOUBLE.unpack_from
+
+    def read_varint():
+        nonlocal pos
+        b = buf[pos]
+        pos += 1
+        if b < 0x80:
+            return b
+        result = b & 0x7f
+        shift = 7
+        while True:
+            b = buf[pos]
+            pos += 1
+            result |= (b & 0x7f) << shift
+            if b < 0x80:
+                return result
+            shift += 7
+
+    def read_array(signed=False):
+        nonlocal pos
+        size = buf[pos]
+        pos += 1
+        n = read_varint()
+        a = array((_SIGNED if signed else _UNSIGNED)[size])
+        end = pos + n * size
+        if end > len(buf):
+            raise IndexError
+        a.frombytes(buf[pos:end])
+        if _SWAP:
+            a.byteswap()
+        pos = end
+        return a
+
+    lengths = read_array()
+    n = read_varint()
+    text = str(buf[pos:pos + n], 'utf-8', 'surrogatepass')
+    pos += n
+    ends = list(accumulate(lengths))
+    strings = list(map(text.__getitem__, map(slice, [0] + ends[:-1], ends)))
+    shapes = []
+    for _ in range(read_varint()):
+        shapes.append(tuple([strings[read_varint()] for _ in range(read_varint())]))
+
+    def read():
+        nonlocal pos
+        tag = buf[pos]
+        pos += 1
+        if tag >= _FIXSTR:
+            return strings[tag - _FIXSTR]
+        elif tag >= _FIXINT:
+            return tag - _FIXINT
+        elif tag == _STR:
+            b = buf[pos]
+            if b < 0x80:
+                pos += 1
+                return strings[b]
+            return strings[read_varint()]
+        elif tag == _RECORD:
+            n = buf[pos]
+            if n < 0x80:
+                pos += 1
+            else:
+                n = read_varint()
+            keys = shapes[n]
+            return dict(zip(keys, [read() for _ in keys]))
+        elif tag == _COLUMN:
+            return read_column()
+        elif tag == _DICT:
+            n = read_varint()
+            d = {}
+            for _ in range(n):
+                k = read()
+                d[k] = read()
+            return d
+        elif tag == _INT:
+            z = read_varint()
+            return (z >> 1) if not z & 1 else -((z + 1) >> 1)
+        elif tag == _FLOAT:
+            value = unpack_double(buf, pos)[0]
+            pos += 8
+            return value
+        elif tag == _LIST:
+            n = buf[pos]
+            if n < 0x80:
+                pos += 1
+            else:
+                n = read_varint()
+            return [read() for _ in range(n)]
+        elif tag == _NONE:
+            return None
+        elif tag == _TRUE:
+            return True
+        elif tag == _FALSE:
+            return False
+        elif tag == _TUPLE:
+            return tuple([read() for _ in range(read_varint())])
+        elif tag == _SET:
+            return set([read() for _ in range(read_varint())])
+        elif tag == _FROZENSET:
+            return frozenset([read() for _ in range(read_varint())])
+        elif tag == _BIGINT or tag == _NEG_BIGINT:
+            n = read_varint()
+            value = int.from_bytes(buf[pos:pos + n], 'big')
+            pos += n
+            return value if tag == _BIGINT else -value
+        raise ValueError(f"unknown value tag {tag} at offset {pos - 1}")
+
+    def read_column():
+        nonlocal pos
+        col = buf[pos]
+        pos += 1
+        if col == _COL_STR:
+            return list(map(strings.__getitem__, read_array()))
+        elif col == _COL_TABLE:
+            return read_table()
+        elif col == _COL_ANY:
+            return [read() for _ in range(read_varint())]
+        elif col == _COL_LIST:
+            ends = list(accumulate(read_array()))
+            items = read_column()
+            return list(map(items.__getitem__, map(slice, [0] + ends[:-1], ends)))
+        elif col == _COL_INT:
+            return read_array(signed=True).tolist()
+        elif col == _COL_FLOAT:
+            n = read_varint()
+            a = array('d')
+            a.frombytes(buf[pos:pos + 8 * n])
+            if _SWAP:
+                a.byteswap()
+            pos += 8 * n
+            return a.tolist()
+        elif col == _COL_BOOL:
+            n = read_varint()
+            values = list(map(bool, buf[pos:pos + n]))
+            pos += n
+            return values
+        elif col == _COL_NONE:
+            return [None] * read_varint()
+        raise ValueError(f"unknown column type {col} at offset {pos - 1}")
+
+    def read_table():
+        n_groups = read_varint()
+        shape_of = read_array() if n_groups > 1 else None
+        groups = []
+        for _ in range(n_groups):
+            keys = shapes[read_varint()]
+            size = read_varint()
+            if keys:
+                columns = [read_column() for _ in keys]
+                rows = list(map(dict, map(zip, repeat(keys), zip(*columns))))
+            else:
+                rows = [{} for _ in range(size)]
+            groups.append(rows)
+        if shape_of is None:
+            return groups[0] if groups else []
+        members = [iter(rows) for rows in groups]
+        return [next(members[g]) for g in shape_of]
+
+    try:
+        value = read()
+    except (IndexError, StopIteration):
+        raise ValueError("truncated payload")
+    if pos != len(buf):
+        raise ValueError("trailing data after payload")
+    return value
+
+
+def dumps(value) -> bytes:
+    ''' Encode a value made of None, bool, int, float, str, list, tuple, set and dict '''
+    return _encode(value, KIND_VALUE)
+
+
+def loads(data):
+    ''' Decode a value encoded with `dumps` from bytes, bytearray or memoryview '''
+    return _decode(data, KIND_VALUE)
+
+
+def encode_alist(alist: Alist) -> bytes:
+    ''' Encode the attributes (including meta) of an alist '''
+    return _encode(alist.attributes, KIND_ALIST)
+
+
+def decode_alist(data) -> Alist:
+    ''' Decode an alist encoded with `encode_alist` '''
+    return Alist(**_decode(data, KIND_ALIST))
+
+
+def _graph_value(graph, nodes=None):
+    ''' The graph attributes, node ids, node attributes, edge sources, targets and attributes '''
+    if nodes is None:
+        node_ids = list(graph.nodes())
+        edges = list(graph.edges(data=True))
+    else:
+        node_ids = list(nodes)
+        node_set = set(node_ids)
+        edges = [(u, v, graph[u][v]) for u in node_ids for v in graph.successors(u) if v in node_set]
+    node_attrs = [graph.nodes[n] for n in node_ids]
+    sources, targets, edge_attrs = (list(x) for x in zip(*edges)) if edges else ([], [], [])
+    return (dict(graph.graph), node_ids, node_attrs, sources, targets, [dict(a) for a in edge_attrs])
+
+
+def _build_graph(value, graph):
+    if graph is None:
+        from graph.inference_graph import InferenceGraph
+        graph = InferenceGraph()
+    graph_attrs, node_ids, node_attrs, sources, targets, edge_attrs = value
+    graph.graph.update(graph_attrs)
+    graph.add_nodes_from(zip(node_ids, node_attrs))
+    if hasattr(graph, '_index_subgoal'):
+        for attrs in node_attrs:
+            meta = attrs.get('meta', {})
+            if meta.get('is_map') == 1 and meta.get('node_type') not in (NodeTypes.FACT, NodeTypes.FACT_TABLE):
+                graph._index_subgoal(Alist(**attrs))
+    graph.add_edges_from(zip(sources, targets, edge_attrs))
+    if hasattr(graph, '_rebuild_indexes'):
+        graph._rebuild_indexes()
+    return graph
+
+
+def encode_graph(graph, nodes=None) -> bytes:
+    '''
+    Encode the nodes, edges and graph attributes of an inference graph.
+    If `nodes` (a list of node ids) is given, only these nodes and the
+    edges between them are encoded.
+    '''
+    return _encode(_graph_value(graph, nodes), KIND_GRAPH)
+
+
+def decode_graph(data, graph=None):
+    '''
+    Decode an inference graph encoded with `encode_graph`.
+    The nodes and edges are added to `graph` if given,
+    otherwise to a new InferenceGraph.
+    '''
+    return _build_graph(_decode(data, KIND_GRAPH), graph)
+
+
+def encode_checkpoint(graph, state: dict) -> bytes:
+    ''' Encode an inference graph together with a dict of state values '''
+    return _encode(_graph_value(graph) + (state,), KIND_CHECKPOINT)
+
+
+def decode_checkpoint(data, graph=None):
+    '''
+    Decode a checkpoint encoded with `encode_checkpoint`.
+    Returns the graph (built as in `decode_graph`) and the state dict.
+    '''
+    value = _decode(data, KIND_CHECKPOINT)
+    return _build_graph(value[:-1], graph), value[-1]
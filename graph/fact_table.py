@@ -0,0 +1,156 @@
+'''
+File: fact_table.py
+Description: Fact-table nodes: the facts of one KB lookup stored column-wise
+             in a single inference graph node.
+
+A fact-table node is the alist of the first fact with node_type FACT_TABLE.
+The rows are kept in the meta data 'fact_table' (see Alist.get_meta):
+
+    rows           the number of rows
+    columns        {attribute: value of the attribute in each row} for the
+                   attributes that differ between the rows (e.g. the
+                   search attribute, OPVALUE and COV); the other attributes
+                   have the same value in every row, the one of the alist
+    source         the data source of each row (the last of its data_sources)
+    source_prefix  the data sources before the source of each row
+
+Reduce operations that handle fact tables (module attribute
+`fact_tables = True`, so their children can be fact-table nodes) read the
+columns with `values` and `instantiation_values`, and the attributes with
+the same value in every row with `shared_instantiated_attributes`; the
+other ones get the rows as fact alists (see `expand`).
+
+'''
+
+from graph.alist import Alist
+from graph.alist import Attributes as tt
+from graph.alist import NodeTypes as nt
+from graph.alist import is_variable
+
+
+def is_fact_table(alist: Alist):
+    return alist.node_type == nt.FACT_TABLE
+
+
+def make_fact_table(facts: list):
+    '''
+    Make a fact-table node for a list of fact alists, or return None if
+    the facts do not have the same attributes, or differ in meta data other
+    than their last data source (they are then kept as separate nodes).
+    '''
+    fact_attrs = [f.attributes for f in facts]
+    first = fact_attrs[0]
+    first_meta = first['meta']
+    source_prefix = first_meta['data_sources'][:-1]
+    for attrs in fact_attrs:
+        meta = attrs['meta']
+        if attrs.keys() != first.keys() or meta.keys() != first_meta.keys():
+            return None
+        if any(meta[k] != first_meta[k] for k in meta if k != 'data_sources'):
+            return None
+        if not meta['data_sources'] or meta['data_sources'][:-1] != source_prefix:
+            return None
+    columns = {}
+    for k in first:
+        if k in (tt.ID, 'meta'):
+            continue
+        column = [attrs[k] for attrs in fact_attrs]
+        if any(v != first[k] for v in column):
+            columns[k] = column
+    source = [f.data_sources[-1] for f in facts]
+
+    table = facts[0]._clone()
+    table.node_type = nt.FACT_TABLE
+    table.data_sources = source_prefix + list(dict.fromkeys(source))
+    table.set_meta('fact_table', {
+        'rows': len(facts),
+        'columns': columns,
+        'source': source,
+        'source_prefix': source_prefix,
+    })
+    return table
+
+
+def row_count(alists: list):
+    ''' Number of facts in a list of alists, counting the rows of fact tables '''
+    return sum(a.get_meta('fact_table')['rows'] if is_fact_table(a) else 1
+               for a in alists)
+
+
+def values(alist: Alist, attribute):
+    ''' The value of an attribute in each row of a fact table ([alist.get(attribute)] for other alists) '''
+    if not is_fact_table(alist):
+        return [alist.get(attribute)]
+    table = alist.get_meta('fact_table')
+    if attribute in table['columns']:
+        return table['columns'][attribute]
+    return [alist.get(attribute)] * table['rows']
+
+
+def _resolve(alist: Alist, attribute):
+    ''' Follow the variable chain of an attribute of a fact table as
+        Alist.instantiation_value does: ('column', name) if it reaches a
+        column, ('value', value) if it reaches a value, else (None, None) '''
+    columns = alist.get_meta('fact_table')['columns']
+    name = attribute
+    path = set()
+    while name not in path:
+        path.add(name)
+        if name in columns:
+            return 'column', name
+        value = alist.get(name)
+        if name not in alist or isinstance(value, dict):
+            break
+        if not is_variable(value):
+            return 'value', value
+        name = value
+    return None, None
+
+
+def instantiation_values(alist: Alist, attribute):
+    ''' The instantiation value of an attribute in each row of a fact table
+        ([alist.instantiation_value(attribute)] for other alists) '''
+    if not is_fact_table(alist):
+        return [alist.instantiation_value(attribute)]
+    table = alist.get_meta('fact_table')
+    kind, result = _resolve(alist, attribute)
+    if kind == 'column':
+        return table['columns'][result]
+    return [result] * table['rows']
+
+
+def shared_instantiated_attributes(alist: Alist):
+    ''' The instantiated attributes of an alist; for a fact table, only those
+        with the same value in every row (not resolved through a column) '''
+    attributes = alist.instantiated_attributes()
+    if not is_fact_table(alist):
+        return attributes
+    return {k: v for k, v in attributes.items() if _resolve(alist, k)[0] != 'column'}
+
+
+def rows(alist: Alist):
+    ''' The rows of a fact table as fact alists '''
+    table = alist.get_meta('fact_table')
+    result = []
+    for i in range(table['rows']):
+        row = alist._clone()
+        row.remove_meta('fact_table')
+        row.node_type = nt.FACT
+        row.data_sources = table['source_prefix'] + [table['source'][i]]
+        for k, column in table['columns'].items():
+            row._store(k, column[i])
+        result.append(row)
+    return result
+
+
+def expand(alists: list):
+    ''' Replace the fact tables in a list of alists by their rows '''
+    if not any(is_fact_table(a) for a in alists):
+        return alists
+    result = []
+    for a in alists:
+        if is_fact_table(a):
+            result.extend(rows(a))
+        else:
+            result.append(a)
+    return result
@@ -5,6 +5,10 @@ Description: InferenceGraph for FRANK
 
 '''
 
+import heapq
+import os
+from collections import deque
+from itertools import islice
 import networkx as nx
 import random
 import plotly.graph_objects as go
@@ -13,16 +17,74 @@ from graph.alist import States as st
 from graph.alist import NodeTypes as nt
 from graph.alist import Attributes as tt
 from graph.alist import Branching as br
+from graph.array_graph import ArrayDiGraph
+from graph.array_graph import COMPLEMENT
+from graph import codec
 
-class InferenceGraph(nx.DiGraph):
-    def __init__(self):
-        nx.DiGraph.__init__(self)
+class InferenceGraphMixin:
+    '''
+    Inference graph operations. They only use the part of the networkx DiGraph
+    API that ArrayDiGraph implements, so they work with both graph backends
+    (see InferenceGraph and ArrayInferenceGraph below).
+    '''
+    def __init__(self, live_alists=False):
+        '''
+        Use live_alists=True to keep a single Alist object per node.
+        The accessors then return the same object for a node id, and the 
+        alist writes its changes through to the node data, so they are 
+        visible in the graph without calling add_alist again.
+        Otherwise the accessors return new alists, which only write changes 
+        of their meta data (state, cost, ...) through to the node, as the 
+        alists added to the graph do.
+        '''
+        super().__init__()
+        self.live_alists = live_alists
+        # identity map: node id -> live alist
+        self._alists = {}
+        # subgoal index: alist fingerprint -> ids of map nodes with that fingerprint
+        self._subgoals = {}
+        self._node_fingerprints = {}
+        # frontier index: one heap per (state, role) of the endpoints of frontier edges,
+        # role 0 for the map node (edge source) and 1 for the reduce node (edge target).
+        # Entries are (cost, source insertion ordinal, edge sequence, node id) so the
+        # order matches a stable sort by cost of the edges in iteration order.
+        # Entries are validated against the node when read (lazy deletion).
+        self._ordinals = {}
+        self._next_ordinal = 0
+        self._frontier_edges = {}
+        self._frontier_seq = {}
+        self._frontier_incident = {}
+        self._frontier_heaps = {}
+        self._next_edge_seq = 0
+        # complement index: map node -> complement reduce nodes and the reverse,
+        # in the order the complement edges were linked
+        self._compl_succ = {}
+        self._compl_pred = {}
+        # node ids allocated by link: a counter (as str, so complements are id + '_'),
+        # with the (parent id, depth, child number) of each id for display_id
+        self._next_id = 1
+        self._id_origin = {}
+        self._child_counts = {}
+        # change log for export_delta: ('node', id) or ('edge', u, v) -> (version, removed),
+        # ordered by version (a changed key moves to the end). Changes before
+        # _log_start (e.g. nodes of a decoded graph) are not in the log.
+        self.version = 0
+        self._changes = {}
+        self._log_start = 0
+        # nodes that became REDUCED since the last compact: their decompositions may be foldable
+        self._compaction_candidates = {}
 
     def add_alist(self, alist: Alist, create_complement=False):
         '''Add a alist to the graph'''
-        if len(self.nodes) == 0:
+        if len(self) == 0:
             alist.set(tt.ID, '0')
+        if alist.id not in self._node:
+            self._ordinals.pop(alist.id, None)
+            self._ordinal(alist.id)
         self.add_nodes_from([(alist.id, alist.attributes)])
+        self._bind_alist(alist)
+        self._index_subgoal(alist)
+        self._alist_changed(alist)
         if create_complement:
             alist_ = alist.copy()
             alist_.set(tt.ID, alist.id + '_')
@@ -32,15 +94,304 @@ class InferenceGraph(nx.DiGraph):
 
     def add_alists_from(self, alists: list):
         '''Add a list of alists to the graph'''
-        node_list = [(a.id, a.attributes) for a in list(alists)]
+        alists = list(alists)
+        for a in alists:
+            if a.id not in self._node:
+                self._ordinals.pop(a.id, None)
+                self._ordinal(a.id)
+        node_list = [(a.id, a.attributes) for a in alists]
         self.add_nodes_from(node_list)
+        for a in alists:
+            self._bind_alist(a)
+            self._index_subgoal(a)
+            self._alist_changed(a)
+
+    def _bind_alist(self, alist: Alist):
+        '''Attach an alist added to the graph to its node. With live_alists it becomes the 
+           live object of the node and writes all its changes through to it (see 
+           _alist_attribute_changed); otherwise only the changes of its meta data.'''
+        if self.live_alists:
+            # keep attributes of the node that the alist does not set (add_nodes_from merges them)
+            attrs = alist.attributes
+            for k, v in self._node[alist.id].items():
+                if k not in attrs:
+                    alist.set(k, v)
+            previous = self._alists.get(alist.id)
+            if previous is not None and previous is not alist:
+                previous._graph = None
+            self._alists[alist.id] = alist
+        alist._graph = self
+
+    def _live_alist(self, alist_id):
+        alist = self._alists.get(alist_id)
+        if alist is None:
+            node = self._node.get(alist_id)
+            if node is None:
+                return None
+            alist = Alist(**node)
+            alist._graph = self
+            self._alists[alist_id] = alist
+        return alist
+
+    def _is_live(self, alist: Alist):
+        return self._alists.get(alist.id) is alist
+
+    def _detach_alist(self, alist: Alist):
+        '''Detach an alist whose id changes: it no longer describes its node (add_alist attaches it again)'''
+        if self._alists.get(alist.id) is alist:
+            del self._alists[alist.id]
+        alist._graph = None
+
+    def _alist_attribute_changed(self, alist: Alist, attribute):
+        '''Write an attribute change of a live alist through to its node'''
+        if not self._is_live(alist):
+            return
+        node = self._node.get(alist.id)
+        if node is None:
+            return
+        if attribute in alist:
+            node[attribute] = alist.get(attribute)
+        else:
+            node.pop(attribute, None)
+        self._alist_touched(alist)
+
+    def _alist_meta_changed(self, alist: Alist, key):
+        '''Write a meta data change of an alist attached to the graph through to its node
+           and log it. A change of state or cost queues the frontier edges of the node again.'''
+        node = self._node.get(alist.id)
+        if node is None:
+            return
+        meta = node['meta']
+        value = alist.get_meta(key)
+        if value is None and key not in alist.meta:
+            meta.pop(key, None)
+        else:
+            meta[key] = value
+        self._alist_touched(alist)
+        if key == 'state' or key == 'cost':
+            self._alist_requeue(alist)
+
+    def _alist_touched(self, alist: Alist):
+        '''Record a change of a node made through its alist in the change log'''
+        if alist.id in self._node:
+            self._log_change(('node', alist.id))
+
+    def _alist_changed(self, alist: Alist):
+        '''Record a change of a node and queue its frontier edges again'''
+        self._alist_touched(alist)
+        self._alist_requeue(alist)
+
+    def _alist_requeue(self, alist: Alist):
+        '''Queue the frontier edges of a node again after its state or cost changed'''
+        if alist.state == st.REDUCED:
+            self._compaction_candidates[alist.id] = None
+        for (u, v) in self._frontier_incident.get(alist.id, ()):
+            self._frontier_push(u, v, (0,) if u == alist.id else (1,))
+
+    def _log_change(self, key, removed=False):
+        self.version += 1
+        self._changes.pop(key, None)
+        self._changes[key] = (self.version, removed)
+
+    def _ordinal(self, alist_id):
+        ordinal = self._ordinals.get(alist_id)
+        if ordinal is None:
+            ordinal = self._ordinals[alist_id] = self._next_ordinal
+            self._next_ordinal += 1
+        return ordinal
+
+    def _register_frontier_edge(self, u, v):
+        if (u, v) not in self._frontier_edges:
+            seq = self._next_edge_seq
+            self._next_edge_seq += 1
+            self._frontier_edges[(u, v)] = seq
+            self._frontier_seq[seq] = (u, v)
+            self._frontier_incident.setdefault(u, {})[(u, v)] = None
+            self._frontier_incident.setdefault(v, {})[(u, v)] = None
+        self._frontier_push(u, v)
+
+    def _unregister_frontier_edge(self, u, v):
+        seq = self._frontier_edges.pop((u, v), None)
+        if seq is not None:
+            del self._frontier_seq[seq]
+            for n in (u, v):
+                incident = self._frontier_incident.get(n)
+                if incident is not None:
+                    incident.pop((u, v), None)
+                    if not incident:
+                        del self._frontier_incident[n]
+
+    def _frontier_push(self, u, v, roles=(0, 1)):
+        seq = self._frontier_edges[(u, v)]
+        ordinal = self._ordinal(u)
+        for role in roles:
+            n = v if role else u
+            meta = self._node[n]['meta']
+            heap = self._frontier_heaps.setdefault((meta['state'], role), [])
+            heapq.heappush(heap, (meta['cost'], ordinal, seq, n))
+            if len(heap) > 2 * len(self._frontier_edges) + 32:
+                self._frontier_entries(meta['state'], role)
+
+    def _frontier_valid(self, entry, state, role):
+        cost, _, seq, n = entry
+        edge = self._frontier_seq.get(seq)
+        if edge is None or n != edge[role] or n not in self._node:
+            return False
+        u, v = edge
+        if not self.has_edge(u, v) or not self._edge_attr(u, v, 'frontier'):
+            return False
+        meta = self._node[n]['meta']
+        return meta['state'] == state and meta['cost'] == cost
+
+    def _frontier_entries(self, state, role):
+        '''Valid entries of a frontier heap in priority order; compacts the heap'''
+        heap = self._frontier_heaps.get((state, role))
+        if not heap:
+            return []
+        seen = set()
+        entries = []
+        for entry in sorted(heap):
+            if entry[2] not in seen and self._frontier_valid(entry, state, role):
+                seen.add(entry[2])
+                entries.append(entry)
+        # a sorted list is a valid heap
+        self._frontier_heaps[(state, role)] = list(entries)
+        return entries
+
+    def _frontier_iter(self, states, role):
+        '''Yield the valid entries of the frontier heaps of the states in priority order,
+           each frontier edge once. Entries are popped from the heaps as they are read;
+           the valid ones are pushed back when the generator is closed.'''
+        heaps = [(self._frontier_heaps[(s, role)], s) for s in states if self._frontier_heaps.get((s, role))]
+        seen = set()
+        popped = []
+        try:
+            while True:
+                top = None
+                for heap, state in heaps:
+                    while heap and not self._frontier_valid(heap[0], state, role):
+                        heapq.heappop(heap)
+                    if heap and (top is None or heap[0] < top[0]):
+                        top = heap
+                if top is None:
+                    return
+                entry = heapq.heappop(top)
+                if entry[2] in seen:
+                    # another entry of a frontier edge already read
+                    continue
+                seen.add(entry[2])
+                popped.append((top, entry))
+                yield entry
+        finally:
+            for heap, entry in popped:
+                heapq.heappush(heap, entry)
+
+    def _frontier_top(self, state, role):
+        heap = self._frontier_heaps.get((state, role))
+        while heap and not self._frontier_valid(heap[0], state, role):
+            heapq.heappop(heap)
+        return heap[0] if heap else None
+
+    def _register_complement(self, u, v):
+        self._compl_succ.setdefault(u, {})[v] = None
+        self._compl_pred.setdefault(v, {})[u] = None
+
+    def _unregister_complement(self, u, v):
+        for index, a, b in ((self._compl_succ, u, v), (self._compl_pred, v, u)):
+            linked = index.get(a)
+            if linked is not None:
+                linked.pop(b, None)
+                if not linked:
+                    del index[a]
+
+    def _rebuild_indexes(self):
+        '''Rebuild the frontier and complement indexes and the id counter from the nodes and edges of the graph.
+           Restarts the change log, so export_delta gives a full export for earlier versions.'''
+        self._compl_succ = {}
+        self._compl_pred = {}
+        self._changes = {}
+        self._log_start = self.version
+        numeric_ids = [int(n) for n in self._node if n.isdigit()]
+        self._next_id = max(self._next_id, max(numeric_ids, default=0) + 1)
+        for u, v, complement in self.edges(data='complement'):
+            if complement:
+                self._register_complement(u, v)
+        self._compaction_candidates = {n: None for n, attrs in self._node.items()
+                                       if attrs['meta']['state'] == st.REDUCED}
+        self._rebuild_frontier()
+
+    def _rebuild_frontier(self):
+        '''Rebuild the frontier index from the nodes and edges of the graph'''
+        self._ordinals = {}
+        self._frontier_edges = {}
+        self._frontier_seq = {}
+        self._frontier_incident = {}
+        self._frontier_heaps = {}
+        for n in self._node:
+            self._ordinal(n)
+        for u, v, frontier in self.edges(data='frontier'):
+            if frontier:
+                self._register_frontier_edge(u, v)
+
+    def save(self, path, extra=None):
+        '''Write a checkpoint of the graph (nodes, edges and id allocation) to a file.
+           `extra` is an optional dict of values (as supported by graph/codec.py) saved with it.
+           The file is replaced atomically, so an interrupted save keeps the previous checkpoint.'''
+        state = {'next_id': self._next_id, 'id_origin': self._id_origin,
+                 'child_counts': self._child_counts, 'extra': extra or {}}
+        data = codec.encode_checkpoint(self, state)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, live_alists=False, with_extra=False):
+        '''Read a graph saved with save(). Returns (graph, extra) if with_extra=True'''
+        with open(path, 'rb') as f:
+            data = f.read()
+        graph, state = codec.decode_checkpoint(data, cls(live_alists=live_alists))
+        graph._next_id = max(graph._next_id, state['next_id'])
+        graph._id_origin = state['id_origin']
+        graph._child_counts = state['child_counts']
+        return (graph, state['extra']) if with_extra else graph
+
+    def _index_subgoal(self, alist: Alist):
+        '''Index the fingerprint of a map node that is not a fact'''
+        if alist.is_map != 1 or alist.node_type in (nt.FACT, nt.FACT_TABLE):
+            return
+        fingerprint = alist.fingerprint()
+        previous = self._node_fingerprints.get(alist.id)
+        if previous == fingerprint:
+            return
+        if previous is not None:
+            self._unindex_subgoals([alist.id])
+        self._node_fingerprints[alist.id] = fingerprint
+        self._subgoals.setdefault(fingerprint, {})[alist.id] = None
+
+    def _unindex_subgoals(self, alist_ids):
+        for alist_id in alist_ids:
+            fingerprint = self._node_fingerprints.pop(alist_id, None)
+            if fingerprint is not None:
+                ids = self._subgoals[fingerprint]
+                ids.pop(alist_id, None)
+                if not ids:
+                    del self._subgoals[fingerprint]
+
+    def find_subgoals(self, alist: Alist):
+        '''Get the ids of other map nodes in the graph that describe the same subproblem as the alist'''
+        return [x for x in self._subgoals.get(alist.fingerprint(), {}) if x != alist.id]
+
+    def repeated_subgoals(self):
+        '''Get the groups of map node ids that share a fingerprint'''
+        return [list(ids) for ids in self._subgoals.values() if len(ids) > 1]
 
     def parent_alists(self, alist_id, exclude_self_complement=True):
         '''Get the parent alists of a node'''
         pred = self.predecessors(alist_id)
-        pred_arr = [Alist(**self.nodes[x]) for x in pred 
+        pred_arr = [self.alist(x) for x in pred 
                      if exclude_self_complement == False 
-                        or exclude_self_complement and self[x][alist_id]['complement'] == False]
+                        or exclude_self_complement and self._edge_attr(x, alist_id, 'complement') == False]
                         # alist_id.replace('_','') != x.replace('_','')]
         
         return pred_arr
@@ -48,9 +399,9 @@ class InferenceGraph(nx.DiGraph):
     def child_alists(self, alist_id, exclude_self_complement=True):
         '''Get the child alists of a node'''
         succ = self.successors(alist_id)
-        succ_arr = [Alist(**self.nodes[x]) for x in succ
+        succ_arr = [self.alist(x) for x in succ
                      if exclude_self_complement == False 
-                        or exclude_self_complement and  self[alist_id][x]['complement'] == False]
+                        or exclude_self_complement and  self._edge_attr(alist_id, x, 'complement') == False]
                         #or exclude_self_complement and alist_id.replace('_','') != x.replace('_','')]
         return succ_arr
 
@@ -75,7 +426,7 @@ class InferenceGraph(nx.DiGraph):
         pred = self.predecessors(alist_id)
         pred_arr = [x for x in pred
                     if exclude_self_complement == False 
-                        or (exclude_self_complement and  self[x][alist_id]['complement'] == False)]
+                        or (exclude_self_complement and  self._edge_attr(x, alist_id, 'complement') == False)]
                         #exclude_self_complement and alist_id.replace('_','') != x.replace('_','')]
         return pred_arr
 
@@ -84,7 +435,7 @@ class InferenceGraph(nx.DiGraph):
         succ = self.successors(alist_id)
         succ_arr = [x for x in succ 
                      if exclude_self_complement == False 
-                        or (exclude_self_complement and self[alist_id][x]['complement'] == False)]
+                        or (exclude_self_complement and self._edge_attr(alist_id, x, 'complement') == False)]
                         #exclude_self_complement and alist_id.replace('_','') != x.replace('_','')]
         return succ_arr
 
@@ -106,37 +457,84 @@ class InferenceGraph(nx.DiGraph):
 
     def alist(self, alist_id):
         '''Get the alist object for a given alist id'''
+        if self.live_alists:
+            return self._live_alist(alist_id)
         try:
             alist = Alist(**self.nodes[alist_id])
-            return alist
         except:
             return None
+        alist._graph = self
+        return alist
 
     def alists(self):
         '''Get all alists in inference graph'''
-        alists = [Alist(**self.nodes[x]) for x in list(self.nodes())]
+        alists = [self.alist(x) for x in list(self.nodes())]
         return alists
 
     def alists_and_edges(self, show_hidden_edges=True):
         '''Get a list of nodes and edges between them'''
-        nodes_and_edges = [{'source': x[0], 'target': x[1], 'label':self[x[0]][x[1]]['label'],
-            'edge': self[x[0]][x[1]]} 
+        nodes_and_edges = [self._ui_edge(x[0], x[1])
                 for x in self.edges() 
                     if show_hidden_edges==True or 
-                        (show_hidden_edges==False and self[x[0]][x[1]]["hidden"]==False)]
+                        (show_hidden_edges==False and self._edge_attr(x[0], x[1], "hidden")==False)]
         return nodes_and_edges
 
+    def _ui_node(self, alist_id):
+        '''Node attributes with the meta attributes at the top level'''
+        n = dict(self._node[alist_id])
+        n.update(n['meta'])
+        n.pop('meta', None)
+        return n
+
+    def _ui_edge(self, u, v):
+        edge = self[u][v]
+        return {'source': u, 'target': v, 'label': edge['label'], 'edge': edge}
+
     def ui_graph(self, show_hidden_edges=True):
         '''Get list of nodes and list of edges between nodes in graph. 
         This is used for serializing the inference graph to be plotted in other UI tools.'''
-        nodes = [dict(x.attributes) for x in list(self.alists())]
-        nodes_arr = []
-        for n in nodes:
-            n.update(n['meta'])
-            n.pop('meta', None)
-            nodes_arr.append(n)
+        nodes = [self._ui_node(x) for x in list(self.nodes())]
         return {'nodes': nodes, 'edges': self.alists_and_edges(show_hidden_edges)}
 
+    def export_delta(self, since_version=None, show_hidden_edges=True, cytoscape=False):
+        '''Get the nodes and edges added, changed or removed after `since_version`, 
+        in the format of ui_graph (or cytoscape_ui_graph with cytoscape=True).
+        Pass the returned 'version' as since_version of the next call. 
+        With since_version=None, or a version older than the change log, the whole 
+        graph is returned with 'full' set to True and the client should replace its copy.
+        Changes are recorded by the InferenceGraph methods (add_alist, link, remove_link, 
+        subdivide, prune), by the meta data setters (state, cost, ...) of the alists returned 
+        by the graph and, with live_alists, by their other setters.'''
+        full = since_version is None or since_version < self._log_start
+        if full:
+            g = self.ui_graph(show_hidden_edges)
+            nodes, edges = g['nodes'], g['edges']
+            removed_nodes, removed_edges = [], []
+        else:
+            changes = []
+            for key, (version, removed) in reversed(self._changes.items()):
+                if version <= since_version:
+                    break
+                changes.append((key, removed))
+            changes.reverse()
+            nodes, edges, removed_nodes, removed_edges = [], [], [], []
+            for key, removed in changes:
+                if key[0] == 'node':
+                    if removed or key[1] not in self._node:
+                        removed_nodes.append(key[1])
+                    else:
+                        nodes.append(self._ui_node(key[1]))
+                elif (removed or not self.has_edge(key[1], key[2])
+                        or (not show_hidden_edges and self._edge_attr(key[1], key[2], 'hidden'))):
+                    removed_edges.append({'source': key[1], 'target': key[2]})
+                else:
+                    edges.append(self._ui_edge(key[1], key[2]))
+        if cytoscape:
+            nodes = [{"data": y} for y in nodes]
+            edges = [{"data": y} for y in edges]
+        return {'version': self.version, 'full': full, 'nodes': nodes, 'edges': edges,
+                'removed_nodes': removed_nodes, 'removed_edges': removed_edges}
+
     def cytoscape_ui_graph(self):
         '''Get the inference graph in a Cytoscape compatible format.'''
         g = self.ui_graph(show_hidden_edges=False)
@@ -148,45 +546,78 @@ class InferenceGraph(nx.DiGraph):
         '''Create an edge between two nodes in the graph. Can also be used to link new nodes to existing ones'''
         if parent:
             if new_child_id:
-                succ = [x for x in self.successors(parent.id) if self[parent.id][x]['complement'] == False]# != parent.id + '_'] # non complement successors
-                succ_nodes = [self.nodes[x] for x in succ]            
                 child.depth = parent.depth + 1
-                cid = f"{parent.depth + 1}{parent.id}{len(succ_nodes) + 1}"
-                ctr = 1
-                while cid in succ:
-                    cid = f"{parent.depth + 1}{parent.id}{len(succ_nodes) + 1 + ctr}"
-                    ctr += 1
+                n = self._child_counts.get(parent.id, 0) + 1
+                self._child_counts[parent.id] = n
+                cid = self._new_id()
+                self._id_origin[cid] = (parent.id, child.depth, n)
                 child.id = cid
                 
             self.add_alist(child)
+            if parent.id not in self._node:
+                self._ordinal(parent.id)
+                self._log_change(('node', parent.id))
             self.add_edge(parent.id, child.id, 
                 **{'label': edge_label, 'frontier': frontier, 'hidden': hidden, 'complement': complement})
+            self._log_change(('edge', parent.id, child.id))
+            if frontier:
+                self._register_frontier_edge(parent.id, child.id)
+            else:
+                self._unregister_frontier_edge(parent.id, child.id)
+            if complement:
+                self._register_complement(parent.id, child.id)
+            else:
+                self._unregister_complement(parent.id, child.id)
         else:
             self.add_alist(child)
         return (parent.id, child.id)
 
+    def _new_id(self):
+        cid = str(self._next_id)
+        self._next_id += 1
+        while cid in self._node:
+            # id taken by a node added with its own id (e.g. a decoded graph)
+            cid = str(self._next_id)
+            self._next_id += 1
+        return cid
+
+    def display_id(self, alist_id):
+        '''Get the readable id of a node for traces: f"{depth}{parent display id}{child number}"
+           for ids allocated by link, keeping the '_' suffixes of complement and reduce nodes'''
+        # walk up to the first node without an allocated id (iteratively, graphs can be deep)
+        prefixes, suffixes = [], []
+        node_id = alist_id
+        head, sep, tail = node_id.partition('_')
+        origin = self._id_origin.get(head)
+        while origin is not None:
+            parent, depth, n = origin
+            prefixes.append(str(depth))
+            suffixes.append(f"{n}{sep}{tail}")
+            node_id = parent
+            head, sep, tail = node_id.partition('_')
+            origin = self._id_origin.get(head)
+        return ''.join(prefixes) + node_id + ''.join(reversed(suffixes))
+
     def remove_link(self, parent_id, child_id):
         '''Remove edge between two nodes in the graph.'''
         if parent_id in self and child_id in self[parent_id]:
             self.remove_edge(parent_id, child_id)
+            self._log_change(('edge', parent_id, child_id), removed=True)
+            self._unregister_frontier_edge(parent_id, child_id)
+            self._unregister_complement(parent_id, child_id)
 
     def find_complement(self, alist_id:str, node_type='any'): ## node_type: any, map, reduce
         ''' Returns a list complement node ids'''
         complements = []
         if node_type in ['any', 'map'] and '_' not in alist_id:
-            complements.extend([x for x in self[alist_id] if self[alist_id][x]['complement']==True])
+            complements.extend(self._compl_succ.get(alist_id, ()))
         if node_type in ['any', 'reduce']:
-            complements.extend([x for x in self.parent_ids(alist_id, exclude_self_complement=False) if self[x][alist_id]['complement']==True])
+            complements.extend(self._compl_pred.get(alist_id, ()))
         return complements
 
     def find_complement_node(self, alist:Alist, node_type='any'): # node_type: any, map, reduce
         ''' Returns a list complement nodes'''
-        complements = []
-        if node_type in ['any', 'map'] and '_' not in alist.id:
-            complements.extend([self.alist(x) for x in self[alist.id] if self[alist.id][x]['complement']==True])
-        if node_type in ['any', 'reduce']:
-            complements.extend([self.alist(x) for x in self.parent_ids(alist.id, exclude_self_complement=False) if self[x][alist.id]['complement']==True])
-        return complements
+        return [self.alist(x) for x in self.find_complement(alist.id, node_type)]
 
     def leaf_nodes(self, sort=False, sort_key=None):
         '''Get all leaf nodes in the graph'''
@@ -195,62 +626,237 @@ class InferenceGraph(nx.DiGraph):
 
     def leaf_alists(self, sort=False, sort_key=None):
         '''Get all leaf nodes as alist objects'''
-        nodes = [Alist(**self.nodes[x])
+        nodes = [self.alist(x)
                  for x in self.nodes() if self.out_degree(x) == 0]
 
         if sort and sort_key:
             nodes.sort(key=sort_key)
         elif sort and not sort_key:
-            nodes.sort(key=lambda x: x.attributes['meta']['cost'])
+            nodes.sort(key=lambda x: x.cost)
 
         return nodes
 
+    def nodes_between(self, source, target):
+        '''Get the nodes on the paths from source to target (including both), 
+           i.e. the descendants of source that are ancestors of target'''
+        descendants = set()
+        stack = [source]
+        while stack:
+            for c in self.successors(stack.pop()):
+                if c not in descendants:
+                    descendants.add(c)
+                    stack.append(c)
+        if target not in descendants:
+            return set()
+        between = {source, target}
+        # walk back from the target within the descendants of source
+        stack = [target]
+        while stack:
+            for p in self.predecessors(stack.pop()):
+                if p in descendants and p not in between:
+                    between.add(p)
+                    stack.append(p)
+        return between
+
     def prune(self, alist_id):
-        '''Remove an alist from the inference graph'''
-        succ = nx.bfs_successors(self, alist_id)
-        # complements = self.find_complement(alist_id)
+        '''Remove an alist and the subgraph between it and its complement from the inference graph'''
         source = alist_id if alist_id[-1] != '_' else alist_id[0:-1]    
-        parents = self.parent_ids(source)   
         compl = self.find_complement(alist_id)        
         nodes_between_set = set()
         for t in compl: 
-            # target = alist_id if alist_id[-1] == '_' else alist_id + '_'
-        
-            paths_between_generator =  nx.all_simple_paths(self, source, t)
-            nodes_between_set = nodes_between_set.union({node for path in paths_between_generator for node in path})
-        
-        self.remove_nodes_from(nodes_between_set)
-        
-    def frontier(self, size=1, state=st.UNEXPLORED, update_state=False, new_state = st.EXPLORING):
-        ''' Get reduce subgraph frontier nodes that are not resolved '''
-        frontier_edges = self.edges()
+            nodes_between_set |= self.nodes_between(source, t)
+        self._remove_nodes(nodes_between_set)
+
+    def _remove_nodes(self, nodes):
+        '''Remove nodes and their edges from the graph and the indexes'''
+        for x in nodes:
+            if x in self._node:
+                for y in self.predecessors(x):
+                    self._log_change(('edge', y, x), removed=True)
+                for y in self.successors(x):
+                    self._log_change(('edge', x, y), removed=True)
+                self._log_change(('node', x), removed=True)
+        self.remove_nodes_from(nodes)
+        self._unindex_subgoals(nodes)
+        for x in nodes:
+            self._alists.pop(x, None)
+            self._ordinals.pop(x, None)
+            self._child_counts.pop(x, None)
+            for (u, v) in list(self._frontier_incident.get(x, ())):
+                self._unregister_frontier_edge(u, v)
+            for v in list(self._compl_succ.get(x, ())):
+                self._unregister_complement(x, v)
+            for u in list(self._compl_pred.get(x, ())):
+                self._unregister_complement(u, x)
+
+    def _settled(self, alist_id):
+        '''True if a node will not be explored or reduced again: it is not being explored,
+           not waiting to be reduced and not an unexplored map node of a frontier edge'''
+        state = self._node[alist_id]['meta']['state']
+        if state == st.EXPLORING or state == st.REDUCIBLE:
+            return False
+        if state == st.UNEXPLORED:
+            return not any(u == alist_id for u, v in self._frontier_incident.get(alist_id, ()))
+        return True
+
+    def _compactable_section(self, map_id):
+        '''Get the nodes between the map node of a decomposition and its reduce nodes,
+           or None if the decomposition is not fully reduced: a reduce node is not REDUCED,
+           a node in between is not settled, or a node in between is linked to other nodes.'''
+        reduce_ids = [r for r in self._compl_succ.get(map_id, ()) if r != map_id + '_']
+        if not reduce_ids or any(self._node[r]['meta']['state'] != st.REDUCED for r in reduce_ids):
+            return None
+        boundary = set(reduce_ids)
+        section = dict.fromkeys(c for c in self.successors(map_id) if c not in boundary)
+        stack = list(section)
+        while stack:
+            n = stack.pop()
+            if not self._settled(n):
+                return None
+            for c in self.successors(n):
+                if c not in section and c not in boundary:
+                    section[c] = None
+                    stack.append(c)
+        for n in section:
+            for p in self.predecessors(n):
+                if p != map_id and p not in section:
+                    return None
+        return list(section) or None
+
+    def compact(self, spill_dir=None):
+        '''Fold fully reduced decompositions into summary nodes to bound the size of the graph.
+           The nodes between the map node of a decomposition and its reduce nodes (facts,
+           successors and nested decompositions) are removed once the reduce nodes are REDUCED
+           and none of them can be explored or reduced again. The map node becomes a SUMMARY node
+           with the value, covariance and data sources of the reduce nodes, and 'fact_count' and
+           'compacted' (number of removed nodes) in its meta. The reduce nodes are kept, so the
+           nodes below them are not affected.
+           If spill_dir is given, the removed nodes are written to '<spill_dir>/<map node id>.frkg'
+           (see spilled_graph). Only decompositions whose reduce nodes became REDUCED since the
+           last call are checked. Returns the ids of the new summary nodes.'''
+        candidates = self._compaction_candidates
+        self._compaction_candidates = {}
+        summaries = []
+        for reduce_id in candidates:
+            for map_id in list(self._compl_pred.get(reduce_id, ())):
+                if reduce_id == map_id + '_':
+                    continue
+                section = self._compactable_section(map_id)
+                if section:
+                    self._compact_section(map_id, section, spill_dir)
+                    summaries.append(map_id)
+        if summaries:
+            self._trim_change_log()
+        return summaries
+
+    def _trim_change_log(self):
+        '''Drop the oldest entries of the change log (mostly removed nodes and edges) when it is
+           more than twice as long as the graph; export_delta gives a full export for older versions'''
+        excess = len(self._changes) - 2 * (len(self._node) + self.number_of_edges())
+        if excess <= 0:
+            return
+        for key in list(islice(self._changes, excess)):
+            self._log_start = self._changes.pop(key)[0]
+
+    def _compact_section(self, map_id, section, spill_dir=None):
+        reduce_ids = [r for r in self._compl_succ[map_id] if r != map_id + '_']
+        fact_count = 0
+        compacted = len(section)
+        for n in section:
+            meta = self._node[n]['meta']
+            if meta['node_type'] == nt.FACT:
+                fact_count += 1
+            elif meta['node_type'] == nt.FACT_TABLE:
+                fact_count += meta['fact_table']['rows']
+            elif meta['node_type'] == nt.SUMMARY:
+                fact_count += meta['fact_count']
+                compacted += meta['compacted']
+        spill = None
+        if spill_dir is not None:
+            os.makedirs(spill_dir, exist_ok=True)
+            spill = os.path.join(spill_dir, f"{map_id}.frkg")
+            with open(spill, 'wb') as f:
+                f.write(codec.encode_graph(self, [map_id] + section + reduce_ids))
+        self._remove_nodes(section)
+        for n in section:
+            self._id_origin.pop(n, None)
+        # the summary feeds its reduce nodes directly
+        for r in reduce_ids:
+            self[map_id][r]['hidden'] = False
+            self._log_change(('edge', map_id, r))
+
+        reduced = [self.alist(r) for r in reduce_ids]
+        summary = self.alist(map_id)
+        summary.set(tt.OPVALUE, reduced[0].get(tt.OPVALUE))
+        summary.set(tt.COV, reduced[0].get(tt.COV))
+        summary.data_sources = list(dict.fromkeys(s for r in reduced for s in r.data_sources))
+        summary.node_type = nt.SUMMARY
+        summary.set_meta('fact_count', fact_count)
+        summary.set_meta('compacted', compacted)
+        summary.set_meta('spill', spill)
+        summary.state = st.REDUCED
+        self.add_alist(summary)
+
+    def spilled_graph(self, alist_id):
+        '''Load the nodes folded into a summary node by compact (with the summary node as it was
+           before and its reduce nodes) from the spill file, or None if they were not spilled'''
+        path = self._node[alist_id]['meta'].get('spill')
+        if path is None:
+            return None
+        with open(path, 'rb') as f:
+            return codec.decode_graph(f.read(), type(self)())
+
+    def frontier(self, size=None, state=st.UNEXPLORED, update_state=False, new_state = st.EXPLORING, dedupe=False):
+        ''' Get reduce subgraph frontier nodes that are not resolved, sorted by cost.
+            Use size to get at most size map nodes and size reduce nodes (default: all);
+            only the entries needed are read from the frontier heaps.
+            Use dedupe=True to return only the first of the map nodes that share a fingerprint.'''
+        states = [state] if state is None else [state, None]
         frontier_map_nodes = []
         frontier_reduce_nodes = []
-        for (u,v) in frontier_edges:
-            if self[u][v]['frontier'] == True:
-                u = self.alist(u)
-                v = self.alist(v)
-                if u.state == state or u.state == None:
-                    if update_state:
-                        u.state = new_state
-                    frontier_map_nodes.append(u)
-                if v.state == state or v.state == None:
-                    if update_state:
-                        v.state = new_state
-                    frontier_reduce_nodes.append(v)
-        frontier_map_nodes.sort(key=lambda x: x.attributes['meta']['cost'])
-        frontier_reduce_nodes.sort(key=lambda x: x.attributes['meta']['cost'])
+        seen = set()
+        entries = self._frontier_iter(states, 0)
+        try:
+            for entry in entries:
+                if size is not None and len(frontier_map_nodes) >= size:
+                    break
+                u = self.alist(entry[3])
+                if dedupe:
+                    if u.fingerprint() in seen:
+                        continue
+                    seen.add(u.fingerprint())
+                frontier_map_nodes.append(u)
+        finally:
+            entries.close()
+        entries = self._frontier_iter(states, 1)
+        try:
+            for entry in entries:
+                if size is not None and len(frontier_reduce_nodes) >= size:
+                    break
+                frontier_reduce_nodes.append(self.alist(entry[3]))
+        finally:
+            entries.close()
+        if update_state:
+            for x in frontier_map_nodes + frontier_reduce_nodes:
+                x.state = new_state
 
         return (frontier_map_nodes, frontier_reduce_nodes)
 
+    def frontier_head(self, state=st.UNEXPLORED):
+        ''' Get the lowest cost frontier map node in a state, or None if there is none'''
+        states = [state] if state is None else [state, None]
+        entries = [e for e in (self._frontier_top(s, 0) for s in states) if e is not None]
+        return self.alist(min(entries)[3]) if entries else None
+
     def blanket_subgraph(self, alist_id, ancestor_length=1, descendant_length=1):
         '''Get a subgraph of the inference grah using the blanket size'''
+        G = self.to_networkx()
         ancestors = nx.single_target_shortest_path(
-            self, alist_id, cutoff=ancestor_length)
+            G, alist_id, cutoff=ancestor_length)
         descendants = nx.single_source_shortest_path(
-            self, alist_id, cutoff=descendant_length)
+            G, alist_id, cutoff=descendant_length)
         nodes = set(list(ancestors.keys()) + list(descendants.keys()))
-        blanket = self.subgraph(nodes)
+        blanket = G.subgraph(nodes)
         return blanket
     
     def subdivide(self, source_alist_id, target_alist_id, map_op_node:Alist, reduce_op_nodes:list, 
@@ -264,16 +870,17 @@ class InferenceGraph(nx.DiGraph):
         if self.has_edge(source_alist_id,target_alist_id):
             # hide edge
             self[source_alist_id][target_alist_id]['hidden'] = True
+            self._log_change(('edge', source_alist_id, target_alist_id))
         elif target_alist_id not in self[source_alist_id] or self[source_alist_id][target_alist_id]['complement'] == False:
             return None       
         
         # add map/reduce nodes        
-        u:Alist = Alist(**self.nodes[source_alist_id])
+        u:Alist = self.alist(source_alist_id)
         u.is_frontier = 0
         decomp = map_op_node
         edge = self.link(u, decomp)
 
-        v:Alist = Alist(**self.nodes[target_alist_id])
+        v:Alist = self.alist(target_alist_id)
         v.is_frontier = 0
         
         reduce_s = []
@@ -349,7 +956,6 @@ class InferenceGraph(nx.DiGraph):
             alist.state = st.IGNORE
             return alist
 
-        alist.branchType = br.OR
         map_op_node = None
         try:
             map_op_node, reduce_op_nodes, map_op_successors = map_op[0](alist)
@@ -361,8 +967,21 @@ class InferenceGraph(nx.DiGraph):
         else:
             return (None, None, None)
 
-    def plot_plotly(self, question='', answer='',  label_exclusion_list=[], show_hidden_edges=False):
-        '''Plot inference graph using Plotly'''
+    def plot_plotly(self, question='', answer='',  label_exclusion_list=[], show_hidden_edges=False,
+                    renderer='auto', fact_threshold=50, show=True):
+        '''Plot inference graph using Plotly. 
+           renderer='webgl' draws with Scattergl on the iterative layered_layout, shows compact 
+           hover text and collapses the fact children of a node into one marker when there are 
+           more than fact_threshold of them (None: never). renderer='svg' uses hierarchy_layout 
+           and go.Scatter; 'auto' picks webgl for graphs with more than 500 nodes.
+           Returns the figure; it is also shown if show=True.'''
+        if renderer == 'auto':
+            renderer = 'webgl' if len(self) > 500 else 'svg'
+        if renderer == 'webgl':
+            fig = self._plot_plotly_webgl(question, answer, label_exclusion_list, show_hidden_edges, fact_threshold)
+            if show:
+                fig.show()
+            return fig
         G = self
         pos = self.hierarchy_layout(self,'0')    
         edge_x = []
@@ -443,7 +1062,7 @@ class InferenceGraph(nx.DiGraph):
 
             if alist.id == '0':
                 colors.append(pallette['red'])
-            elif alist.node_type == nt.FACT:
+            elif alist.node_type in (nt.FACT, nt.FACT_TABLE):
                 colors.append(pallette['black'])
             elif alist.state == st.REDUCED or alist.state == st.REDUCIBLE:
                 colors.append(pallette['green-teal'])
@@ -456,12 +1075,18 @@ class InferenceGraph(nx.DiGraph):
             if alist.node_type == nt.FACT:
                 sizes.append(8)
                 marker_symbols.append('circle-dot')
+            elif alist.node_type == nt.FACT_TABLE:
+                sizes.append(10)
+                marker_symbols.append('square-dot')
             elif alist.node_type == nt.ZNODE:
                 sizes.append(8)
                 marker_symbols.append('circle')
             elif alist.node_type == nt.HNODE:
                 sizes.append(10)
                 marker_symbols.append('square')
+            elif alist.node_type == nt.SUMMARY:
+                sizes.append(12)
+                marker_symbols.append('diamond')
 
         node_trace = go.Scatter(
             x=node_x, 
@@ -485,7 +1110,7 @@ class InferenceGraph(nx.DiGraph):
         fig = go.Figure(data=[edge_trace, edge_hidden_trace, node_trace],
                         layout=go.Layout(
                             title=f'Inference Graph <br><span style="font-size:12px; margin-top:-5px"><b>Q:</b> {question} {answer_formatted} </span>',
-                            titlefont_size=12,
+                            title_font_size=12,
                             font_size=10,
                             showlegend=False,
                             hovermode='closest',
@@ -499,7 +1124,175 @@ class InferenceGraph(nx.DiGraph):
                             )
                             
                         )
-        fig.show()
+        if show:
+            fig.show()
+        return fig
+
+    def _plot_view(self, fact_threshold=None, show_hidden_edges=False):
+        '''Nodes and edges to plot: (node ids, {u: {v: hidden}}, {summary id: fact ids}).
+           The fact children of a node are replaced by one summary node 
+           when there are more than fact_threshold of them.'''
+        collapsed = {}
+        summary_of = {}
+        if fact_threshold is not None:
+            for n in self._node:
+                facts = [c for c in self.successors(n) if self._node[c]['meta']['node_type'] == nt.FACT]
+                if len(facts) > fact_threshold:
+                    summary = f"{n}+facts"
+                    collapsed[summary] = facts
+                    for f in facts:
+                        summary_of[f] = summary
+        nodes = list(dict.fromkeys(summary_of.get(n, n) for n in self._node))
+        adjacency = {}
+        for u, v, hidden in self.edges(data='hidden'):
+            if hidden and not show_hidden_edges:
+                continue
+            u = summary_of.get(u, u)
+            v = summary_of.get(v, v)
+            succ = adjacency.setdefault(u, {})
+            succ[v] = succ.get(v, True) and hidden
+        return nodes, adjacency, collapsed
+
+    def layered_layout(self, root='0', nodes=None, adjacency=None, vert_gap=0.08):
+        '''Iterative O(V+E) layered layout. A node is placed one level below its deepest 
+           parent along the visible (not hidden) edges, and the nodes of a level are ordered 
+           by the mean x position of their parents. Works on graphs of any depth.
+           nodes and adjacency default to the visible graph (see _plot_view).'''
+        if nodes is None or adjacency is None:
+            nodes, adjacency, _ = self._plot_view()
+        succ = {u: [v for v, hidden in vs.items() if not hidden] for u, vs in adjacency.items()}
+        pred = {}
+        in_degree = dict.fromkeys(nodes, 0)
+        for u, vs in succ.items():
+            for v in vs:
+                in_degree[v] += 1
+                pred.setdefault(v, []).append(u)
+
+        # longest path layering in topological order (Kahn), starting with the root
+        sources = [n for n in nodes if in_degree[n] == 0]
+        if root in in_degree and in_degree[root] == 0:
+            sources.remove(root)
+            sources.insert(0, root)
+        level = dict.fromkeys(sources, 0)
+        queue = deque(sources)
+        while queue:
+            u = queue.popleft()
+            for v in succ.get(u, ()):
+                level[v] = max(level.get(v, 0), level[u] + 1)
+                in_degree[v] -= 1
+                if in_degree[v] == 0:
+                    queue.append(v)
+        # nodes on cycles go below the rest
+        bottom = max(level.values(), default=-1) + 1
+        for n in nodes:
+            if in_degree[n] > 0:
+                level[n] = bottom
+
+        levels = {}
+        for n in nodes:
+            levels.setdefault(level[n], []).append(n)
+        pos = {}
+        for l in sorted(levels):
+            rank = {n: i for i, n in enumerate(levels[l])}
+            def barycenter(n):
+                xs = [pos[p][0] for p in pred.get(n, ()) if p in pos]
+                return (sum(xs) / len(xs) if xs else 0.5, rank[n])
+            ordered = sorted(levels[l], key=barycenter)
+            width = len(ordered) + 1
+            for i, n in enumerate(ordered):
+                pos[n] = ((i + 1) / width, -l * vert_gap)
+        return pos
+
+    def _plot_plotly_webgl(self, question, answer, label_exclusion_list, show_hidden_edges, fact_threshold):
+        nodes, adjacency, collapsed = self._plot_view(fact_threshold, show_hidden_edges)
+        pos = self.layered_layout('0', nodes, adjacency)
+        edge_xy = ([], [])
+        edge_hidden_xy = ([], [])
+        for u, vs in adjacency.items():
+            for v, hidden in vs.items():
+                xs, ys = edge_hidden_xy if hidden else edge_xy
+                xs.extend((pos[u][0], pos[v][0], None))
+                ys.extend((pos[u][1], pos[v][1], None))
+
+        pallette = {'grey': '#A5A5A5', 'orange': '#F28C02', 'black': '#000000',
+                    'red': '#CC0000', 'green-teal': '#009922'}
+        node_x, node_y, colors, sizes, symbols, labels, customdata = [], [], [], [], [], [], []
+        for n in nodes:
+            x, y = pos[n]
+            node_x.append(x)
+            node_y.append(y)
+            if n in collapsed:
+                facts = collapsed[n]
+                values = ', '.join(str(self._node[f].get(tt.OPVALUE, '')) for f in facts[:5])
+                colors.append(pallette['grey'])
+                sizes.append(12)
+                symbols.append('diamond')
+                labels.append(f'{len(facts)} facts')
+                customdata.append((n, 'facts', f'{len(facts)} facts: {values}, ...'))
+                continue
+            attrs = self._node[n]
+            meta = attrs['meta']
+            op = attrs.get(tt.OP, '')
+            if n == '0':
+                colors.append(pallette['red'])
+            elif meta['node_type'] in (nt.FACT, nt.FACT_TABLE):
+                colors.append(pallette['black'])
+            elif meta['state'] == st.REDUCED or meta['state'] == st.REDUCIBLE:
+                colors.append(pallette['green-teal'])
+            elif meta['is_map'] == 1:
+                colors.append(pallette['black'])
+            else:
+                colors.append(pallette['orange'])
+            if meta['node_type'] == nt.HNODE:
+                sizes.append(10)
+                symbols.append('square')
+            elif meta['node_type'] == nt.SUMMARY:
+                sizes.append(12)
+                symbols.append('diamond')
+            elif meta['node_type'] == nt.FACT_TABLE:
+                sizes.append(10)
+                symbols.append('square-dot')
+            else:
+                sizes.append(8)
+                symbols.append('circle-dot' if meta['node_type'] == nt.FACT else 'circle')
+            show_label = meta['node_type'] != nt.FACT and (op not in label_exclusion_list or n in ['0', '0_'])
+            if meta['node_type'] == nt.FACT_TABLE:
+                labels.append(f"{meta['fact_table']['rows']} facts")
+            else:
+                labels.append(str.upper(op) if show_label else '')
+            # hover shows the core attributes only; the full alist is not rendered to text
+            hover = ' | '.join(f'{k}: {attrs[k]}' for k in (tt.SUBJECT, tt.PROPERTY, tt.OBJECT, tt.TIME, tt.OPVALUE) 
+                               if attrs.get(k) not in (None, ''))
+            if meta['node_type'] == nt.SUMMARY:
+                hover += f"<br>{meta['fact_count']} facts, {meta['compacted']} nodes compacted"
+            elif meta['node_type'] == nt.FACT_TABLE:
+                hover += f"<br>fact table of {meta['fact_table']['rows']} facts"
+            customdata.append((n, op, hover))
+
+        edge_trace = go.Scattergl(x=edge_xy[0], y=edge_xy[1], line=dict(width=0.5, color='#888'),
+                                  hoverinfo='none', mode='lines')
+        edge_hidden_trace = go.Scattergl(x=edge_hidden_xy[0], y=edge_hidden_xy[1],
+                                         line=dict(width=0.5, color='#EE8E3B', dash='dot'),
+                                         hoverinfo='none', mode='lines')
+        node_trace = go.Scattergl(
+            x=node_x, y=node_y, mode='markers+text', text=labels, textposition='top center',
+            customdata=customdata,
+            hovertemplate='<b>%{customdata[0]}</b> %{customdata[1]}<br>%{customdata[2]}<extra></extra>',
+            marker=dict(symbol=symbols, color=colors, size=sizes, opacity=0.9))
+
+        answer_formatted = f'<b>A:</b> {answer}' if answer else ''
+        return go.Figure(data=[edge_trace, edge_hidden_trace, node_trace],
+                         layout=go.Layout(
+                            title=f'Inference Graph <br><span style="font-size:12px; margin-top:-5px"><b>Q:</b> {question} {answer_formatted} </span>',
+                            title_font_size=12,
+                            font_size=10,
+                            showlegend=False,
+                            hovermode='closest',
+                            margin=dict(b=20, l=5, r=5, t=40),
+                            xaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
+                            yaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
+                            paper_bgcolor='rgb(255,255,255)',
+                            plot_bgcolor='rgb(255,255,255)'))
 
     def hierarchy_layout(self, G, root, levels=None, width=1., height=1.):
         '''If there is a cycle that is reachable from root, then this will see infinite recursion.
@@ -633,7 +1426,7 @@ class InferenceGraph(nx.DiGraph):
                 if n['is_map'] == 1 :
                     element['style'] = map_style
                     reduced_nodes.add(n[tt.ID])
-                if n['node_type'] == nt.FACT:
+                if n['node_type'] in (nt.FACT, nt.FACT_TABLE):
                     element['style'] = fact_style
             except:
                 print(f"!!! Error generating UI graph at node {n[tt.ID]}")
@@ -651,7 +1444,32 @@ class InferenceGraph(nx.DiGraph):
                 print(f"Error generating UI graph at edge {e['source']}->{e['target']}")
 
         return elements
-        
 
 
-        
\ No newline at end of file
+class InferenceGraph(InferenceGraphMixin, nx.DiGraph):
+    '''Inference graph stored in a networkx DiGraph'''
+    def _edge_attr(self, u, v, key):
+        return self._adj[u][v][key]
+
+    def to_networkx(self):
+        return self
+
+
+class ArrayInferenceGraph(InferenceGraphMixin, ArrayDiGraph):
+    '''Inference graph stored in array-backed adjacency lists (see graph/array_graph.py).
+       Use to_networkx() to get a networkx copy for export or graph algorithms.'''
+    def parent_ids(self, alist_id, exclude_self_complement=True):
+        return self._neighbor_ids(alist_id, False, COMPLEMENT if exclude_self_complement else 0)
+
+    def child_ids(self, alist_id, exclude_self_complement=True):
+        return self._neighbor_ids(alist_id, True, COMPLEMENT if exclude_self_complement else 0)
+
+
+GRAPH_BACKENDS = {'networkx': InferenceGraph, 'array': ArrayInferenceGraph}
+
+
+def create_inference_graph(backend='networkx', live_alists=False):
+    '''Create an empty inference graph with the given backend ('networkx' or 'array')'''
+    if backend not in GRAPH_BACKENDS:
+        raise ValueError(f"unknown graph backend '{backend}', expected one of {list(GRAPH_BACKENDS)}")
+    return GRAPH_BACKENDS[backend](live_alists=live_alists)
@@ -0,0 +1,22 @@
+'''
+File: conftest.py
+Description: Fixtures shared by the tests.
+
+'''
+
+import pytest
+
+from benchmarks.async_engine import start_server
+from frank.kb import conceptnet, musicbrainz, wikidata, worldbank
+
+
+@pytest.fixture
+def kb_server(monkeypatch):
+    ''' the mock HTTP server of the knowledge bases of benchmarks/async_engine.py, without delay;
+        the API URLs of the knowledge bases are restored after the test '''
+    for module, name in ((worldbank, 'API_URL'), (wikidata, 'API_URL'), (wikidata, 'SPARQL_URL'),
+                         (musicbrainz, 'API_URL'), (conceptnet, 'API_URL')):
+        monkeypatch.setattr(module, name, getattr(module, name))
+    server = start_server(0)
+    yield server
+    server.shutdown()
@@ -0,0 +1,66 @@
+'''
+File: test_alist.py
+Description: Tests of the incremental Alist fingerprint.
+
+Run from the repository root:
+
+    python -m pytest tests
+
+'''
+
+import random
+
+import pytest
+
+from graph.alist import Alist
+from graph.alist import Attributes as tt
+
+
+VALUES = ['', 'France', 'Ghana', 'population', 'gdp', '2010', '?x', '?y', '$z', '#w',
+          {tt.OP: 'value', tt.SUBJECT: 'Spain', tt.PROPERTY: 'capital'}]
+ATTRIBUTES = [tt.OP, tt.SUBJECT, tt.PROPERTY, tt.OBJECT, tt.TIME, tt.CONTEXT, '?x', '?y', '$z', '#w']
+
+
+def random_change(rng, alist):
+    attribute = rng.choice(ATTRIBUTES + [tt.OPVAR])
+    if attribute == tt.OP:
+        alist.set(tt.OP, rng.choice(['value', 'max', 'sum']))
+    elif attribute == tt.OPVAR:
+        alist.set(tt.OPVAR, rng.choice(['?x', '?y $z', '["?x", "#w"]', '']))
+    elif attribute == tt.CONTEXT:
+        alist.set(tt.CONTEXT, rng.choice(['', [{}, {'place': 'Accra'}, {}], [{'place': 'Accra'}, {}, {}]]))
+    elif attribute[0] in '?$#' and rng.random() < 0.2:
+        alist.remove(attribute)
+    else:
+        alist.set(attribute, rng.choice(VALUES))
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_incremental_fingerprint(seed):
+    rng = random.Random(seed)
+    alist = Alist(**{tt.OP: 'value', tt.OPVAR: '?x', tt.SUBJECT: 'France',
+                     tt.PROPERTY: 'population', tt.OBJECT: '?x', '?x': ''})
+    copies = [alist]
+    for _ in range(80):
+        random_change(rng, rng.choice(copies))
+        if rng.random() < 0.1:
+            copies.append(rng.choice(copies).copy())
+        for a in copies:
+            # the same as computing the fingerprint from scratch
+            assert a.fingerprint() == Alist(**a.attributes).fingerprint()
+
+
+def test_fingerprint_ignores_variable_names():
+    a = Alist(**{tt.OP: 'value', tt.OPVAR: '?x', tt.SUBJECT: '$y', tt.PROPERTY: 'population',
+                 tt.OBJECT: '?x', tt.TIME: '$y', '?x': '', '$y': ''})
+    b = Alist(**{tt.OP: 'value', tt.OPVAR: '?a', tt.SUBJECT: '$b', tt.PROPERTY: 'population',
+                 tt.OBJECT: '?a', tt.TIME: '$b', '?a': '', '$b': ''})
+    assert a.fingerprint() == b.fingerprint()
+    b.set(tt.TIME, '$c')
+    assert a.fingerprint() != b.fingerprint()
+    b.set(tt.TIME, '$b')
+    assert a.fingerprint() == b.fingerprint()
+    a.instantiate_variable('$y', 'Ghana')
+    assert a.fingerprint() != b.fingerprint()
+    b.instantiate_variable('$b', 'Ghana')
+    assert a.fingerprint() == b.fingerprint()
@@ -0,0 +1,68 @@
+'''
+File: test_async_engine.py
+Description: Tests of AsyncLauncher and AsyncInfer against the sync engine,
+             with the mock HTTP server of the knowledge bases (see tests/conftest.py).
+
+Run from the repository root:
+
+    python -m pytest tests
+
+'''
+
+import asyncio
+import contextlib
+import io
+
+from benchmarks.async_engine import answers, queries
+from frank import config
+from frank.launcher import AsyncLauncher, Launcher
+from graph.alist import Alist
+
+
+def run_sync(batch):
+    graphs = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i, query in enumerate(batch):
+            Launcher().start('', Alist(**query), str(i), graphs, strategy='best_first')
+    return graphs
+
+
+async def run_async(batch):
+    graphs = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        await asyncio.gather(*[AsyncLauncher().start('', Alist(**query), str(i), graphs, strategy='best_first')
+                               for i, query in enumerate(batch)])
+    return graphs
+
+
+def test_same_graphs_as_sync_engine(kb_server, monkeypatch):
+    # one frontier node per session at a time: the sessions build the graphs of the sync engine
+    monkeypatch.setitem(config.config, 'async_frontier_width', 1)
+    monkeypatch.setitem(config.config, 'kb_max_requests', 8)
+    kb_server.delay = 0.02
+    batch = queries(['France', 'Ghana'], [2010, 2024])
+    expected = run_sync(batch)
+    kb_server.max_in_flight = 0
+    graphs = asyncio.run(run_async(batch))
+    assert answers(graphs) == answers(expected)
+    assert all(a is not None for a in answers(graphs).values())
+    for session_id, g in graphs.items():
+        G, H = g['graph'], expected[session_id]['graph']
+        assert dict(G.nodes(data=True)) == dict(H.nodes(data=True))
+        assert list(G.edges(data=True)) == list(H.edges(data=True))
+    # the sessions had their KB requests in flight together
+    assert kb_server.max_in_flight > 1
+
+
+def test_frontier_nodes_share_the_event_loop(kb_server, monkeypatch):
+    monkeypatch.setitem(config.config, 'async_frontier_width', 8)
+    monkeypatch.setitem(config.config, 'kb_max_requests', 8)
+    kb_server.delay = 0.02
+    batch = queries(['Kenya'], [2024])
+    expected = run_sync(batch)
+    sync_in_flight = kb_server.max_in_flight
+    kb_server.max_in_flight = 0
+    graphs = asyncio.run(run_async(batch))
+    assert answers(graphs) == answers(expected) and answers(graphs)['0'] is not None
+    # the frontier nodes of the session had more KB requests in flight together
+    assert kb_server.max_in_flight > sync_in_flight
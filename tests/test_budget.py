@@ -0,0 +1,123 @@
+'''
+File: test_budget.py
+Description: Tests of the per-query budgets (frank/budget.py), alone and in
+             Launcher sessions against the mock HTTP server of the knowledge
+             bases (see tests/conftest.py).
+
+Run from the repository root:
+
+    python -m pytest tests
+
+'''
+
+import contextlib
+import io
+import time
+
+import pytest
+
+from benchmarks.async_engine import queries
+from frank import config
+from frank.budget import Budget, create_budget
+from frank.launcher import Launcher
+from graph.alist import Alist
+from graph.alist import Attributes as tt
+from graph.alist import NodeTypes as nt
+from graph.inference_graph import InferenceGraph
+
+
+def session(budget):
+    ''' a session of a query answered by temporal decomposition and regression, with a budget '''
+    graphs = {}
+    launcher = Launcher()
+    with contextlib.redirect_stdout(io.StringIO()):
+        launcher.start('', Alist(**queries(['Kenya'], [2026])[0]), '0', graphs, budget=budget)
+    return launcher, graphs['0']
+
+
+def test_limits():
+    budget = Budget(kb_calls=3, wall_time=10)
+    assert budget.limits() == {'kb_calls': 3, 'nodes': None, 'wall_time': 10, 'depth': None}
+    budget.kb_calls_used = 2
+    assert budget.kb_calls_left() == 1
+    budget.kb_calls_used = 4
+    assert budget.kb_calls_left() == 0
+    assert Budget().kb_calls_left() is None and Budget().time_left() is None
+    assert 9 < budget.time_left() <= 10
+    budget.start_time = time.time() - 11
+    assert budget.time_left() == 0
+    budget.start()
+    assert 9 < budget.time_left() <= 10
+
+
+def test_max_depth(monkeypatch):
+    monkeypatch.setitem(config.config, 'max_depth', 5)
+    assert Budget().max_depth() == 5
+    assert Budget(depth=3).max_depth() == 3
+    assert Budget(depth=8).max_depth() == 5
+
+
+def test_exhausted():
+    G = InferenceGraph()
+    G.add_alist(Alist(**queries(['Kenya'], [2026])[0]), create_complement=True)
+    assert Budget().exhausted(G) is None
+    assert Budget(nodes=3).exhausted(G) is None
+    assert Budget(nodes=2).exhausted(G) == 'nodes'
+    budget = Budget(kb_calls=2, nodes=2, wall_time=0)
+    budget.kb_calls_used = 2
+    # the limits are checked in the order of Budget.LIMITS
+    assert budget.exhausted(G) == 'kb_calls'
+    budget.kb_calls_used = 1
+    assert budget.exhausted(G) == 'nodes'
+    budget.nodes = None
+    assert budget.exhausted(G) == 'wall_time'
+
+
+def test_create_budget(monkeypatch):
+    budget = Budget(kb_calls=1)
+    assert create_budget(budget) is budget
+    assert create_budget({'nodes': 10, 'depth': 2}).limits() == {'kb_calls': None, 'nodes': 10, 'wall_time': None,
+                                                                 'depth': 2}
+    monkeypatch.setitem(config.config, 'query_budget', {'kb_calls': 20})
+    assert create_budget().kb_calls == 20
+    with pytest.raises(ValueError):
+        create_budget({'kb_calls': 1, 'tokens': 10})
+
+
+@pytest.mark.parametrize('limit, value', [('kb_calls', 5), ('kb_calls', 30), ('nodes', 20), ('nodes', 100),
+                                          ('wall_time', 0.05)])
+def test_session_stops_at_the_limit(kb_server, limit, value):
+    launcher, graph = session({limit: value})
+    assert launcher.budget_exhausted == limit
+    if limit == 'kb_calls':
+        assert launcher.infer.budget.kb_calls_used == value
+    answer = graph['answer']
+    if answer:
+        # the latest intermediate answer, with its error bar and the limit reached
+        assert answer['budget_exhausted'] == limit and answer['error_bar']
+        assert answer['alist'] == launcher.infer.propagated_alists[-1].attributes
+
+
+def test_depth_limit(kb_server):
+    def decomposition_depth(graph):
+        # the deepest map node of a decomposition (the ones of lookups are added by search_kb)
+        G = graph['graph']
+        return max(G.nodes[n]['meta']['depth'] for n in G.nodes()
+                   if G.nodes[n]['meta']['node_type'] == nt.HNODE and G.nodes[n]['meta']['is_map']
+                   and G.nodes[n][tt.OP] != 'lookup')
+
+    depths = []
+    for depth in (1, 3):
+        launcher, graph = session({'depth': depth})
+        assert launcher.budget_exhausted is None and graph['answer']['answer']
+        assert decomposition_depth(graph) <= depth
+        depths.append(decomposition_depth(graph))
+    assert depths[0] < depths[1]
+
+
+def test_unlimited_budget(kb_server):
+    unlimited = session({'kb_calls': None, 'nodes': None, 'wall_time': None, 'depth': None})
+    default = session(None)
+    assert unlimited[0].budget_exhausted is None
+    assert unlimited[1]['answer']['answer'] == default[1]['answer']['answer']
+    assert 'budget_exhausted' not in unlimited[1]['answer']
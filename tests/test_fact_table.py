@@ -0,0 +1,59 @@
+'''
+File: test_fact_table.py
+Description: Tests of the fact-table nodes (graph/fact_table.py) and of the
+             reduce operations that read them, against the rows of the
+             tables expanded to fact alists.
+
+Run from the repository root:
+
+    python -m pytest tests
+
+'''
+
+import pytest
+
+from benchmarks.fact_table import fact_nodes, query, reduce_result
+from frank.reduce import count, list as list_op, max as max_op, min as min_op, value
+from graph import fact_table
+from graph.alist import Attributes as tt
+from graph.alist import NodeTypes as nt
+
+REDUCE_OPS = (('list', list_op), ('count', count), ('max', max_op), ('min', min_op), ('value', value))
+
+
+@pytest.mark.parametrize('chained', (False, True))
+def test_rows_are_the_facts(chained):
+    facts = fact_nodes(query(chained), 25)
+    table = fact_table.make_fact_table(facts)
+    assert table.node_type == nt.FACT_TABLE
+    assert fact_table.row_count([table, facts[0]]) == 26
+    assert [r.attributes for r in fact_table.rows(table)] == [f.attributes for f in facts]
+    assert fact_table.values(table, tt.OBJECT) == [f.get(tt.OBJECT) for f in facts]
+    assert fact_table.values(table, tt.TIME) == ['2010'] * 25
+    assert fact_table.instantiation_values(table, tt.OPVAR) == [f.instantiation_value(tt.OPVAR) for f in facts]
+
+
+def test_facts_with_different_meta_data_make_no_table():
+    facts = fact_nodes(query(), 3)
+    facts[1].cost = 1.0
+    assert fact_table.make_fact_table(facts) is None
+
+
+@pytest.mark.parametrize('facts', (1, 2, 25))
+@pytest.mark.parametrize('chained', (False, True))
+@pytest.mark.parametrize('name, op', REDUCE_OPS)
+def test_reduce_table_as_rows(name, op, chained, facts):
+    table = fact_table.make_fact_table(fact_nodes(query(chained), facts))
+    rows = fact_table.expand([table])
+    assert reduce_result(op, name, [table], chained) == reduce_result(op, name, rows, chained)
+    # the reduce operations change their children in the same way
+    assert [r.attributes for r in fact_table.rows(table)] == [r.attributes for r in rows]
+
+
+@pytest.mark.parametrize('name, op', REDUCE_OPS)
+def test_reduce_tables_and_facts(name, op):
+    # a table, the facts of another lookup and a second table as children of one reduce node
+    children = [fact_table.make_fact_table(fact_nodes(query(), 10)), *fact_nodes(query(), 3),
+                fact_table.make_fact_table(fact_nodes(query(), 4))]
+    expected = reduce_result(op, name, fact_table.expand(children), False)
+    assert reduce_result(op, name, children, False) == expected
@@ -0,0 +1,240 @@
+'''
+File: test_graph_backend.py
+Description: Parity tests of the networkx and the array-backed inference
+             graph (graph/array_graph.py).
+
+Run from the repository root:
+
+    python -m pytest tests
+
+'''
+
+import random
+
+import networkx as nx
+import pytest
+
+from benchmarks.graph_backend import STATES, random_alist, random_step, snapshot
+from benchmarks.prune import temporal_graph
+from graph import codec
+from graph.alist import States as st
+from graph.array_graph import ArrayDiGraph
+from graph.inference_graph import ArrayInferenceGraph
+from graph.inference_graph import InferenceGraph
+
+
+# the inference graph sets all the edge attributes of the array backend
+EDGE = {'label': '', 'frontier': False, 'hidden': False, 'complement': False}
+
+
+def topology(G):
+    return {
+        'nodes': list(G.nodes(data=True)),
+        'edges': [(u, v, dict(d)) for u, v, d in G.edges(data=True)],
+        'n_edges': G.number_of_edges(),
+        'succ': {n: list(G.successors(n)) for n in G},
+        'pred': {n: list(G.predecessors(n)) for n in G},
+        'degrees': (list(G.out_degree()), list(G.in_degree())),
+    }
+
+
+def bare_graphs():
+    return [nx.DiGraph(), ArrayDiGraph()]
+
+
+def inference_graphs(root=None):
+    ''' an InferenceGraph and an ArrayInferenceGraph (with and without live alists) with the same root '''
+    root = root or random_alist(random.Random(0))
+    graphs = [InferenceGraph(), ArrayInferenceGraph(), ArrayInferenceGraph(live_alists=True)]
+    for G in graphs:
+        G.add_alist(root.copy(), create_complement=True)
+    return graphs
+
+
+def assert_same(graphs, view=snapshot):
+    expected = view(graphs[0])
+    for G in graphs[1:]:
+        assert view(G) == expected, type(G).__name__
+
+
+def test_add_remove_node():
+    graphs = bare_graphs()
+    for G in graphs:
+        G.add_nodes_from(['a', ('b', {'x': 1}), 'c'])
+        G.add_node('d', y=2)
+        G.add_edges_from([('a', 'b'), ('b', 'c'), ('c', 'a'), ('a', 'd'), ('d', 'd')], **EDGE)
+        G.remove_node('b')
+        G.remove_nodes_from(['d', 'missing'])
+        # a node added again goes to the end of the node order
+        G.add_node('b')
+        G.add_edge('b', 'a', **EDGE)
+    assert_same(graphs, topology)
+    for G in graphs:
+        with pytest.raises(nx.NetworkXError):
+            G.remove_node('missing')
+
+
+def test_add_remove_edge():
+    graphs = bare_graphs()
+    for G in graphs:
+        G.add_edge('a', 'b', **{**EDGE, 'label': 'x'})
+        G.add_edge('a', 'c', **EDGE)
+        G.add_edge('c', 'a', **EDGE)
+        G.add_edge('a', 'b', hidden=True)
+        G.remove_edge('a', 'c')
+        G.add_edge('a', 'c', **{**EDGE, 'frontier': True})
+        assert G.has_edge('a', 'c') and not G.has_edge('c', 'b') and not G.has_edge('missing', 'a')
+    assert_same(graphs, topology)
+    for G in graphs:
+        with pytest.raises(nx.NetworkXError):
+            G.remove_edge('b', 'a')
+
+
+def test_edge_flags():
+    graphs = bare_graphs()
+    for G in graphs:
+        G.add_edge('a', 'b', label='', frontier=True, hidden=False, complement=False)
+        G.add_edge('a', 'c', label='lookup', frontier=False, hidden=True, complement=True, weight=0.5)
+        G['a']['b']['hidden'] = True
+        G['a']['b']['frontier'] = False
+        G['a']['c']['label'] = ''
+        G['a']['c'].update(complement=False, weight=2)
+    assert_same(graphs, topology)
+    for key in ('label', 'frontier', 'hidden', 'complement', 'weight'):
+        assert list(graphs[0].edges(data=key)) == list(graphs[1].edges(data=key))
+
+
+def test_edge_slots_are_reused():
+    G = ArrayDiGraph()
+    for i in range(10):
+        G.add_edge(0, i + 1, label='x', hidden=True, weight=i)
+    G.remove_nodes_from(range(1, 6))
+    for i in range(5):
+        G.add_edge(0, i + 20, **EDGE)
+    assert len(G._flags) == 10 and len(G._ids) == 11
+    # reused slots start with default attributes
+    for i in range(5):
+        assert dict(G[0][i + 20]) == EDGE
+
+
+def test_frontier():
+    graphs = inference_graphs()
+    rng = random.Random(1)
+    for _ in range(30):
+        parent = rng.choice(list(graphs[0].nodes()))
+        child = random_alist(rng)
+        frontier = rng.random() < 0.6
+        for G in graphs:
+            G.link(G.alist(parent), child.copy(), frontier=frontier)
+    assert_same(graphs)
+    G = graphs[0]
+    node_id = next(n for n in G.nodes() if G.parent_ids(n) and G[G.parent_ids(n)[0]][n]['frontier'])
+    for G in graphs:
+        alist = G.alist(node_id)
+        alist.state = st.EXPLORED
+        G.add_alist(alist)
+        G.remove_link(G.parent_ids(node_id)[0], node_id)
+    assert_same(graphs)
+    assert [getattr(graphs[0].frontier_head(s), 'id', None) for s in STATES] == \
+        [getattr(graphs[1].frontier_head(s), 'id', None) for s in STATES]
+
+
+def brute_force_frontier(G, state):
+    ''' the frontier nodes of all frontier edges, stably sorted by cost (as frontier() returns them) '''
+    states = [state] if state is None else [state, None]
+    edges = [(u, v) for u, v, frontier in G.edges(data='frontier') if frontier]
+    nodes = [[n for n in (e[role] for e in edges) if G.nodes[n]['meta']['state'] in states] for role in (0, 1)]
+    return [sorted(ids, key=lambda n: G.nodes[n]['meta']['cost']) for ids in nodes]
+
+
+@pytest.mark.parametrize('live', [False, True])
+@pytest.mark.parametrize('seed', range(5))
+def test_frontier_brute_force(seed, live):
+    rng = random.Random(seed)
+    G = ArrayInferenceGraph(live_alists=live) if live else InferenceGraph()
+    G.add_alist(random_alist(rng), create_complement=True)
+    for _ in range(40):
+        random_step(rng, [G])
+    for _ in range(60):
+        alist = G.alist(rng.choice(list(G.nodes())))
+        # state and cost changes through the alists returned by the graph, without add_alist
+        if rng.random() < 0.7:
+            alist.state = rng.choice(STATES)
+        else:
+            alist.cost = rng.choice([0.5, 1.0, 2.0, 3.0])
+        for state in STATES + [None]:
+            expected = brute_force_frontier(G, state)
+            assert [[a.id for a in f] for f in G.frontier(state=state)] == expected
+            assert [a.id for a in G.frontier(size=2, state=state)[0]] == expected[0][:2]
+            head = G.frontier_head(state)
+            assert getattr(head, 'id', None) == (expected[0][0] if expected[0] else None)
+
+
+def test_frontier_state_round_trip():
+    G = InferenceGraph()
+    G.add_alist(random_alist(random.Random(4)), create_complement=True)
+    head = G.frontier_head(st.UNEXPLORED)
+    G.alist(head.id).state = st.EXPLORING
+    assert G.frontier_head(st.UNEXPLORED) is None and G.frontier_head(st.EXPLORING).id == head.id
+    G.alist(head.id).state = st.UNEXPLORED
+    assert G.frontier_head(st.UNEXPLORED).id == head.id and G.frontier_head(st.EXPLORING) is None
+    assert [a.id for a in G.frontier(update_state=True)[0]] == [head.id]
+    assert G.frontier_head(st.EXPLORING).id == head.id
+
+
+def test_prune():
+    graphs = [temporal_graph(3, 3, 2, graph_class) for graph_class in (InferenceGraph, ArrayInferenceGraph)]
+    target = graphs[0].child_ids(graphs[0].child_ids('0')[0])[0]
+    for G in graphs:
+        G.prune(target)
+        assert target not in G
+    assert_same(graphs)
+
+
+def test_save_load(tmp_path):
+    graphs = inference_graphs()
+    rng = random.Random(2)
+    for _ in range(40):
+        random_step(rng, graphs)
+    for i, G in enumerate(graphs):
+        G.save(tmp_path / f"{i}.frkg", extra={'answer': 1})
+    for i in range(len(graphs)):
+        for graph_class in (InferenceGraph, ArrayInferenceGraph):
+            loaded, extra = graph_class.load(tmp_path / f"{i}.frkg", with_extra=True)
+            assert snapshot(loaded) == snapshot(graphs[0]) and extra == {'answer': 1}
+            assert loaded._next_id == graphs[0]._next_id
+    decoded = codec.decode_graph(codec.encode_graph(graphs[1]), ArrayInferenceGraph())
+    assert snapshot(decoded) == snapshot(graphs[0])
+    assert nx.utils.graphs_equal(graphs[1].to_networkx(), nx.DiGraph(graphs[0]))
+
+
+@pytest.mark.parametrize('graph_class', [InferenceGraph, ArrayInferenceGraph])
+def test_copies_log_meta_changes(graph_class):
+    G = graph_class()
+    G.add_alist(random_alist(random.Random(3)), create_complement=True)
+    version = G.export_delta()['version']
+    copy = G.alist('0')
+    # attribute changes of a copy stay local until add_alist
+    copy.set('?x', 1)
+    assert G.export_delta(version)['nodes'] == [] and G.alist('0').get('?x') != 1
+    # meta data changes are written through and logged
+    copy.state = st.REDUCED
+    delta = G.export_delta(version)
+    assert [n['id'] for n in delta['nodes']] == ['0'] and G.alist('0').state == st.REDUCED
+    G.add_alist(copy)
+    assert [n['id'] for n in G.export_delta(delta['version'])['nodes']] == ['0']
+    assert G.alist('0').get('?x') == 1
+    # a detached copy no longer writes through
+    other = G.alist('0')
+    other.id = '9'
+    other.state = st.UNEXPLORED
+    assert G.alist('0').state == st.REDUCED
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_random_operations(seed):
+    rng = random.Random(seed)
+    graphs = inference_graphs(random_alist(rng))
+    for _ in range(60):
+        random_step(rng, graphs)
+        assert_same(graphs)
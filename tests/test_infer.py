@@ -0,0 +1,183 @@
+'''
+File: test_infer.py
+Description: Tests of Infer (frank/infer.py) against the mock HTTP server of 
+             the knowledge bases (see tests/conftest.py).
+
+Run from the repository root:
+
+    python -m pytest tests
+
+'''
+
+import concurrent.futures
+import contextlib
+import io
+import time
+
+from frank import config
+from frank.budget import Budget
+from frank.infer import Infer
+from graph.alist import Alist
+from graph.alist import Attributes as tt
+from graph.alist import NodeTypes as nt
+from graph.alist import States as states
+from graph.inference_graph import InferenceGraph
+
+
+def population_query(country='Ghana', year='2010'):
+    return Alist(**{tt.OP: 'value', tt.OPVAR: '?x', tt.SUBJECT: country,
+                    tt.PROPERTY: 'population', tt.OBJECT: '?x', tt.TIME: year})
+
+
+def test_run_frank_logs_state_changes(kb_server, monkeypatch):
+    G = InferenceGraph()
+    infer = Infer(G)
+    infer.enqueue_root(population_query())
+    version = G.export_delta()['version']
+    deltas = []
+    search_kb = infer.search_kb
+
+    def logged_search_kb(alist):
+        # the state set by run_frank before the search, without add_alist
+        deltas.append(G.export_delta(version))
+        return search_kb(alist)
+
+    monkeypatch.setattr(infer, 'search_kb', logged_search_kb)
+    with contextlib.redirect_stdout(io.StringIO()):
+        infer.run_frank(G.frontier_head())
+    assert [(n['id'], n['state']) for n in deltas[0]['nodes']] == [('0', states.EXPLORING)]
+    assert G.alist('0').state == states.EXPLORED
+
+
+def two_roots(infer):
+    infer.enqueue_root(population_query())
+    other = population_query('France')
+    other.id = '1'
+    infer.G.add_alist(other, create_complement=True)
+    return [infer.G.alist('0'), infer.G.alist('1')]
+
+
+def test_batch_charges_the_searches_of_the_alists_run(kb_server, monkeypatch):
+    infer = Infer(InferenceGraph())
+    alists = two_roots(infer)
+    sources = len(infer._search_plan(alists[0])[1])
+    add_search_results = infer._add_search_results
+
+    def pruning_add_search_results(alist, searches, results):
+        # the first alist prunes the second one, whose searches were submitted with its own
+        if alist.id == '0':
+            infer.G.alist('1').state = states.PRUNED
+        return add_search_results(alist, searches, results)
+
+    monkeypatch.setattr(infer, '_add_search_results', pruning_add_search_results)
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = infer.run_frank_batch(alists)
+    assert results[1] == []
+    assert infer.budget.kb_calls_used == sources
+
+
+def test_batch_searches_within_the_kb_calls_budget(kb_server, monkeypatch):
+    monkeypatch.setitem(config.config, 'thread_pool', 2)
+    infer = Infer(InferenceGraph())
+    alists = two_roots(infer)
+    sources = len(infer._search_plan(alists[0])[1])
+    infer.budget = Budget(kb_calls=sources + 1)
+    with contextlib.redirect_stdout(io.StringIO()):
+        infer.run_frank_batch(alists)
+    assert infer.budget.kb_calls_used == sources + 1
+    assert infer.budget.exhausted(infer.G) == 'kb_calls'
+
+
+def planned_searches(infer, alist, reserved=0):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return infer._search_plan(alist, reserved)
+
+
+def test_search_plan(kb_server, monkeypatch):
+    infer = Infer(InferenceGraph())
+    infer.enqueue_root(population_query())
+    alist = infer.G.alist('0')
+    result, searches = planned_searches(infer, alist)
+    assert result is None and list(searches) == ['wikidata', 'worldbank', 'musicbrainz']
+    for kb, search_alist, search_attr, search_props, refs in searches.values():
+        assert search_attr == tt.OBJECT and search_props and refs == []
+    # the searches are charged by the caller; the reserved calls are not planned
+    infer.budget = Budget(kb_calls=3)
+    assert list(planned_searches(infer, alist)[1]) == ['wikidata', 'worldbank', 'musicbrainz']
+    assert list(planned_searches(infer, alist, 2)[1]) == ['wikidata']
+    assert planned_searches(infer, alist, 3) == (False, None)
+    assert infer.budget.kb_calls_used == 0
+    # a source with refs of the property searches them without searching the property
+    infer.property_refs['population'] = [(('SP.POP.TOTL', 'population', 1), 'worldbank')]
+    searches = planned_searches(infer, alist)[1]
+    assert searches['worldbank'][3:] == (False, infer.property_refs['population'])
+    assert searches['wikidata'][3:] == (True, [])
+    alist.state = states.EXPLORED
+    assert planned_searches(infer, alist) == (True, None)
+
+
+def test_search_source(kb_server):
+    infer = Infer(InferenceGraph())
+    infer.enqueue_root(population_query())
+    alist = infer.G.alist('0')
+    searches = planned_searches(infer, alist)[1]
+    refs, facts, errors = infer._search_source(alist, 'worldbank', *searches['worldbank'])
+    assert refs == [(('SP.POP.TOTL', 'population', 1), 'worldbank')] and errors == 0
+    assert [(f.get(tt.SUBJECT), f.get(tt.OBJECT), f.data_sources) for f in facts] == \
+        [('Ghana', 1200000, ['worldbank'])]
+    # the refs searched for another alist of a batch
+    future = concurrent.futures.Future()
+    future.set_result((refs, [], 0))
+    kb, search_alist, search_attr, _, _ = searches['worldbank']
+    refs_, facts_, errors_ = infer._search_source(alist, 'worldbank', kb, search_alist, search_attr, False, future)
+    assert (refs_, errors_) == ([], 0) and [f.attributes for f in facts_] == [f.attributes for f in facts]
+    # the session state is not changed by the search
+    assert infer.property_refs == {} and list(infer.G.nodes()) == ['0', '0_']
+
+
+def test_search_time_left(monkeypatch):
+    monkeypatch.setitem(config.config, 'kb_search_timeout', {'wikidata': 30})
+    infer = Infer(InferenceGraph())
+    start = time.time()
+    assert 29 < infer._search_time_left('wikidata', start) <= 30
+    assert infer._search_time_left('wikidata', start - 40) == 0
+    assert infer._search_time_left('worldbank', start) is None
+    infer.budget = Budget(wall_time=10)
+    assert 9 < infer._search_time_left('wikidata', start) <= 10
+    assert 9 < infer._search_time_left('worldbank', start) <= 10
+
+
+def test_add_search_results(kb_server):
+    infer = Infer(InferenceGraph())
+    infer.enqueue_root(population_query())
+    alist = infer.G.alist('0')
+    searches = planned_searches(infer, alist)[1]
+    results = {name: infer._search_source(alist, name, *search) for name, search in searches.items()}
+    with contextlib.redirect_stdout(io.StringIO()):
+        # sources past their deadline add nothing
+        assert not infer._add_search_results(alist, searches, dict.fromkeys(searches))
+        assert list(infer.G.nodes()) == ['0', '0_'] and infer.property_refs == {'population': []}
+        assert infer._add_search_results(alist, searches, results)
+    # the refs are merged in the order of the sources
+    assert [source for _, source in infer.property_refs['population']] == ['wikidata', 'worldbank', 'musicbrainz']
+    facts = [a for a in infer.G.alists() if a.node_type == nt.FACT]
+    assert [(f.get(tt.OBJECT), f.get(tt.PROPERTY), f.state) for f in facts] == \
+        [(1200000, 'population', states.REDUCED)]
+
+
+def test_search_kb_runs_the_helpers(kb_server):
+    graphs = []
+    for split in (False, True):
+        infer = Infer(InferenceGraph())
+        infer.enqueue_root(population_query())
+        alist = infer.G.alist('0')
+        with contextlib.redirect_stdout(io.StringIO()):
+            if split:
+                _, searches = infer._search_plan(alist)
+                results = {name: infer._search_source(alist, name, *search) for name, search in searches.items()}
+                assert infer._add_search_results(alist, searches, results)
+            else:
+                assert infer.search_kb(alist)
+                assert infer.budget.kb_calls_used == 3
+        graphs.append((dict(infer.G.nodes(data=True)), list(infer.G.edges(data=True)), infer.property_refs))
+    assert graphs[0] == graphs[1]
@@ -0,0 +1,140 @@
+'''
+File: test_strategy.py
+Description: Tests of the search strategies (frank/strategy.py) on inference
+             graphs with frontier nodes of known cost, depth and heuristic.
+
+Run from the repository root:
+
+    python -m pytest tests
+
+'''
+
+import contextlib
+import io
+import random
+
+import pytest
+
+from frank import config
+from frank.infer import Infer
+from frank.strategy import STRATEGIES, Beam, BestFirst, IterativeDeepening, Strategy, create_strategy, heuristic
+from graph.alist import Alist
+from graph.alist import Attributes as tt
+from graph.alist import NodeTypes as nt
+from graph.alist import States as states
+from graph.inference_graph import InferenceGraph
+
+
+def lookup(subject='Ghana', time='2010', cost=0.0):
+    alist = Alist(**{tt.OP: 'value', tt.OPVAR: '?x', tt.SUBJECT: subject,
+                     tt.PROPERTY: 'population', tt.OBJECT: '?x', tt.TIME: time})
+    alist.cost = cost
+    return alist
+
+
+def expand(G, parent, successors):
+    ''' decompose parent into the successors, as G.decompose does; they become frontier nodes '''
+    map_op = parent.copy()
+    map_op.set(tt.OP, 'comp')
+    map_op.node_type = nt.HNODE
+    G.subdivide(parent.id, parent.id + '_', map_op, [parent.copy()], successors)
+    parent.state = states.EXPLORED
+    return [G.alist(x.id) for x in successors]
+
+
+def session(*successors):
+    ''' an Infer whose root is decomposed into the successors '''
+    infer = Infer(InferenceGraph())
+    infer.enqueue_root(lookup())
+    nodes = expand(infer.G, infer.G.alist('0'), list(successors))
+    return infer, nodes
+
+
+def select(strategy, infer, width=1):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return [x.id for x in strategy.select(infer, width)]
+
+
+def test_heuristic():
+    assert heuristic(lookup()) == 0
+    # a lookup instantiates one of s, p, o and t; each other one needs a decomposition
+    assert heuristic(lookup('?y')) == 1
+    assert heuristic(lookup('?y', '?t')) == 2
+    # an uninstantiated nesting variable needs normalize, and the subject it instantiates a lookup
+    nested = lookup('$y')
+    nested.set('$y', {tt.OP: 'value', tt.SUBJECT: 'Africa', tt.PROPERTY: 'country', tt.OBJECT: '?c'})
+    assert heuristic(nested) == 2
+
+
+def test_cost_and_best_first_order():
+    # distinct fingerprints: ?a and ?b differ by more than the name of the variable
+    infer, nodes = session(lookup('?a', cost=1.0), lookup('Kenya', cost=2.0), lookup('Ghana', cost=0.5),
+                           lookup('?b', '2011', cost=1.5))
+    a, kenya, ghana, b = [x.id for x in nodes]
+    assert select(Strategy(), infer) == [ghana]
+    assert select(Strategy(), infer, 4) == [ghana, a, b, kenya]
+    # cost plus heuristic: ?a and ?b need one more decomposition; ties keep the cost order
+    assert select(BestFirst(), infer, 4) == [ghana, a, kenya, b]
+    assert select(BestFirst(), infer, 2) == [ghana, a]
+
+
+def test_map_ops_order():
+    ops = list(range(10))
+    assert BestFirst().map_ops(lookup(), list(ops)) == ops
+    random.seed(0)
+    assert sorted(Strategy().map_ops(lookup(), list(ops))) == ops
+
+
+def test_beam_ignores_the_nodes_outside_the_beam():
+    infer, nodes = session(*[lookup(x, cost=c) for c, x in enumerate(('Ghana', 'Kenya', 'Togo', 'Benin'))])
+    beam = Beam(width=2)
+    first = select(beam, infer)
+    assert first == [nodes[0].id]
+    # the nodes of the depth after the width best ones are ignored
+    assert [infer.G.alist(x.id).state for x in nodes[2:]] == [states.IGNORE] * 2
+    infer.G.alist(first[0]).state = states.EXPLORED
+    assert select(beam, infer, 4) == [nodes[1].id]
+    infer.G.alist(nodes[1].id).state = states.EXPLORED
+    assert select(beam, infer) == []
+    # the next depth has its own quota
+    children = expand(infer.G, infer.G.alist(nodes[0].id), [lookup('Mali', cost=1.0), lookup('Chad', cost=1.0),
+                                                            lookup('Niger', cost=1.0)])
+    assert select(beam, infer, 4) == [children[0].id, children[1].id]
+    assert infer.G.alist(children[2].id).state == states.IGNORE
+
+
+def test_iterative_deepening(monkeypatch):
+    monkeypatch.setitem(config.config, 'max_depth', 6)
+    infer, nodes = session(lookup('Ghana', cost=1.0), lookup('Kenya', cost=2.0))
+    # a decomposition adds a map node and its successors: two levels
+    deep = expand(infer.G, nodes[1], [lookup('Mali', cost=0.1)])[0]
+    deeper = expand(infer.G, deep, [lookup('Chad', cost=0.0)])[0]
+    deep.state = states.UNEXPLORED
+    assert [nodes[0].depth, deep.depth, deeper.depth] == [2, 4, 6]
+    strategy = IterativeDeepening(step=2)
+    assert select(strategy, infer, 4) == [nodes[0].id]
+    # nodes still being explored within the bound: not deepened
+    nodes[0].state = states.EXPLORING
+    assert select(strategy, infer) == [] and strategy.bound == 2
+    # no node left within the bound: deepened by the step
+    nodes[0].state = states.EXPLORED
+    assert select(strategy, infer) == [deep.id] and strategy.bound == 4
+    # an answer was found: not deepened
+    deep.state = states.EXPLORED
+    infer.propagated_alists = [infer.G.alist('0')]
+    assert select(strategy, infer) == [] and strategy.bound == 4
+    infer.propagated_alists = []
+    assert select(strategy, infer) == [deeper.id] and strategy.bound == 6
+    # bounded by max_depth
+    deepest = expand(infer.G, deeper, [lookup('Niger')])[0]
+    assert deepest.depth == 8
+    assert select(strategy, infer) == [] and strategy.bound == 6
+
+
+def test_create_strategy():
+    assert [type(create_strategy(name)) for name in STRATEGIES] == [Strategy, BestFirst, Beam, IterativeDeepening]
+    beam = Beam(width=2)
+    assert create_strategy(beam) is beam
+    assert type(create_strategy()) is STRATEGIES[config.config['search_strategy']]
+    with pytest.raises(ValueError):
+        create_strategy('depth_first')